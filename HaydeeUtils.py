@@ -1,10 +1,33 @@
 # <pep8 compliant>
 
 import bpy
-from bpy.props import EnumProperty
+from bpy.props import BoolProperty, EnumProperty, IntProperty
 import os
 from .HaydeeConstants import *
-import codecs
+from .haydee_formats.common import (
+    ENCODING_SAMPLE_SIZE,
+    TEXT_BOMS,
+    d,
+    decodeText,
+    detect_encoding,
+    find_encoding,
+    open_text,
+    readStrA,
+    readStrA_term,
+    readStrW,
+    remap_indices,
+    reversed_loop_order,
+    sig_check,
+    stripLine,
+)
+import importlib
+import pickle
+import site
+import sys
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from mathutils import Vector
 from bpy_extras.wm_utils.progress_report import (
     ProgressReport,
@@ -22,6 +45,22 @@ file_format_prop = EnumProperty(
     default='H2',
 )
 
+trusted_file_prop = BoolProperty(
+    name="Trusted File",
+    description="Skip mesh validation, only for files exported by the game "
+    "tools (faster, but a malformed file may crash Blender)",
+    default=False,
+)
+
+precision_prop = IntProperty(
+    name="Precision",
+    description="Decimals written for each number, fewer make smaller "
+    "files but lose accuracy",
+    default=6,
+    min=1,
+    max=9,
+)
+
 
 def boneRenameBlender(bone_name):
     name = bone_name
@@ -47,21 +86,6 @@ def stripName(name):
     return bpy.path.clean_name(out)
 
 
-def decodeText(text):
-    return text.decode('latin1').split('\0', 1)[0]
-
-
-def d(number):
-    r = ('%.6f' % number).rstrip('0').rstrip('.')
-    if r == "-0":
-        return "0"
-    return r
-
-def hashedN(numbers):
-    if type(numbers) is not tuple:
-        return hash(tuple(numbers))
-
-    return hash(numbers)
 # --------------------------------------------------------------------------------
 #  Finds a suitable armature in the current selection or scene
 # --------------------------------------------------------------------------------
@@ -184,6 +208,142 @@ def new_rest_pose(selected, active):
         modif.object = active
 
 
+# --------------------------------------------------------------------------------
+# parallel parsing
+# --------------------------------------------------------------------------------
+
+ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def standaloneFunction(func):
+    """Re-import func from the addon folder as a top level module.
+
+    Worker processes can then unpickle it without importing the addon
+    package (and bpy). func must live in a module that only imports the
+    standard library, numpy and its own sibling modules. The folder is only
+    on sys.path during the import, workers add it in their initializer.
+    Returns the function and the names of the top level modules imported
+    for it, forgetStandalone drops them.
+    """
+    module_name = func.__module__.split('.', 1)[1]
+    package = module_name.split('.', 1)[0]
+    loaded = set(sys.modules)
+    added = ADDON_DIR not in sys.path
+    if added:
+        sys.path.append(ADDON_DIR)
+    try:
+        module = importlib.import_module(module_name)
+    finally:
+        if added:
+            sys.path.remove(ADDON_DIR)
+    modules = [name for name in set(sys.modules) - loaded
+               if name == package or name.startswith(package + '.')]
+    return getattr(module, func.__name__), modules
+
+
+def forgetStandalone(modules):
+    for name in modules:
+        sys.modules.pop(name, None)
+
+
+def parse_files(func, jobs):
+    """Yield func(*job) for every job, in order, parsed in worker processes.
+
+    Results are yielded as soon as they are ready so the caller can build
+    datablocks on the main thread while the remaining files are parsed.
+    Falls back to parsing on the main thread if no pool is available.
+    """
+    if len(jobs) < 2:
+        for job in jobs:
+            yield func(*job)
+        return
+
+    try:
+        worker, modules = standaloneFunction(func)
+    except ImportError as e:
+        print("Parallel parsing unavailable (%s), parsing serially" % e)
+        for job in jobs:
+            yield func(*job)
+        return
+
+    # the top level modules are needed until every call has been pickled
+    try:
+        try:
+            pool = ProcessPoolExecutor(
+                max_workers=min(len(jobs), os.cpu_count() or 1),
+                initializer=site.addsitedir, initargs=(ADDON_DIR,))
+            futures = [pool.submit(worker, *job) for job in jobs]
+        except (OSError, BrokenProcessPool) as e:
+            print("Parallel parsing unavailable (%s), parsing serially" % e)
+            for job in jobs:
+                yield func(*job)
+            return
+
+        with pool:
+            for job, future in zip(jobs, futures):
+                try:
+                    result = future.result()
+                except (BrokenProcessPool, pickle.PicklingError) as e:
+                    print("Parallel parsing failed (%s), parsing serially" % e)
+                    result = func(*job)
+                yield result
+    finally:
+        forgetStandalone(modules)
+
+
+class ExportSession:
+    """Evaluated depsgraph and temporary meshes of one export.
+
+    The depsgraph is evaluated once for all the objects. to_mesh() keeps a
+    single temporary mesh alive, the previous one is cleared when the next
+    object is converted and the last one when the session ends, whatever
+    path the export took.
+    """
+
+    def __init__(self, context, apply_modifiers):
+        self.apply_modifiers = apply_modifiers
+        self.depsgraph = context.evaluated_depsgraph_get()
+        self.converted = None
+
+    def to_mesh(self, ob):
+        """(object converted, its temporary mesh)"""
+        self.clear()
+        if self.apply_modifiers:
+            ob_for_convert = ob.evaluated_get(self.depsgraph)
+        else:
+            ob_for_convert = ob.original
+        mesh = ob_for_convert.to_mesh()
+        self.converted = ob_for_convert
+        return ob_for_convert, mesh
+
+    def clear(self):
+        if self.converted is not None:
+            self.converted.to_mesh_clear()
+            self.converted = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.clear()
+
+
+class StageTimer:
+    """Wall clock time of the named stages of an import, for the report"""
+
+    def __init__(self):
+        self.stages = []
+        self.last = time.perf_counter()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.stages.append((name, now - self.last))
+        self.last = now
+
+    def __str__(self):
+        return ", ".join("%s %.3fs" % stage for stage in self.stages)
+
+
 def haydeeFilepath(mainpath, filepath):
     path = filepath
     if not os.path.isabs(filepath):
@@ -200,68 +360,238 @@ def haydeeFilepath(mainpath, filepath):
     return path
 
 
-def coordTransform(coord):
-    return [-coord[0], -coord[2], coord[1]]
-
-
-def readVec(line_split, vec_data, vec_len, func):
-    vec = [func(v) for v in line_split[1:]]
-    vec_data.append(tuple(vec[:vec_len]))
-
-
-def readWeights(line_split, vert_data):
-    vec = tuple((int(line_split[1]), int(line_split[2]), float(line_split[3])))
-    vert_data.append(vec)
+def mesh_from_arrays(name, vert_coords, loop_verts, loop_totals):
+    """Build a mesh straight from flat arrays, bypassing from_pydata.
 
+    vert_coords holds x y z per vertex, loop_verts the vertex of every face
+    corner and loop_totals the corner count of each face, faces stored one
+    after another.
+    """
+    vert_coords = np.asarray(vert_coords, dtype=np.float32).reshape(-1)
+    loop_verts = np.asarray(loop_verts, dtype=np.int32)
+    loop_totals = np.asarray(loop_totals, dtype=np.int32)
+    loop_starts = (np.cumsum(loop_totals) - loop_totals).astype(np.int32)
+
+    mesh_data = bpy.data.meshes.new(name)
+    mesh_data.vertices.add(len(vert_coords) // 3)
+    mesh_data.loops.add(len(loop_verts))
+    mesh_data.polygons.add(len(loop_totals))
+    mesh_data.vertices.foreach_set("co", vert_coords)
+    mesh_data.loops.foreach_set("vertex_index", loop_verts)
+    mesh_data.polygons.foreach_set("loop_start", loop_starts)
+    mesh_data.polygons.foreach_set("loop_total", loop_totals)
+    mesh_data.update(calc_edges=True)
+    return mesh_data
+
+
+def set_uv_layer(mesh_data, loop_uvs, file_format):
+    """Create a uv layer filled from a (loops, 2) array in a single call.
+
+    H2 files store V flipped, it is flipped back on the array before the
+    foreach_set.
+    """
+    uvs = np.array(loop_uvs, dtype=np.float32).reshape(-1, 2)
+    if (file_format == 'H2'):
+        uvs[:, 1] = 1 - uvs[:, 1]
+    blen_uvs = mesh_data.uv_layers.new()
+    if len(uvs) == len(mesh_data.loops):
+        blen_uvs.data.foreach_set("uv", uvs.ravel())
+    return blen_uvs
+
+
+def mark_smooth_group_edges(mesh_data, loop_verts, face_counts,
+                            smooth_groups):
+    """Mark as sharp the edges on the border of a smoothing group.
+
+    An edge used only once inside a smoothing group (group 0 is ignored)
+    separates it from another group. loop_verts holds the mesh vertex of
+    every face corner, faces stored one after another.
+    """
+    counts = np.asarray(face_counts, dtype=np.int64)
+    smooth_groups = np.asarray(smooth_groups, dtype=np.int64)
+    if not len(counts) or len(smooth_groups) != len(counts):
+        return
+
+    # both ends of every face edge: corner and the previous corner
+    loop_verts = np.asarray(loop_verts, dtype=np.int64)
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    prev_loop = np.arange(len(loop_verts), dtype=np.int64) - 1
+    prev_loop[starts] = ends - 1
+    v1 = loop_verts
+    v2 = loop_verts[prev_loop]
+
+    loop_groups = np.repeat(smooth_groups, counts)
+    in_group = loop_groups != 0
+    if not in_group.any():
+        return
+    # sort the (group, v0, v1) edge uses, a single packed integer key
+    # overflows for large meshes with many groups
+    groups = loop_groups[in_group]
+    low = np.minimum(v1, v2)[in_group]
+    high = np.maximum(v1, v2)[in_group]
+    order = np.lexsort((high, low, groups))
+    groups, low, high = groups[order], low[order], high[order]
+    first = np.ones(len(groups), dtype=bool)
+    first[1:] = ((groups[1:] != groups[:-1]) | (low[1:] != low[:-1]) |
+                 (high[1:] != high[:-1]))
+    run_starts = np.flatnonzero(first)
+    users = np.diff(np.append(run_starts, len(groups)))
+    single = run_starts[users == 1]
+    vert_count = len(mesh_data.vertices)
+    sharp_keys = np.unique(low[single] * vert_count + high[single])
+    if not len(sharp_keys):
+        return
+
+    edge_verts = np.empty(len(mesh_data.edges) * 2, dtype=np.int64)
+    mesh_data.edges.foreach_get("vertices", edge_verts)
+    edge_verts = edge_verts.reshape(-1, 2)
+    mesh_keys = edge_verts.min(axis=1) * vert_count + edge_verts.max(axis=1)
+    mesh_data.edges.foreach_set("use_edge_sharp",
+                                np.isin(mesh_keys, sharp_keys))
+
+
+def add_vertex_weights(obj, group_names, vert_indices, group_indices,
+                       weights):
+    """Assign weights with one VertexGroup.add per (group, weight) bucket.
+
+    group_names maps a group index to its vertex group name, a None entry
+    skips that group. Each vertex group is created at most once. A vertex
+    listed more than once for a group gets its last weight in file order,
+    like adding them one at a time with 'REPLACE'.
+    """
+    vert_indices = np.asarray(vert_indices)
+    group_indices = np.asarray(group_indices)
+    weights = np.asarray(weights, dtype=np.float32)
+    if not len(weights):
+        return
+
+    # lexsort is stable, the last of each (group, vertex) run is the last
+    # one in file order
+    order = np.lexsort((vert_indices, group_indices))
+    last = np.ones(len(order), dtype=bool)
+    last[:-1] = ((group_indices[order[1:]] != group_indices[order[:-1]]) |
+                 (vert_indices[order[1:]] != vert_indices[order[:-1]]))
+    vert_indices = vert_indices[order[last]]
+    group_indices = group_indices[order[last]]
+    weights = weights[order[last]]
+
+    order = np.lexsort((weights, group_indices))
+    vert_indices = vert_indices[order]
+    group_indices = group_indices[order]
+    weights = weights[order]
+
+    bounds = np.flatnonzero((group_indices[1:] != group_indices[:-1]) |
+                            (weights[1:] != weights[:-1])) + 1
+    starts = [0] + bounds.tolist()
+    ends = bounds.tolist() + [len(weights)]
+
+    vertex_groups = {}
+    for start, end in zip(starts, ends):
+        name = group_names[group_indices[start]]
+        if name is None:
+            continue
+        vertGroup = vertex_groups.get(name)
+        if not vertGroup:
+            vertGroup = obj.vertex_groups.get(name)
+            if not vertGroup:
+                vertGroup = obj.vertex_groups.new(name=name)
+            vertex_groups[name] = vertGroup
+        vertGroup.add(vert_indices[start:end].tolist(), float(weights[start]),
+                      'REPLACE')
+
+
+def vertex_group_elements(mesh_data):
+    """Every vertex group element of a mesh as flat arrays, sorted by vertex.
+
+    Returns (vert_indices, group_indices, weights), zero weights included.
+    Blender has no foreach_get for vertex group elements, every element is
+    still read through RNA in Python. Only the arrays are built in bulk, so
+    read them once per mesh and pass them on.
+    """
+    # CSR layout, the group elements of every vertex and their count
+    vertex_groups = [v.groups for v in mesh_data.vertices]
+    counts = np.fromiter(map(len, vertex_groups), dtype=np.int32,
+                         count=len(vertex_groups))
+    elements = [g for groups in vertex_groups for g in groups]
+    group_indices = np.fromiter((g.group for g in elements), dtype=np.int32,
+                                count=len(elements))
+    weights = np.fromiter((g.weight for g in elements), dtype=np.float32,
+                          count=len(elements))
+    vert_indices = np.repeat(np.arange(len(counts), dtype=np.int32), counts)
+    return vert_indices, group_indices, weights
+
+
+def vertex_group_weights(mesh_data, group_bones, elements=None):
+    """Non zero weights of a mesh as flat arrays, sorted by vertex.
+
+    group_bones maps a vertex group index to a bone index, a None entry
+    skips that group. elements are the arrays of vertex_group_elements when
+    they were already read. Returns (vert_indices, bone_indices, weights),
+    the reverse of add_vertex_weights.
+    """
+    if elements is None:
+        elements = vertex_group_elements(mesh_data)
+    vert_indices, group_indices, weights = elements
 
-def stripLine(line):
-    return line.strip().strip(';')
+    # groups without a bone, or past the end of group_bones, map to -1
+    group_lookup = np.array([-1 if bone is None else bone
+                             for bone in group_bones] + [-1], dtype=np.int32)
+    bone_indices = group_lookup[np.minimum(group_indices, len(group_bones))]
+    keep = (bone_indices >= 0) & (weights > 0)
+    return vert_indices[keep], bone_indices[keep], weights[keep]
 
 
 # --------------------------------------------------------------------------------
-# binary helpers
+# bone hierarchy helpers
 # --------------------------------------------------------------------------------
 
 
-def sig_check(mview):
-    result = None
-    if (mview[0:8] == (HD_CHUNK)):
-        result = Signature.HD_CHUNK
-    elif (mview[0:11] == (HD_DATA_TXT)):
-        result = Signature.HD_DATA_TXT
-    elif (mview[0:24] == (HD_DATA_TXT_BOM)):
-        result = Signature.HD_DATA_TXT_BOM
-    elif (mview[0:10] == (HD_MOTION)):
-        result = Signature.HD_MOTION
-    return result
-
-
-# Read prefixed ANSI/utf8-as-ansi string
-def readStrA(start, data):
-    len = int.from_bytes(data[start:start + 4], byteorder='little')
-    start += 4
-    return (data[start:start + len].decode("utf-8"), 4 + len + 1)
-
+def bone_parent_indices(names, parent_names):
+    """Parent index of every bone (-1 for roots) from parent names"""
+    boneIndex = {name: idx for idx, name in enumerate(names)}
+    return [boneIndex.get(parent, -1) if parent else -1
+            for parent in parent_names]
 
-# Read property name (until null terminator)
-def readStrA_term(start, maxLen, data):
-    i, tStr, found = -1, "", False
-    while (i < maxLen):
-        i += 1
-        if (data[start + i] <= 0):
-            found = True
-            break
-    if (found):
-        tStr = codecs.decode(data[start:start + i], "latin")
-    return (tStr, i)
 
+def bone_hierarchy_order(parents):
+    """Bone indices ordered so every parent comes before its children.
 
-# Read UTF16/wide string
-def readStrW(start, data):
-    i = int.from_bytes(data[start:start + 4], byteorder='little')
-    len = (i * 2)
-    start += 4
-    return (codecs.decode(data[start:start + len], "utf-16-le"), 4 + len + 2)
+    Iterative, so long hair and tail chains can't hit the recursion limit.
+    """
+    children = [[] for _ in parents]
+    roots = []
+    for idx, parent in enumerate(parents):
+        if 0 <= parent < len(parents):
+            children[parent].append(idx)
+        else:
+            roots.append(idx)
+    order = []
+    stack = roots[::-1]
+    while stack:
+        idx = stack.pop()
+        order.append(idx)
+        stack.extend(reversed(children[idx]))
+    return order
+
+
+def set_bone_matrices(edit_bones, parents, local_mats, progress=None):
+    """Set every edit bone matrix from its local matrix and its parent.
+
+    Bones are set in a single pass over bone_hierarchy_order. Children are
+    composed with the parent matrix read back from the edit bone, which
+    Blender has normalized and freed of any reflection, not with the local
+    matrix assigned to it. Bones that can't be reached from a root are
+    left untouched.
+    """
+    for idx in bone_hierarchy_order(parents):
+        parent = parents[idx]
+        if 0 <= parent < len(parents):
+            edit_bones[idx].matrix = edit_bones[parent].matrix @ local_mats[idx]
+        else:
+            edit_bones[idx].matrix = local_mats[idx]
+        if progress:
+            progress.step()
 
 
 # Vector from Haydee format to Blender
@@ -300,14 +630,6 @@ def setActiveCollection(collName):
         bpy.context.view_layer.active_layer_collection = layerColl
 
 
-
-def find_encoding(filepath)->str:
-    """Find File enoding using charset_normalizer """
-    import charset_normalizer
-    with (open(filepath, 'rb')) as f:
-        encoding = charset_normalizer.detect(f.read())['encoding']
-    return encoding
-
 class HaydeeToolFitArmature_Op(bpy.types.Operator):
     bl_idname = 'haydee_tools.fit_to_armature'
     bl_label = 'Cycles'
@@ -0,0 +1,158 @@
+"""Time DMeshTokenizer against the line loop read_dmesh used before it,
+and check both read the same data.
+
+Run from the addon folder: python benchmarks/bench_dmesh_parse.py
+"""
+
+import io
+import os
+import random
+import sys
+import time
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from haydee_formats.common import stripLine  # noqa: E402
+from haydee_formats.dmesh import (DMeshData, DMeshGroup, dump_dmesh,  # noqa: E402
+                                  parse_dmesh)
+
+
+def readVec(line_split, vec_data, vec_len, func):
+    vec = [func(v) for v in line_split[1:]]
+    vec_data.append(tuple(vec[:vec_len]))
+
+
+def baseline_parse(data):
+    """the parsing loop of read_dmesh before DMeshTokenizer"""
+    level = 0
+    vert_data = []
+    uv_data = []
+    vCount = None
+    jointNames = []
+    jointOrigin = []
+    jointAxis = []
+    jointParents = []
+    weights = []
+    meshFaces = {}
+    meshUvs = {}
+    meshSmoothGroups = {}
+    meshName = None
+
+    stripLine(data.readline())
+    for lineData in data:
+        line = stripLine(lineData)
+        line_split = line.split()
+        if not line_split:
+            continue
+        line_start = line_split[0]
+        if (line_start in ('{')):
+            level += 1
+        if (line_start in ('}')):
+            level -= 1
+        if (line_start == 'vert'):
+            readVec(line_split, vert_data, 3, float)
+        if (line_start == 'uv'):
+            readVec(line_split, uv_data, 2, float)
+        if (line_start == 'group' and level >= 2):
+            meshName = line_split[1]
+            meshFaces[meshName] = []
+            meshUvs[meshName] = []
+            meshSmoothGroups[meshName] = []
+        if (line_start == 'count' and level >= 3):
+            vCount = int(line_split[1])
+        if (line_start == 'verts' and level >= 3):
+            readVec(line_split, meshFaces[meshName], vCount, int)
+        if (line_start == 'uvs' and level >= 3):
+            readVec(line_split, meshUvs[meshName], vCount, int)
+        if (line_start == 'smoothGroup' and level >= 3):
+            meshSmoothGroups[meshName].append(int(line_split[1]))
+        if (line_start == 'joint' and level >= 2):
+            jointNames.append(line_split[1])
+            jointParents.append(None)
+        if (line_start == 'parent' and level >= 3):
+            jointParents[len(jointParents) - 1] = line.split(' ', 1)[1]
+        if (line_start == 'origin' and level >= 3):
+            readVec(line_split, jointOrigin, 3, float)
+        if (line_start == 'axis' and level >= 3):
+            readVec(line_split, jointAxis, 4, float)
+        if (line_start == 'weight' and level >= 2):
+            weights.append((int(line_split[1]), int(line_split[2]),
+                            float(line_split[3])))
+    return (vert_data, uv_data, meshFaces, meshUvs, meshSmoothGroups,
+            jointNames, jointParents, jointOrigin, jointAxis, weights)
+
+
+def flat(rows, typecode='f'):
+    return array(typecode, [v for row in rows for v in row])
+
+
+def sample_text(vert_count, joint_count=60):
+    rnd = random.Random(vert_count)
+    dmesh = DMeshData('d')
+    dmesh.verts.extend(rnd.uniform(-2, 2) for _ in range(vert_count * 3))
+    dmesh.uvs.extend(rnd.uniform(0, 1) for _ in range(vert_count * 2))
+    for g in range(4):
+        group = DMeshGroup('group%d' % g)
+        for _ in range(vert_count // 4):
+            count = rnd.choice((3, 4))
+            group.face_counts.append(count)
+            group.face_verts.extend(rnd.randrange(vert_count)
+                                    for _ in range(count))
+            group.face_uvs.extend(rnd.randrange(vert_count)
+                                  for _ in range(count))
+            group.smooth_groups.append(rnd.randrange(3))
+        dmesh.groups[group.name] = group
+    for j in range(joint_count):
+        dmesh.joint_names.append('bone%d' % j)
+        # parents with runs of whitespace
+        dmesh.joint_parents.append('bone%d  x' % (j - 1) if j else None)
+        dmesh.joint_origins.extend(rnd.uniform(-1, 1) for _ in range(3))
+        dmesh.joint_axes.extend(rnd.uniform(-1, 1) for _ in range(4))
+    for v in range(vert_count):
+        dmesh.weight_verts.append(v)
+        dmesh.weight_bones.append(rnd.randrange(joint_count))
+        dmesh.weight_values.append(rnd.random())
+    out = io.StringIO()
+    dump_dmesh(out, dmesh)
+    return out.getvalue()
+
+
+def check(old, new):
+    (verts, uvs, faces, face_uvs, smooth_groups, names, parents, origins,
+     axes, weights) = old
+    assert new.verts == flat(verts)
+    assert new.uvs == flat(uvs)
+    assert list(new.groups) == list(faces)
+    for name, group in new.groups.items():
+        assert list(group.faces()) == faces[name]
+        assert list(group.uv_faces()) == face_uvs[name]
+        assert list(group.smooth_groups) == smooth_groups[name]
+    assert new.joint_names == names
+    assert new.joint_parents == parents
+    assert new.joint_origins == flat(origins)
+    assert new.joint_axes == flat(axes)
+    assert list(new.weight_verts) == [w[0] for w in weights]
+    assert list(new.weight_bones) == [w[1] for w in weights]
+    assert new.weight_values == array('f', [w[2] for w in weights])
+
+
+def bench(vert_count):
+    text = sample_text(vert_count)
+
+    start = time.perf_counter()
+    old = baseline_parse(io.StringIO(text))
+    old_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new = parse_dmesh(io.StringIO(text))
+    new_time = time.perf_counter() - start
+
+    check(old, new)
+    print("%8d verts: line loop %.3fs, DMeshTokenizer %.3fs, %.1fx" %
+          (vert_count, old_time, new_time, old_time / new_time))
+
+
+if __name__ == '__main__':
+    for vert_count in (1000, 100000, 500000):
+        bench(vert_count)
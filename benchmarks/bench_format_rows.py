@@ -0,0 +1,55 @@
+"""Time format_rows against one d() per value, and check the text.
+
+Run from the addon folder: python benchmarks/bench_format_rows.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from haydee_formats.common import d, write_rows  # noqa: E402
+
+ROW = '\t\tvert %s %s %s;\n'
+
+
+def d_rows(values, row, width, precision):
+    """the text written before format_rows, one string per value"""
+    return ''.join(row % tuple(d(v, precision) for v in values[i:i + width])
+                   for i in range(0, len(values), width))
+
+
+class Text:
+    def __init__(self):
+        self.parts = []
+
+    def write(self, text):
+        self.parts.append(text)
+
+
+def bench(count, precision):
+    rnd = random.Random(count)
+    values = [rnd.uniform(-2, 2) for _ in range(count * 3)]
+
+    start = time.perf_counter()
+    old = d_rows(values, ROW, 3, precision)
+    old_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    out = Text()
+    write_rows(out, ROW, values, 3, precision)
+    new = ''.join(out.parts)
+    new_time = time.perf_counter() - start
+
+    assert new == old, "format_rows text differs from d()"
+    print("%8d rows, precision %2d: d() %.3fs, write_rows %.3fs, %.1fx" %
+          (count, precision, old_time, new_time, old_time / new_time))
+
+
+if __name__ == '__main__':
+    for count in (1000, 100000, 1000000):
+        bench(count, 6)
+    for precision in (1, 9, 12):
+        bench(100000, precision)
@@ -0,0 +1,56 @@
+"""Time remap_indices against the list loop read_dmesh used before it,
+and check both give the same vertices and faces.
+
+Run from the addon folder: python benchmarks/bench_remap_indices.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from haydee_formats.common import remap_indices  # noqa: E402
+
+
+def baseline_remap(face_verts):
+    """vertDic and objFaces of read_dmesh before remap_indices"""
+    vertDic = []
+    for face in face_verts:
+        for vertIdx in face:
+            if vertIdx not in vertDic:
+                vertDic.append(vertIdx)
+    objFaces = [tuple(vertDic.index(oldIdx) for oldIdx in face)
+                for face in face_verts]
+    return vertDic, objFaces
+
+
+def sample_faces(face_count, vert_count, seed=0):
+    """quads over a slice of a larger vertex list, like one dmesh group"""
+    rng = np.random.default_rng(seed)
+    first = rng.integers(0, vert_count)
+    return (first + rng.integers(0, vert_count, (face_count, 4))).tolist()
+
+
+def bench(face_count):
+    faces = sample_faces(face_count, face_count)
+
+    start = time.perf_counter()
+    old_verts, old_faces = baseline_remap(faces)
+    old_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    verts, local = remap_indices(np.array(faces).reshape(-1))
+    new_time = time.perf_counter() - start
+
+    assert verts.tolist() == old_verts
+    assert local.reshape(-1, 4).tolist() == [list(f) for f in old_faces]
+    print("%8d faces: list loop %.3fs, remap_indices %.4fs, %.0fx" %
+          (face_count, old_time, new_time, old_time / new_time))
+
+
+if __name__ == '__main__':
+    for face_count in (1000, 5000, 10000):
+        bench(face_count)
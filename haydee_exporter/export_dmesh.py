@@ -1,60 +1,107 @@
+import hashlib
 import os
 import re
+from contextlib import ExitStack
 import bpy
 from math import pi
 from bpy.props import *
 from bpy.types import Operator
 from bpy_extras.io_utils import ExportHelper
 from mathutils import Vector,Matrix,Quaternion
+import numpy as np
 from ..HaydeeUtils import *
+from ..haydee_formats.dmesh import (DMeshData, DMeshGroup, DMeshWriter,
+                                    dmesh_snapshot, dump_dmesh_snapshot_file)
 
 # --------------------------------------------------------------------------------
 #  .dmesh exporter
 # --------------------------------------------------------------------------------
 
+# Blender to .dmesh axes, (x, y, z) -> (-x, z, -y)
+DMESH_AXES = np.array(((-1, 0, 0, 0), (0, 0, 1, 0), (0, -1, 0, 0), (0, 0, 0, 1)))
+
+
+def uv_keys(uvs):
+    """Exact value of every (n, 2) float32 uv as a single integer"""
+    # + 0 turns -0.0 into 0.0, they are the same uv
+    uvs = np.ascontiguousarray(uvs, dtype=np.float32) + np.float32(0)
+    return uvs.view(np.uint64).reshape(-1)
+
+
 class DMesh:
-    def __init__(self):
-        self.hashed_unique_uvs_pos:dict[int:dict]={}
-        self.uvs_dict=[]
+    def __init__(self,writer:DMeshWriter=None):
+        # uvs written so far, in file order, and the file uv of each loop
+        self.unique_uvs=np.empty((0, 2), dtype=np.float32)
+        self.loop_uvs=np.empty(0, dtype=np.int64)
         self.base_uv_index=0
         self.base_vertex_index=0
         self.first_vertex_index=0
         self.first_uv_index=0
         self.vertex_map={}
-        self.vertex_output=[]
-        self.new_mesh_uvs=[]
-        self.uvs_output=[]
+        self.new_mesh_uvs=np.empty((0, 2), dtype=np.float32)
         self.smooth_groups=()
         self.smooth_groups_tot=0
         self.material_index=0
-        self.groups_output={}
-        self.groups_count={}
-        self.joints_output=[]
-        self.weights_output=[]
-        self.weights_count=0
-        self.vertex_weights={}
+        # contents of the current object, doubles so values are written
+        # as computed. Finished objects are streamed to the writer, if any
+        self.data=DMeshData('d')
+        self.writer=writer
         self.uvs_data:bpy.types.MeshUVLoop=None
         self.bone_indexes={}
-
-    def loadObject(self,obj:bpy.types.Object,apply_modifiers:bool):
-        depsgraph = bpy.context.evaluated_depsgraph_get()
-        if apply_modifiers:
-            self.ob_for_convert=obj.evaluated_get(depsgraph)
-        else:
-            self.ob_for_convert=obj.original
+        # vertex_group_elements of the current object, read once
+        self.group_elements=None
+
+    def flush(self):
+        """stream the data of the previous object out"""
+        # every exported object writes vertices first
+        if self.writer is None or not len(self.data.verts):
+            return
+        self.writer.add(self.data)
+        self.data=DMeshData('d')
+
+    def loadObject(self,obj:bpy.types.Object,session:ExportSession):
+        self.flush()
+        # the session owns the temporary mesh and clears it
+        self.ob_for_convert, self.mesh = session.to_mesh(obj)
+        self.group_elements=None
 
         self.mat:Matrix=obj.matrix_world
-        self.mesh:bpy.types.Mesh=self.ob_for_convert.to_mesh()
         self.vertices=self.mesh.vertices
         self.materials=self.mesh.materials
         self.polygons=self.mesh.polygons
 
-
-def func_export_mesh(operator,context,apply_modifiers,SELECTED_MATERIAL,ob:bpy.types.Object,dmesh:DMesh):
+    def index_uvs(self,uvs:np.ndarray):
+        """Index of every (n, 2) loop uv in the file uvs.
+
+        Equal uvs share one index across all the exported objects, uvs not
+        seen before are appended in order of first use and also returned.
+        """
+        local, first, inverse = np.unique(uv_keys(uvs), return_index=True,
+                                          return_inverse=True)
+        order = np.argsort(first)
+        local = local[order]
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+
+        # the first occurrence in (known, local) tells known uvs apart
+        known = len(self.unique_uvs)
+        merged = np.concatenate((uv_keys(self.unique_uvs), local))
+        _, merged_first, merged_inverse = np.unique(
+            merged, return_index=True, return_inverse=True)
+        index = merged_first[merged_inverse.reshape(-1)[known:]]
+        new = index >= known
+        index[new] = known + np.arange(np.count_nonzero(new))
+
+        new_uvs = uvs[first[order][new]]
+        self.unique_uvs = np.concatenate((self.unique_uvs, new_uvs))
+        return index[rank[inverse.reshape(-1)]], new_uvs
+
+
+def func_export_mesh(operator,context,session,SELECTED_MATERIAL,ob:bpy.types.Object,dmesh:DMesh):
     """write mesh data in dmesh object"""
     settings = 'PREVIEW'
     # XXX TO MESH
-    dmesh.loadObject(ob,apply_modifiers)
+    dmesh.loadObject(ob,session)
 
     material_index = -1
     dmesh.first_vertex_index = dmesh.base_vertex_index
@@ -67,26 +114,16 @@ def func_export_mesh(operator,context,apply_modifiers,SELECTED_MATERIAL,ob:bpy.t
 
     uvs_data=dmesh.uvs_data
     dmesh.vertex_map={}
-    dmesh.new_mesh_uvs = []
+    dmesh.new_mesh_uvs = np.empty((0, 2), dtype=np.float32)
 
     for n in range(len(dmesh.vertices)):
         dmesh.vertex_map[n] = dmesh.base_vertex_index + n
 
     if uvs_data is not None:
-        for n, uv in enumerate(uvs_data):
-            uv_pos = uv.uv
-            hashed_uv_pos=hashedN(uv_pos)
-            if hashed_uv_pos in dmesh.hashed_unique_uvs_pos:
-                idx = dmesh.hashed_unique_uvs_pos[hashed_uv_pos]["index"]
-
-            else:
-                idx = len(dmesh.hashed_unique_uvs_pos)
-                dmesh.hashed_unique_uvs_pos[hashed_uv_pos] ={
-                    "index":idx,
-                    "coordinate":uv_pos
-                }
-                dmesh.new_mesh_uvs.append(uv_pos)
-            dmesh.uvs_dict.append(idx)
+        # uvs are compared by value, not by hash
+        uvs = np.empty(len(uvs_data) * 2, dtype=np.float32)
+        uvs_data.foreach_get("uv", uvs)
+        dmesh.loop_uvs, dmesh.new_mesh_uvs = dmesh.index_uvs(uvs.reshape(-1, 2))
 
         dmesh.base_uv_index += len(uvs_data)
     dmesh.base_vertex_index += len(dmesh.vertices)
@@ -106,25 +143,22 @@ def func_export_vertices(file_format:str,dmesh:DMesh):
 
     vertex_count = dmesh.base_vertex_index - dmesh.first_vertex_index
     print("Exporting %d vertices" % vertex_count)
-    vertex_indexes = [0] * vertex_count
-    for key, value in dmesh.vertex_map.items():
-        vertex_indexes[value - dmesh.first_vertex_index] = key
-
-    for index in vertex_indexes:
-        v = dmesh.vertices[index]
-        co = dmesh.mat @ v.co
-        dmesh.vertex_output.append("\t\tvert %s %s %s;\n" % (d(-co.x), d(co.z), d(-co.y)))
+    # vertex_map keeps the mesh order, every vertex is written in turn
+    co = np.empty(vertex_count * 3, dtype=np.float32)
+    dmesh.vertices.foreach_get("co", co)
+    # world matrix and axis swap in a single transform
+    mat = DMESH_AXES @ np.array(dmesh.mat, dtype=np.float64)
+    co = co.reshape(-1, 3) @ mat[:3, :3].T + mat[:3, 3]
+    dmesh.data.verts.frombytes(co.tobytes())
 
     # Export UV map
     uv_count = dmesh.base_uv_index - dmesh.first_uv_index
     print("Exporting %d uvs" % uv_count)
-    uv_indexes = [-1] * uv_count
     if len(dmesh.mesh.uv_layers) >= 1:
-        for uv in dmesh.new_mesh_uvs:
-            uv_coord = Vector(uv)
-            if (file_format == 'H2'):
-                uv_coord = Vector((uv_coord.x, 1-uv_coord.y))
-            dmesh.uvs_output.append("\t\tuv %s %s;\n" % (d(uv_coord.x), d(uv_coord.y)))
+        uvs = dmesh.new_mesh_uvs.copy()
+        if (file_format == 'H2'):
+            uvs[:, 1] = 1 - uvs[:, 1]
+        dmesh.data.uvs.frombytes(uvs.astype(np.float64).tobytes())
 
     EXPORT_SMOOTH_GROUPS = False
     EXPORT_SMOOTH_GROUPS_BITFLAGS = True
@@ -137,118 +171,105 @@ def func_export_vertices(file_format:str,dmesh:DMesh):
     dmesh.smooth_groups=smooth_groups
     dmesh.smooth_groups_tot=smooth_groups_tot
 
+def face_group_name(dmesh:DMesh,material_index:int):
+    """dmesh group of an object material"""
+    if len(dmesh.materials) > 1:
+        group_name = dmesh.ob_for_convert.name + '_' + dmesh.materials[material_index].name
+    else:
+        group_name = dmesh.ob_for_convert.name
+
+    regex = re.compile('^[0-9]')
+    if regex.match(group_name):
+        group_name = 'x' + group_name
+    group_name = stripName(group_name)
+    return group_name[:NAME_LIMIT]
+
 def func_export_faces(    SELECTED_MATERIAL,dmesh:DMesh):
     """ write faces data in dmesh object"""
 
     #Export faces (by material)
-    current_material_index = -1
     if SELECTED_MATERIAL == '__ALL__':
-        current_material_index += 1
+        material_indexes = [0]
+    else:
+        material_indexes = range(len(dmesh.materials))
+
+    polygons = dmesh.polygons
+    polygon_count = len(polygons)
+    face_materials = np.empty(polygon_count, dtype=np.int32)
+    polygons.foreach_get("material_index", face_materials)
+    loop_starts = np.empty(polygon_count, dtype=np.int32)
+    polygons.foreach_get("loop_start", loop_starts)
+    loop_totals = np.empty(polygon_count, dtype=np.int32)
+    polygons.foreach_get("loop_total", loop_totals)
+    loop_verts = np.empty(len(dmesh.mesh.loops), dtype=np.int32)
+    dmesh.mesh.loops.foreach_get("vertex_index", loop_verts)
+    if dmesh.smooth_groups_tot:
+        smooth_groups = np.asarray(dmesh.smooth_groups, dtype=np.int32)
+    else:
+        smooth_groups = np.zeros(polygon_count, dtype=np.int32)
+
+    # faces sorted by material, polygon order kept within a material
+    order = np.argsort(face_materials, kind='stable')
+    sorted_materials = face_materials[order]
+    counts = loop_totals[order]
+    face_offsets = np.zeros(polygon_count + 1, dtype=np.int64)
+    np.cumsum(counts, out=face_offsets[1:])
+    # loops of every face written last to first
+    face_ends = np.repeat(loop_starts[order] + counts - 1, counts)
+    loops = face_ends - (np.arange(face_offsets[-1]) -
+                         np.repeat(face_offsets[:-1], counts))
+    face_verts = loop_verts[loops] + dmesh.first_vertex_index
+    if dmesh.uvs_data is not None:
+        face_uvs = dmesh.loop_uvs[loops]
+
+    group_name = None
+    for current_material_index in material_indexes:
         if dmesh.material_index != -1 and dmesh.material_index != current_material_index:
             return {"continue"}
-        count = 0
-        for polygon in dmesh.polygons:
-            if polygon.material_index == current_material_index:
-                count += 1
+        first, last = np.searchsorted(sorted_materials,
+                                      (current_material_index, current_material_index + 1))
+        count = last - first
         if count == 0:
             return {"continue"}
 
-        if len(dmesh.materials) > 1:
-            group_name = dmesh.ob_for_convert.name + '_' + dmesh.materials[current_material_index].name
-        else:
-            group_name = dmesh.ob_for_convert.name
-
-        regex = re.compile('^[0-9]')
-        if regex.match(group_name):
-            group_name = 'x' + group_name
-        group_name = stripName(group_name)
-        group_name = group_name[:NAME_LIMIT]
+        group_name = face_group_name(dmesh, current_material_index)
         #                if not group_name:
         #                    operator.report({'ERROR'}, "Mesh " + ob.name + ", no group name")
         #                    continue
         print("{} - {} faces".format(group_name,count))
-        if group_name in dmesh.groups_output:
-            group_output = dmesh.groups_output[group_name]
-        else:
-            group_output = []
-            dmesh.groups_count[group_name] = 0
-
-        for polygon in dmesh.polygons:
-            if polygon.material_index == current_material_index:
-                dmesh.groups_count[group_name] += 1
-                group_output.append("\t\t\tface\n\t\t\t{\n")
-                group_output.append("\t\t\t\tcount %d;\n" % len(polygon.vertices))
-                group_output.append("\t\t\t\tverts ")
-                for v in tuple(polygon.vertices)[::-1]:
-                    group_output.append(" %d" % dmesh.vertex_map[v])
-                group_output.append(";\n")
-                if dmesh.uvs_data is not None:
-                    group_output.append("\t\t\t\tuvs ")
-                    for v in tuple(polygon.loop_indices)[::-1]:
-                        group_output.append(" %d" % dmesh.uvs_dict[v + dmesh.first_uv_index])
-                    group_output.append(";\n")
-                if dmesh.smooth_groups_tot:
-                    group_output.append("\t\t\t\tsmoothGroup %d;\n\t\t\t}\n" % dmesh.smooth_groups[polygon.index])
-                else:
-                    group_output.append("\t\t\t\tsmoothGroup %d;\n\t\t\t}\n" % 0)
-        dmesh.groups_output[group_name] = group_output
-
-    else:
-
-        for mat in dmesh.materials:
-            current_material_index += 1
-            if dmesh.material_index != -1 and dmesh.material_index != current_material_index:
-                return {"continue"}
-            count = 0
-            for polygon in dmesh.polygons:
-                if polygon.material_index == current_material_index:
-                    count += 1
-            if count == 0:
-                return {"continue"}
-
-            if len(dmesh.materials) > 1:
-                group_name = dmesh.ob_for_convert.name + '_' + mat.name
-            else:
-                group_name = dmesh.ob_for_convert.name
-            regex = re.compile('^[0-9]')
-            if regex.match(group_name):
-                group_name = 'x' + group_name
-            group_name = stripName(group_name)
-            group_name = group_name[:NAME_LIMIT]
-
-            #                    if not group_name:
-            #                        operator.report({'ERROR'}, "Mesh " + ob.name + ", no group name")
-            #                        continue
-
-            print(group_name, 'count', count)
-            if group_name in dmesh.groups_output:
-                group_output = dmesh.groups_output[group_name]
-            else:
-                group_output = []
-                dmesh.groups_count[group_name] = 0
-
-            for polygon in dmesh.polygons:
-                if polygon.material_index == current_material_index:
-                    dmesh.groups_count[group_name] += 1
-                    group_output.append("\t\t\tface\n\t\t\t{\n")
-                    group_output.append("\t\t\t\tcount %d;\n" % len(polygon.vertices))
-                    group_output.append("\t\t\t\tverts ")
-                    for v in tuple(polygon.vertices)[::-1]:
-                        group_output.append(" %d" % dmesh.vertex_map[v])
-                    group_output.append(";\n")
-                    if dmesh.uvs_data is not None:
-                        group_output.append("\t\t\t\tuvs ")
-                        for v in tuple(polygon.loop_indices)[::-1]:
-                            group_output.append(" %d" % dmesh.uvs_dict[v + dmesh.first_uv_index])
-                        group_output.append(";\n")
-                    if dmesh.smooth_groups_tot:
-                        group_output.append("\t\t\t\tsmoothGroup %d;\n\t\t\t}\n" % dmesh.smooth_groups[polygon.index])
-                    else:
-                        group_output.append("\t\t\t\tsmoothGroup %d;\n\t\t\t}\n" % 0)
-            dmesh.groups_output[group_name] = group_output
-
+        group = dmesh.data.groups.get(group_name)
+        if group is None:
+            group = dmesh.data.groups[group_name] = DMeshGroup(group_name)
+
+        # the faces of a material are contiguous slices of the sorted arrays
+        loop_slice = slice(face_offsets[first], face_offsets[last])
+        group.face_counts.frombytes(counts[first:last].astype(np.intc).tobytes())
+        group.face_verts.frombytes(face_verts[loop_slice].astype(np.intc).tobytes())
+        if dmesh.uvs_data is not None:
+            group.face_uvs.frombytes(face_uvs[loop_slice].astype(np.intc).tobytes())
+        group.smooth_groups.frombytes(
+            smooth_groups[order[first:last]].astype(np.intc).tobytes())
+
+    if group_name is None:
+        return {"continue"}
     return {"group_name":group_name}
 
+def sorted_weights(vert_indices, bone_indices, weights):
+    """Weights of every vertex, heaviest first, normalized to sum 1.
+
+    Takes the vertex sorted arrays of vertex_group_weights, weights are
+    returned as doubles. Equal weights keep their vertex group order.
+    """
+    order = np.lexsort((-weights, vert_indices))
+    vert_indices = vert_indices[order]
+    bone_indices = bone_indices[order]
+    weights = weights[order].astype(np.float64)
+    # every vertex is a contiguous run, summed from its heaviest weight
+    starts = np.flatnonzero(np.diff(vert_indices, prepend=-1))
+    totals = np.add.reduceat(weights, starts) if len(starts) else weights
+    counts = np.diff(starts, append=len(weights))
+    return vert_indices, bone_indices, weights / np.repeat(totals, counts)
+
 def func_export_skeleton(operator,dmesh:DMesh):
     """ write skeleton data in dmesh object"""
     armature=dmesh.ob_for_convert.find_armature()
@@ -266,7 +287,8 @@ def func_export_skeleton(operator,dmesh:DMesh):
     bones = armature.data.bones
     mat = armature.matrix_world
 
-    dmesh.joints_output.append("\tjoints %d\n\t{\n" % len(bones))
+    # every object writes its own joints block
+    data = dmesh.data
     dmesh.bone_indexes = {}
     bone_index = 0
     r = Quaternion([0, 0, 1], -pi / 2)
@@ -281,10 +303,11 @@ def func_export_skeleton(operator,dmesh:DMesh):
         bone_name = boneRenameHaydee(bone.name)
 
         # print("Bone %s quaternion: %s" % (bone.name, bone.matrix.to_quaternion() @ r))
-        dmesh.joints_output.append("\t\tjoint %s\n\t\t{\n" % bone_name)
+        data.joint_names.append(bone_name)
+        data.joint_parents.append(None)
         if bone.parent:
             parent_name = boneRenameHaydee(bone.parent.name)
-            dmesh.joints_output.append("\t\t\tparent %s;\n" % parent_name)
+            data.joint_parents[-1] = parent_name
             q = (bone.parent.matrix_local.to_3x3().inverted() @ bone.matrix_local.to_3x3()).to_quaternion()
             q = Quaternion([q.w, -q.y, q.x, q.z])
             #print("%s head: %s parent head: %s" % (bone.name[:NAME_LIMIT], bone.head, bone.parent.head_local))
@@ -295,146 +318,258 @@ def func_export_skeleton(operator,dmesh:DMesh):
         head = Vector((head.x, head.z, head.y))
         q = Quaternion([-q.w, q.x, -q.z, q.y])
         q = Quaternion([q.x, q.y, q.z, q.w])
-        dmesh.joints_output.append("\t\t\torigin %s %s %s;\n" % (d(head.x), d(head.y), d(head.z)))
-        dmesh.joints_output.append("\t\t\taxis %s %s %s %s;\n" % (d(q.w), d(q.x), d(q.y), d(q.z)))
-        dmesh.joints_output.append("\t\t}\n")
-    dmesh.joints_output.append("\t}\n")
+        data.joint_origins.extend((head.x, head.y, head.z))
+        data.joint_axes.extend((q.w, q.x, q.y, q.z))
 
 
 
-    dmesh.vertex_weights = {}
     vertex_groups = dmesh.ob_for_convert.vertex_groups
-    invalid_weighting = False
-    for v in dmesh.vertices:
-        for g in v.groups:
-            group = vertex_groups[g.group]
-            if not (group.name[:NAME_LIMIT] in dmesh.bone_indexes):
-                continue
-            bone = dmesh.bone_indexes[group.name[:NAME_LIMIT]]
-            if v.index in dmesh.vertex_map:
-                if g.weight > 0:
-                    i = dmesh.vertex_map[v.index]
-                    if not (i in dmesh.vertex_weights):
-                        dmesh.vertex_weights[i] = []
-                    dmesh.vertex_weights[i].append((dmesh.vertex_map[v.index], bone, g.weight))
-    for i in sorted(dmesh.vertex_weights.keys()):
-        weight_list = dmesh.vertex_weights[i]
-        # sort bone names first?
-        # weight_list = sorted(weight_list, key=lambda bw: bw[1], reverse=True)
-        weight_list = sorted(weight_list, key=lambda bw: bw[2], reverse=True)
-        # if len(weight_list) > 4:
-        #    weight_list = weight_list[0:3]
-        sum = 0
-        for w in weight_list:
-            sum += w[2]
-        for w in weight_list:
-            normalized_weight = w[2] / sum
-            dmesh.weights_output.append("\t\tweight %d %d %s;\n" % (w[0], w[1], d(normalized_weight)))
-            dmesh.weights_count += 1
+    group_bones = [
+        dmesh.bone_indexes.get(group.name[:NAME_LIMIT])
+        for group in vertex_groups
+    ]
+    vert_indices, bone_indices, weights = sorted_weights(
+        *vertex_group_weights(dmesh.mesh, group_bones, dmesh.group_elements))
+    data.weight_verts.frombytes(
+        (vert_indices + dmesh.first_vertex_index).astype(np.intc).tobytes())
+    data.weight_bones.frombytes(bone_indices.astype(np.intc).tobytes())
+    data.weight_values.frombytes(weights.tobytes())
+
+
+def export_key(ob, ob_for_convert, mesh, options, group_elements=None):
+    """Hash of everything the dmesh text of an object depends on.
+
+    group_elements are the vertex_group_elements of the mesh, only given
+    when the skeleton is exported.
+    """
+    key = hashlib.blake2b(digest_size=16)
+    key.update(repr((ob.name, options)).encode())
+    key.update(np.array(ob.matrix_world, dtype=np.float64))
+    for collection, attr, width, dtype in (
+            (mesh.vertices, "co", 3, np.float32),
+            (mesh.loops, "vertex_index", 1, np.int32),
+            (mesh.polygons, "loop_start", 1, np.int32),
+            (mesh.polygons, "loop_total", 1, np.int32),
+            (mesh.polygons, "material_index", 1, np.int32),
+            (mesh.polygons, "use_smooth", 1, bool),
+            (mesh.edges, "vertices", 2, np.int32),
+            (mesh.edges, "use_edge_sharp", 1, bool),
+            (mesh.uv_layers[0].data, "uv", 2, np.float32)):
+        values = np.empty(len(collection) * width, dtype=dtype)
+        collection.foreach_get(attr, values)
+        key.update(values)
+    key.update(repr([mat.name if mat else None
+                     for mat in mesh.materials]).encode())
+
+    if group_elements is None:
+        return key.hexdigest()
+    key.update(repr([group.name
+                     for group in ob_for_convert.vertex_groups]).encode())
+    for values in group_elements:
+        key.update(values)
+
+    armature = ob_for_convert.find_armature()
+    if armature:
+        key.update(repr((armature.name, [
+            (bone.name, bone.parent.name if bone.parent else None)
+            for bone in armature.data.bones
+        ])).encode())
+        key.update(np.array(armature.matrix_world, dtype=np.float64))
+        for bone in armature.data.bones:
+            key.update(np.array(bone.matrix_local, dtype=np.float64))
+    return key.hexdigest()
+
+
+class ExportCache:
+    """Keys of the objects written to each file by the last exports.
+
+    Kept for the Blender session. An export is skipped when its keys match
+    and the file is still the one that was written.
+    """
 
+    def __init__(self):
+        # output file: (keys, stat, group name)
+        self.entries = {}
+        # (export filepath, object name): separate file last written for it
+        self.sources = {}
 
-def to_file(separate_files, filepath, group_name, dmesh:DMesh):
-    """write dmesh object data to file"""
+    def lookup(self, filepath, keys):
+        """group name of the cached export, None on a miss"""
+        entry = self.entries.get(filepath)
+        if entry is None or entry[0] != keys:
+            return None
+        keys, stat, group_name = entry
+        try:
+            if file_stat(filepath) != stat:
+                return None
+        except OSError:
+            return None
+        return group_name
 
-    if separate_files:
-        folder_path, basename = (os.path.split(filepath))
-        name, ext = (os.path.splitext(filepath))
-        filepath = os.path.join(folder_path, "{}{}".format(group_name, ext))
-
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write("HD_DATA_TXT 300\n\n")
-        f.write("mesh\n{\n")
-        f.write("\tverts %d\n\t{\n" % dmesh.base_vertex_index)
-        f.write("".join(dmesh.vertex_output))
-        f.write("\t}\n")
-        f.write("\tuvs %d\n\t{\n" % len(dmesh.hashed_unique_uvs_pos))
-        f.write("".join(dmesh.uvs_output))
-        f.write("\t}\n")
-        f.write("\tgroups %d\n\t{\n" % len(dmesh.groups_output))
-        for name, contents in dmesh.groups_output.items():
-            f.write("\t\tgroup %s %d\n\t\t{\n" % (name, dmesh.groups_count[name]))
-            f.write("".join(contents))
-            f.write("\t\t}\n")
-        f.write("\t}\n")
-        f.write("".join(dmesh.joints_output))
-        if dmesh.weights_count > 0:
-            f.write("\tweights %d\n\t{\n" % dmesh.weights_count)
-            f.write("".join(dmesh.weights_output))
-            f.write("\t}\n")
-        f.write("}\n")
+    def store(self, filepath, keys, group_name):
+        self.entries[filepath] = (keys, file_stat(filepath), group_name)
 
 
-def write_dmesh(operator, context, filepath, export_skeleton,
-                apply_modifiers, selected_only, separate_files,
-                ignore_hidden, SELECTED_MATERIAL, file_format):
+def file_stat(filepath):
+    stat = os.stat(filepath)
+    return (stat.st_size, stat.st_mtime_ns)
 
-    print("Exporting mesh, material: %s" % SELECTED_MATERIAL)
 
-    mesh_count = 0
-    for ob in context.scene.objects:
-        if ob.type == "MESH":
-            if SELECTED_MATERIAL == '__ALL__':
-                mesh_count += 1
-            else:
-                for n in range(len(ob.material_slots)):
-                    if ob.material_slots[n].name == SELECTED_MATERIAL:
-                        mesh_count += 1
-                        break
+EXPORT_CACHE = ExportCache()
 
+
+def export_objects(context, selected_only, ignore_hidden):
+    """mesh objects to export, by name"""
     if selected_only:
         list = context.selected_objects
         if len(list) == 0:
             list = context.scene.objects
     else:
         list = context.scene.objects
+    return sorted([ob for ob in list
+                   if ob.type == 'MESH' and not (ignore_hidden and ob.hide_viewport)],
+                  key=lambda ob: ob.name)
 
 
-    dmesh=DMesh()
-    group_name = None
+def separate_filepath(filepath, group_name):
+    """file of a group when exporting to separate files"""
+    folder_path, basename = (os.path.split(filepath))
+    name, ext = (os.path.splitext(filepath))
+    return os.path.join(folder_path, "{}{}".format(group_name, ext))
 
-    for ob in sorted([x for x in list if x.type == 'MESH'], key=lambda ob: ob.name):
-        if ob.type == "MESH":
 
-            if ignore_hidden and ob.hide_viewport:
-                continue
+def to_file(separate_files, filepath, group_name, dmesh:DMesh):
+    """write dmesh object data to file"""
 
-            if separate_files:
-                dmesh=DMesh()
+    if separate_files:
+        filepath = separate_filepath(filepath, group_name)
 
-            export_mesh_result = func_export_mesh(operator,context,apply_modifiers,SELECTED_MATERIAL,ob,dmesh)
-            if export_mesh_result == "continue":
-                continue
+    dmesh.flush()
+    dmesh.writer.write_file(filepath)
 
-            # NOTE Export vertices
-            if func_export_vertices(file_format,dmesh) == "continue":
-                continue
 
-            # NOTE Export faces (by material)
-            export_faces_return=func_export_faces(SELECTED_MATERIAL,dmesh)
-            if "continue" in export_faces_return:
-                continue
+def write_dmesh(operator, context, filepath, export_skeleton,
+                apply_modifiers, selected_only, separate_files,
+                ignore_hidden, SELECTED_MATERIAL, file_format, precision=6):
 
-            elif "group_name" in export_faces_return:
-                group_name=export_faces_return["group_name"]
+    print("Exporting mesh, material: %s" % SELECTED_MATERIAL)
 
-            # NOTE Export skeleton
-            if export_skeleton:
-                func_export_skeleton(operator,dmesh)
+    mesh_count = 0
+    for ob in context.scene.objects:
+        if ob.type == "MESH":
+            if SELECTED_MATERIAL == '__ALL__':
+                mesh_count += 1
+            else:
+                for n in range(len(ob.material_slots)):
+                    if ob.material_slots[n].name == SELECTED_MATERIAL:
+                        mesh_count += 1
+                        break
 
-            # clean up
-            dmesh.ob_for_convert.to_mesh_clear()
+    objects = export_objects(context, selected_only, ignore_hidden)
+    options = (file_format, precision, export_skeleton, SELECTED_MATERIAL,
+               apply_modifiers)
+    cache_hits = 0
+    cache_misses = 0
+
+    # only a single file streams through spill files, they are removed
+    # whatever path the export takes
+    with ExitStack() as stack:
+        writer = None
+        if not separate_files:
+            writer = stack.enter_context(DMeshWriter(precision))
+
+        # the depsgraph is evaluated once, temporary meshes are always cleared
+        with ExportSession(context, apply_modifiers) as session:
+            dmesh=DMesh(writer)
+            group_name = None
+            keys = []
+            # separate files are formatted and written in worker processes, only
+            # reading the objects has to happen here. The last object of a group
+            # name wins, like when the files were written in turn: None marks a
+            # file whose last object is the cached one
+            file_jobs = {}
+            file_sources = {}
+
+            for ob in objects:
+                if ob.type == "MESH":
+
+                    if separate_files:
+                        dmesh=DMesh()
+
+                    export_mesh_result = func_export_mesh(operator,context,session,SELECTED_MATERIAL,ob,dmesh)
+                    if export_mesh_result == "continue":
+                        continue
+
+                    if export_skeleton:
+                        dmesh.group_elements = vertex_group_elements(dmesh.mesh)
+                    key = export_key(ob, dmesh.ob_for_convert, dmesh.mesh, options,
+                                     dmesh.group_elements)
+                    keys.append(key)
+                    if separate_files:
+                        # only the object a file was last written for can reuse it
+                        object_filepath = EXPORT_CACHE.sources.get((filepath, ob.name))
+                        cached_name = object_filepath and EXPORT_CACHE.lookup(
+                            object_filepath, [(ob.name, key)])
+                        if cached_name is not None:
+                            cache_hits += 1
+                            group_name = cached_name
+                            file_jobs[object_filepath] = None
+                            file_sources.setdefault(object_filepath, []).append(ob.name)
+                            continue
+                        cache_misses += 1
+
+                    # NOTE Export vertices
+                    if func_export_vertices(file_format,dmesh) == "continue":
+                        continue
+
+                    # NOTE Export faces (by material)
+                    export_faces_return=func_export_faces(SELECTED_MATERIAL,dmesh)
+                    if "continue" in export_faces_return:
+                        continue
+
+                    elif "group_name" in export_faces_return:
+                        group_name=export_faces_return["group_name"]
+
+                    # NOTE Export skeleton
+                    if export_skeleton:
+                        func_export_skeleton(operator,dmesh)
+
+                if separate_files:
+                    object_filepath = separate_filepath(filepath, group_name)
+                    file_jobs[object_filepath] = (
+                        (object_filepath, dmesh_snapshot(dmesh.data), precision),
+                        [(ob.name, key)], group_name)
+                    file_sources.setdefault(object_filepath, []).append(ob.name)
 
         if separate_files:
-            to_file(separate_files, filepath, group_name, dmesh)
-
-    if not separate_files:
-        if dmesh.base_vertex_index == 0 or not group_name:
-            operator.report({'ERROR'}, "Nothing to export")
-            return {'FINISHED'}
-
-        to_file(separate_files, filepath, group_name, dmesh)
+            jobs = {object_filepath: job for object_filepath, job in file_jobs.items()
+                    if job is not None}
+            for _ in parse_files(dump_dmesh_snapshot_file,
+                                 [job for job, object_keys, object_group in jobs.values()]):
+                pass
+            for object_filepath, (job, object_keys, object_group) in jobs.items():
+                EXPORT_CACHE.store(object_filepath, object_keys, object_group)
+            for object_filepath, names in file_sources.items():
+                for name in names:
+                    EXPORT_CACHE.sources[(filepath, name)] = object_filepath
+        else:
+            if dmesh.base_vertex_index == 0 or not group_name:
+                operator.report({'ERROR'}, "Nothing to export")
+                return {'FINISHED'}
+
+            # the text of a single file depends on every object before, it is
+            # only reused as a whole. Everything is formatted either way, an
+            # unchanged file is just not written again
+            cached_name = EXPORT_CACHE.lookup(filepath, keys)
+            if cached_name is not None:
+                cache_hits = len(keys)
+            else:
+                cache_misses = len(keys)
+                to_file(separate_files, filepath, group_name, dmesh)
+                EXPORT_CACHE.store(filepath, keys, group_name)
 
-    operator.report({"INFO"}, f"Exported {group_name}")
+    operator.report({"INFO"}, "Exported %s (cache: %d hits, %d misses)" %
+                    (group_name, cache_hits, cache_misses))
     return {'FINISHED'}
 
 
@@ -452,6 +587,7 @@ class ExportHaydeeDMesh(Operator, ExportHelper):
     # List of operator properties, the attributes will be assigned
     # to the class instance from the operator settings before calling.
     file_format: file_format_prop
+    precision: precision_prop
 
     selected_only: BoolProperty(
         name="Selected only",
@@ -487,4 +623,4 @@ class ExportHaydeeDMesh(Operator, ExportHelper):
         return write_dmesh(self, context, self.filepath, self.export_skeleton,
                            self.apply_modifiers, self.selected_only,
                            self.separate_files, self.ignore_hidden,
-                           self.material, self.file_format)
+                           self.material, self.file_format, self.precision)
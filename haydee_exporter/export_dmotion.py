@@ -3,6 +3,7 @@ from bpy.types import Operator
 from bpy.props import *
 from bpy_extras.io_utils import ExportHelper
 from ..HaydeeUtils import *
+from ..haydee_formats.motion import MotionData, dump_dmot_file
 from mathutils import Quaternion, Vector
 from math import pi
 # --------------------------------------------------------------------------------
@@ -10,7 +11,7 @@ from math import pi
 # --------------------------------------------------------------------------------
 
 
-def write_dmot(operator, context, filepath):
+def write_dmot(operator, context, filepath, precision=6):
     armature = find_armature(operator, context)
     if armature is None:
         return {'FINISHED'}
@@ -20,10 +21,13 @@ def write_dmot(operator, context, filepath):
     previousFrame = bpy.context.scene.frame_current
     wm = bpy.context.window_manager
 
-    lines = {}
+    motion = MotionData('d')
+    motion.num_frames = keyframeCount
+    motion.frame_rate = context.scene.render.fps
+    tracks = {}
     for bone in bones:
         name = boneRenameHaydee(bone.name)
-        lines[name] = []
+        tracks[name] = motion.add_track(name)
 
     r = Quaternion([0, 0, 1], pi / 2)
     wm.progress_begin(0, keyframeCount)
@@ -44,26 +48,13 @@ def write_dmot(operator, context, filepath):
                 q = Quaternion([-q.z, -q.y, q.x, -q.w])
 
             name = boneRenameHaydee(bone.name)
-            lines[name].append("\t\tkey %s %s %s %s %s %s %s;\n" %
-                               (d(-head.x), d(head.y), d(-head.z), d(
-                                   q.x), d(q.w), d(q.y), d(q.z)))
+            tracks[name].extend(
+                (-head.x, head.y, -head.z, q.x, q.w, q.y, q.z))
     wm.progress_end()
 
     context.scene.frame_set(previousFrame)
 
-    f = open(filepath, 'w', encoding='utf-8')
-    f.write("HD_DATA_TXT 300\n\n")
-    f.write("motion\n{\n")
-    f.write("\tnumTracks %d;\n" % len(bones))
-    f.write("\tnumFrames %d;\n" % keyframeCount)
-    f.write("\tframeRate %g;\n" % context.scene.render.fps)
-    for bone in bones:
-        name = boneRenameHaydee(bone.name)
-        f.write("\ttrack %s\n\t{\n" % name)
-        f.write("".join(lines[name]))
-        f.write("\t}\n")
-    f.write("}\n")
-    f.close()
+    dump_dmot_file(filepath, motion, precision)
     return {'FINISHED'}
 
 
@@ -78,5 +69,7 @@ class ExportHaydeeDMotion(Operator, ExportHelper):
         maxlen=255,  # Max internal buffer length, longer would be clamped.
     )
 
+    precision: precision_prop
+
     def execute(self, context):
-        return write_dmot(self, context, self.filepath)
+        return write_dmot(self, context, self.filepath, self.precision)
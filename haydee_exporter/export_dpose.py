@@ -4,22 +4,21 @@ from bpy.types import Operator
 from bpy_extras.io_utils import ExportHelper
 from mathutils import Vector, Quaternion
 from ..HaydeeUtils import *
+from ..haydee_formats.pose import PoseData, dump_dpose_file
 
 # --------------------------------------------------------------------------------
 #  .dpose exporter
 # --------------------------------------------------------------------------------
 
 
-def write_dpose(operator, context, filepath):
+def write_dpose(operator, context, filepath, precision=6):
     armature = find_armature(operator, context)
     if armature is None:
         return {'FINISHED'}
 
     bones = armature.pose.bones
 
-    f = open(filepath, 'w', encoding='utf-8')
-    f.write("HD_DATA_TXT 300\n\n")
-    f.write("pose\n{\n\tnumTransforms %d;\n" % len(bones))
+    pose = PoseData('d')
     r = Quaternion([0, 0, 1], pi / 2)
     for bone in bones:
         head = bone.head.xzy
@@ -33,12 +32,11 @@ def write_dpose(operator, context, filepath):
                  @ bone.matrix.to_3x3()).to_quaternion()
             q = Quaternion([q.z, -q.y, q.x, -q.w])
 
-        f.write("\ttransform %s %s %s %s %s %s %s %s;\n" %
-                (boneRenameHaydee(bone.name), d(-head.x), d(
-                    head.y), d(-head.z), d(q.x), d(-q.w), d(q.y), d(q.z)))
+        pose.bone_names.append(boneRenameHaydee(bone.name))
+        pose.transforms.extend(
+            (-head.x, head.y, -head.z, q.x, -q.w, q.y, q.z))
 
-    f.write("}\n")
-    f.close()
+    dump_dpose_file(filepath, pose, precision)
     return {'FINISHED'}
 
 
@@ -53,5 +51,7 @@ class ExportHaydeeDPose(Operator, ExportHelper):
         maxlen=255,  # Max internal buffer length, longer would be clamped.
     )
 
+    precision: precision_prop
+
     def execute(self, context):
-        return write_dpose(self, context, self.filepath)
+        return write_dpose(self, context, self.filepath, self.precision)
@@ -4,22 +4,21 @@ from bpy.types import Operator
 from bpy_extras.io_utils import ExportHelper
 from mathutils import Vector, Quaternion
 from ..HaydeeUtils import *
+from ..haydee_formats.dskel import DSkelData, dump_dskel_file
 
 # ------------------------------------------------------------------------------
 #  .dskel exporter
 # ------------------------------------------------------------------------------
 
 
-def write_dskel(operator, context, filepath):
+def write_dskel(operator, context, filepath, precision=6):
     armature = find_armature(operator, context)
     if armature is None:
         return {'FINISHED'}
 
     bones = armature.data.bones
 
-    f = open(filepath, 'w', encoding='utf-8')
-    f.write("HD_DATA_TXT 300\n\n")
-    f.write("skeleton %d\n{\n" % len(bones))
+    skel = DSkelData('d')
     r = Quaternion([0, 0, 1], -pi / 2)
     for bone in bones:
         head = bone.head_local.xzy
@@ -30,25 +29,24 @@ def write_dskel(operator, context, filepath):
         bone_name = boneRenameHaydee(bone.name)
 
         bone_side = bone.length / 4
-        f.write("\tbone %s\n\t{\n" % bone_name)
-        f.write("\t\twidth %s;\n" % d(bone_side))
-        f.write("\t\theight %s;\n" % d(bone_side))
-        f.write("\t\tlength %s;\n" % d(bone.length))
+        skel.bone_names.append(bone_name)
+        skel.bone_parents.append(None)
+        skel.bone_widths.append(bone_side)
+        skel.bone_heights.append(bone_side)
+        skel.bone_lengths.append(bone.length)
 
         if bone.parent:
             parent_name = boneRenameHaydee(bone.parent.name)
-            f.write("\t\tparent %s;\n" % parent_name)
+            skel.bone_parents[-1] = parent_name
             head = bone.head_local
             head = Vector((head.x, head.z, head.y))
 
         head = Vector((-head.x, head.y, -head.z))
         q = Quaternion([q.x, q.z, q.y, q.w])
-        f.write("\t\torigin %s %s %s;\n" % (d(head.x), d(head.y), d(head.z)))
-        f.write("\t\taxis %s %s %s %s;\n" % (d(q.w), d(q.x), d(q.y), d(q.z)))
-        f.write("\t}\n")
+        skel.bone_origins.extend((head.x, head.y, head.z))
+        skel.bone_axes.extend((q.w, q.x, q.y, q.z))
 
-    f.write("}\n")
-    f.close()
+    dump_dskel_file(filepath, skel, precision)
     return {'FINISHED'}
 
 
@@ -63,5 +61,7 @@ class ExportHaydeeDSkel(Operator, ExportHelper):
         maxlen=255,  # Max internal buffer length, longer would be clamped.
     )
 
+    precision: precision_prop
+
     def execute(self, context):
-        return write_dskel(self, context, self.filepath)
+        return write_dskel(self, context, self.filepath, self.precision)
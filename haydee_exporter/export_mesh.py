@@ -0,0 +1,247 @@
+import os
+import bpy
+from math import pi
+from bpy.props import *
+from bpy.types import Operator
+from bpy_extras.io_utils import ExportHelper
+from mathutils import Quaternion
+import numpy as np
+from ..HaydeeUtils import *
+from ..haydee_formats.mesh import MeshData, dump_mesh_file
+from ..haydee_formats.skin import (SKIN_SLOTS, SkinData, dump_skin_file,
+                                   pack_bone_matrices, skin_influences)
+
+# --------------------------------------------------------------------------------
+#  .mesh/.skin exporter
+# --------------------------------------------------------------------------------
+
+# Bone orientation applied by read_skin, undone when writing bone matrices
+AXIS_ORIENT = Quaternion((1, 0, 0), -pi / 2).to_matrix().to_4x4()
+BONE_ORIENT = (Quaternion((0, 0, 1), pi / 2).to_matrix().to_4x4() @
+               Quaternion((0, 1, 0), -pi / 2).to_matrix().to_4x4())
+
+
+def foreach_array(collection, attr, count, width=1, dtype=np.float32):
+    values = np.empty(count * width, dtype=dtype)
+    collection.foreach_get(attr, values)
+    if width > 1:
+        return values.reshape(count, width)
+    return values
+
+
+def normalized(vectors):
+    lengths = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, lengths, out=np.zeros_like(vectors),
+                     where=lengths > 0)
+
+
+def mesh_arrays(mesh, matrix, file_format):
+    """Triangulated per vertex arrays of a mesh, in world space.
+
+    .mesh vertices hold a single uv and normal, mesh vertices are split
+    where their loops disagree. Returns the MeshData and the mesh vertex
+    each exported vertex comes from.
+    """
+    loopCount = len(mesh.loops)
+    uv_layer = mesh.uv_layers.active
+    try:
+        mesh.calc_tangents(uvmap=uv_layer.name)
+        has_tangents = True
+    except RuntimeError:
+        # only tris and quads have tangents, the normals are still needed
+        mesh.calc_normals_split()
+        has_tangents = False
+    mesh.calc_loop_triangles()
+
+    coords = foreach_array(mesh.vertices, 'co', len(mesh.vertices), 3)
+    loop_verts = foreach_array(mesh.loops, 'vertex_index', loopCount,
+                               dtype=np.int32)
+    normals = foreach_array(mesh.loops, 'normal', loopCount, 3)
+    uvs = foreach_array(uv_layer.data, 'uv', loopCount, 2)
+    tri_loops = foreach_array(mesh.loop_triangles, 'loops',
+                              len(mesh.loop_triangles) * 3, dtype=np.int32)
+    if (file_format == 'H2'):
+        uvs[:, 1] = 1 - uvs[:, 1]
+
+    # one exported vertex per distinct (vertex, uv, normal), in loop order
+    keys = np.empty(loopCount, dtype=[('vert', '<i4'), ('uv', '<f4', 2),
+                                      ('normal', '<f4', 3)])
+    keys['vert'] = loop_verts
+    keys['uv'] = uvs
+    keys['normal'] = normals
+    keys = keys.view(np.dtype((np.void, keys.dtype.itemsize)))
+    _, first, inverse = np.unique(keys, return_index=True,
+                                  return_inverse=True)
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    first = first[order]
+    loop_to_vert = rank[inverse.reshape(-1)]
+
+    world = np.array(matrix, dtype=np.float32)
+    normal_mat = np.array(matrix.to_3x3().inverted_safe().transposed(),
+                          dtype=np.float32)
+    data = MeshData()
+    data.verts = coords[loop_verts[first]] @ world[:3, :3].T + world[:3, 3]
+    data.normals = normalized(normals[first] @ normal_mat.T)
+    data.uvs = uvs[first]
+    data.faces = loop_to_vert[tri_loops].reshape(-1, 3)
+    if has_tangents:
+        tangents = foreach_array(mesh.loops, 'tangent', loopCount, 3)
+        bitangents = foreach_array(mesh.loops, 'bitangent', loopCount, 3)
+        data.tangents = normalized(tangents[first] @ world[:3, :3].T)
+        data.bitangents = normalized(bitangents[first] @ world[:3, :3].T)
+        mesh.free_tangents()
+    return data, loop_verts[first]
+
+
+def skin_bones(armature):
+    """Bone names and matrices of an armature, as read_skin expects them.
+
+    The bind pose includes the armature object transform, the exported
+    vertices are in world space too.
+    """
+    names = []
+    transforms = []
+    axis_inv = AXIS_ORIENT.inverted()
+    bone_inv = BONE_ORIENT.inverted()
+    for bone in armature.data.bones:
+        mat = axis_inv @ armature.matrix_world @ bone.matrix_local @ bone_inv
+        names.append(boneRenameHaydee(bone.name))
+        transforms.append(mat)
+    return names, pack_bone_matrices(np.array(transforms))
+
+
+def write_mesh(operator, context, filepath, selected_only, apply_modifiers,
+               export_skin, file_format):
+    if selected_only:
+        objs = context.selected_objects
+        if len(objs) == 0:
+            objs = context.scene.objects
+    else:
+        objs = context.scene.objects
+    objs = sorted([ob for ob in objs if ob.type == 'MESH'],
+                  key=lambda ob: ob.name)
+
+    armature = None
+    bone_indexes = {}
+    parts = []
+    with ExportSession(context, apply_modifiers) as session:
+        for ob in objs:
+            if export_skin and ob.find_armature():
+                if armature is None:
+                    armature = ob.find_armature()
+                    bone_indexes = {
+                        bone.name[:NAME_LIMIT]: idx
+                        for idx, bone in enumerate(armature.data.bones)
+                    }
+                elif ob.find_armature() != armature:
+                    operator.report(
+                        {'ERROR'},
+                        "Multiple armatures present, please select only one")
+                    return {'FINISHED'}
+
+            ob_for_convert, mesh = session.to_mesh(ob)
+            if not mesh.uv_layers:
+                operator.report({'ERROR'},
+                                "Mesh " + ob.name + " is missing UV information")
+                continue
+            print("Exporting mesh: %s" % ob.name)
+            data, source = mesh_arrays(mesh, ob.matrix_world, file_format)
+
+            skin = None
+            if armature is not None:
+                group_bones = [
+                    bone_indexes.get(group.name[:NAME_LIMIT])
+                    for group in ob.vertex_groups
+                ]
+                (weights, bones) = skin_influences(
+                    *vertex_group_weights(mesh, group_bones),
+                    len(mesh.vertices))
+                skin = (weights[source], bones[source])
+            parts.append((data, skin))
+
+    if not parts:
+        operator.report({'ERROR'}, "Nothing to export")
+        return {'FINISHED'}
+
+    meshes = [data for data, skin in parts]
+    mesh_data = MeshData()
+    mesh_data.verts = np.concatenate([data.verts for data in meshes])
+    mesh_data.uvs = np.concatenate([data.uvs for data in meshes])
+    mesh_data.normals = np.concatenate([data.normals for data in meshes])
+    if all(len(data.tangents) == len(data.verts) for data in meshes):
+        mesh_data.tangents = np.concatenate(
+            [data.tangents for data in meshes])
+        mesh_data.bitangents = np.concatenate(
+            [data.bitangents for data in meshes])
+    offsets = np.cumsum([0] + [len(data.verts) for data in meshes])
+    mesh_data.faces = np.concatenate(
+        [data.faces + offset for data, offset in zip(meshes, offsets)])
+    dump_mesh_file(filepath, mesh_data)
+    print("Exported %d vertices, %d faces" %
+          (len(mesh_data.verts), len(mesh_data.faces)))
+
+    if export_skin:
+        if armature is None:
+            operator.report({'WARNING'}, "No armature found, skin not exported")
+        elif len(armature.data.bones) > 256:
+            operator.report({'ERROR'}, "Skins are limited to 256 bones")
+        else:
+            skin_data = SkinData()
+            weights = []
+            bones = []
+            for data, skin in parts:
+                if skin is None:
+                    # meshes without armature get no influences
+                    shape = (len(data.verts), SKIN_SLOTS)
+                    skin = (np.zeros(shape, dtype=np.float32),
+                            np.zeros(shape, dtype=np.uint8))
+                weights.append(skin[0])
+                bones.append(skin[1])
+            skin_data.weights = np.concatenate(weights)
+            skin_data.bones = np.concatenate(bones)
+            skin_data.bone_names, skin_data.bone_matrices = \
+                skin_bones(armature)
+            skin_data.bone_vectors = np.zeros((len(skin_data.bone_names), 4),
+                                              dtype=np.float32)
+            dump_skin_file(os.path.splitext(filepath)[0] + '.skin', skin_data)
+
+    operator.report({"INFO"}, "Exported %s" % os.path.basename(filepath))
+    return {'FINISHED'}
+
+
+class ExportHaydeeMesh(Operator, ExportHelper):
+    bl_idname = "haydee_exporter.mesh"
+    bl_label = "Export Haydee mesh (.mesh)"
+    bl_options = {'REGISTER'}
+    filename_ext = ".mesh"
+    filter_glob: StringProperty(
+        default="*.mesh",
+        options={'HIDDEN'},
+        maxlen=255,  # Max internal buffer length, longer would be clamped.
+    )
+
+    file_format: file_format_prop
+
+    selected_only: BoolProperty(
+        name="Selected only",
+        description=
+        "Export only selected objects (if nothing is selected, full scene will be exported regardless of this setting)",
+        default=True,
+    )
+    apply_modifiers: BoolProperty(
+        name="Apply modifiers",
+        description="Apply modifiers before exporting",
+        default=True,
+    )
+    export_skin: BoolProperty(
+        name="Export skin",
+        description="Write vertex weights and bones to a .skin file next to the .mesh",
+        default=True,
+    )
+
+    def execute(self, context):
+        return write_mesh(self, context, self.filepath, self.selected_only,
+                          self.apply_modifiers, self.export_skin,
+                          self.file_format)
@@ -1,10 +1,12 @@
 from .export_dmesh import ExportHaydeeDMesh
+from .export_mesh import ExportHaydeeMesh
 from .export_dmotion import ExportHaydeeDMotion
 from .export_dpose import ExportHaydeeDPose
 from .export_dskel import ExportHaydeeDSkel
 
 _classes = [
     ExportHaydeeDMesh,
+    ExportHaydeeMesh,
     ExportHaydeeDMotion,
     ExportHaydeeDPose,
     ExportHaydeeDSkel,
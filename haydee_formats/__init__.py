@@ -0,0 +1,27 @@
+"""Readers and writers for the Haydee asset formats.
+
+Nothing here imports bpy, the addon operators only convert these plain
+data classes to and from Blender data. Outside of Blender, put the addon
+folder on sys.path and import haydee_formats.
+"""
+
+from .chunk import HDChunkFile
+from .common import (Signature, d, detect_encoding, find_encoding,
+                     format_floats, format_rows, open_text)
+from .dmesh import (DMeshData, DMeshGroup, DMeshWriter, parse_dmesh,
+                    parse_dmesh_file, dump_dmesh, dump_dmesh_file)
+from .dskel import (DSkelData, parse_dskel, parse_dskel_file, dump_dskel,
+                    dump_dskel_file)
+from .material import (MatType, MaterialData, parse_material,
+                       parse_material_file)
+from .mesh import (MeshData, parse_mesh, parse_mesh_file, dump_mesh,
+                   dump_mesh_file)
+from .motion import (MotionData, parse_motion, parse_motion_file, parse_dmot,
+                     parse_dmot_file, dump_dmot, dump_dmot_file)
+from .outfit import OutfitData, parse_outfit, parse_outfit_file
+from .pose import (PoseData, parse_pose, parse_pose_file, parse_dpose,
+                   parse_dpose_file, dump_dpose, dump_dpose_file)
+from .skel import SkelData, parse_skel, parse_skel_file
+from .skin import (SkinData, parse_skin, parse_skin_file, dump_skin,
+                   dump_skin_file, skin_influences, pack_bone_matrices,
+                   unpack_bone_matrices)
@@ -0,0 +1,99 @@
+from collections import namedtuple
+import struct
+from .common import (HD_CHUNK, Signature, SIGNATURE_SIZE, CHUNK_SIZE,
+                     readStrA_term, readStrW, sig_check)
+
+# --------------------------------------------------------------------------------
+# HD_CHUNK container
+# --------------------------------------------------------------------------------
+
+CHUNK_ENTRY = struct.Struct('<32siiii')
+CHUNK_COUNT = struct.Struct('<i')
+
+# offset is absolute, from the start of the file
+Chunk = namedtuple('Chunk', ['offset', 'size', 'num_subs', 'subs'])
+
+
+def pack_chunk_header(asset_type, size):
+    """Signature and chunk table of a file holding a single data block.
+
+    The table only has the root entry naming the asset type, size is the
+    size of the data block following it.
+    """
+    return (struct.pack('<20sII', HD_CHUNK, 1, size) +
+            CHUNK_ENTRY.pack(asset_type.encode('latin1'), size, 0, 0, 0))
+
+
+# Payload readers for the common chunk value types
+def read_int(payload):
+    return CHUNK_COUNT.unpack_from(payload)[0]
+
+
+def read_uint(payload):
+    return struct.unpack_from('<I', payload)[0]
+
+
+def read_float(payload):
+    return struct.unpack_from('<f', payload)[0]
+
+
+def read_wide_str(payload):
+    return readStrW(0, payload)[0]
+
+
+class HDChunkFile:
+    """Chunk index of an HD_CHUNK file, payloads are decoded on demand.
+
+    Only the chunk table is read when indexing, so the header and the
+    chunk sizes can be inspected without touching any payload. readers
+    maps chunk names to a function decoding their payload, the value is
+    decoded on first access and cached. The first entry of the table is
+    the asset itself, its name is the asset type.
+    """
+
+    def __init__(self, data, readers=None):
+        self.data = memoryview(data)
+        self.readers = readers or {}
+        self.chunks = {}
+        self.values = {}
+        self.asset_type = None
+        self.data_offset = SIGNATURE_SIZE
+
+        sig = sig_check(self.data)
+        self.signature = sig.name if sig else None
+        if (sig != Signature.HD_CHUNK):
+            return
+
+        entries = CHUNK_COUNT.unpack_from(self.data, 20)[0]
+        self.data_offset = SIGNATURE_SIZE + (entries * CHUNK_SIZE)
+        for x in range(entries):
+            sPos = SIGNATURE_SIZE + (x * CHUNK_SIZE)
+            (name, size, offset, numSubs,
+             subs) = CHUNK_ENTRY.unpack_from(self.data, sPos)
+            name = readStrA_term(0, 32, name)[0]
+            if (x == 0):
+                self.asset_type = name
+                continue
+            self.chunks[name] = Chunk(self.data_offset + offset, size,
+                                      numSubs, subs)
+
+    def __contains__(self, name):
+        """True if the chunk is present and not empty"""
+        chunk = self.chunks.get(name)
+        return chunk is not None and chunk.size > 0
+
+    def payload(self, name):
+        chunk = self.chunks[name]
+        return self.data[chunk.offset:chunk.offset + chunk.size]
+
+    def __getitem__(self, name):
+        if name not in self.values:
+            if name not in self:
+                raise KeyError(name)
+            self.values[name] = self.readers[name](self.payload(name))
+        return self.values[name]
+
+    def get(self, name, default=None):
+        if name not in self:
+            return default
+        return self[name]
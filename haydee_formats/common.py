@@ -0,0 +1,356 @@
+# <pep8 compliant>
+
+import codecs
+import io
+import mmap
+import struct
+from contextlib import contextmanager, suppress
+from enum import Enum
+
+import numpy as np
+
+
+# Global enum for asset type
+class Signature(Enum):
+    HD_CHUNK = 0
+    HD_DATA_TXT = 1
+    HD_DATA_TXT_BOM = 2
+    HD_MOTION = 3
+
+
+# Constants
+
+HD_CHUNK = b'\x48\x44\x5F\x43\x48\x55\x4E\x4B'
+HD_DATA_TXT = b'\x48\x44\x5F\x44\x41\x54\x41\x5F\x54\x58\x54'
+HD_DATA_TXT_BOM = b'\xFF\xFE\x48\x00\x44\x00\x5F\x00\x44\x00\x41\x00\x54\x00\x41\x00\x5F\x00\x54\x00\x58\x00\x54\x00'
+HD_MOTION = b'\x48\x44\x5F\x4D\x4F\x54\x49\x4F\x4E\x00'
+
+# HD_CHUNK layout, a signature followed by a table of chunk entries
+SIGNATURE_SIZE = 28
+CHUNK_SIZE = 48
+
+
+def decodeText(text):
+    return text.decode('latin1').split('\0', 1)[0]
+
+
+def d(number, precision=6):
+    r = '%.*f' % (precision, number)
+    if precision > 0:
+        r = r.rstrip('0').rstrip('.')
+    if r == "-0":
+        return "0"
+    return r
+
+
+# --------------------------------------------------------------------------------
+# batched d(), same text for whole arrays
+# --------------------------------------------------------------------------------
+
+# Scaled values below this are exact float64 integers
+EXACT_LIMIT = 2.0 ** 52
+POW10 = 10 ** np.arange(19, dtype=np.int64)
+
+
+def number_chars(values, precision):
+    """Characters of d(v, precision) for a float64 array.
+
+    Returns an (n, width) uint8 array of sign, integer digits, dot and
+    fraction digits, right aligned on the dot, and the mask of the
+    characters d() keeps. Scaled values must be below EXACT_LIMIT.
+    """
+    scaled = values * float(POW10[precision])
+    rounded = np.rint(scaled)
+    # the product is inexact, next to .5 the % operator rounds instead
+    near = (np.abs(scaled - np.floor(scaled) - 0.5) <=
+            np.abs(scaled) * 2.0 ** -50)
+    rounded = rounded.astype(np.int64)
+    for i in np.flatnonzero(near):
+        rounded[i] = int(('%.*f' % (precision, values[i])).replace('.', ''))
+
+    magnitude = np.abs(rounded)
+    int_part, frac_part = np.divmod(magnitude, POW10[precision])
+    int_digits = np.maximum(np.searchsorted(POW10, int_part, side='right'), 1)
+    int_width = int(int_digits.max()) if len(values) else 1
+
+    width = 2 + int_width + precision
+    chars = np.empty((len(values), width), dtype=np.uint8)
+    keep = np.empty((len(values), width), dtype=bool)
+    chars[:, 0] = ord('-')
+    keep[:, 0] = rounded < 0
+    # digits from the last one, trailing zeros of the fraction are dropped
+    dot = 1 + int_width
+    # int32 divides faster, it holds the fraction up to 9 decimals
+    if precision <= 9:
+        frac_part = frac_part.astype(np.int32)
+    trailing = np.ones(len(values), dtype=bool)
+    for col in range(dot + precision, dot, -1):
+        frac_part, digit = np.divmod(frac_part, 10)
+        chars[:, col] = digit
+        trailing &= digit == 0
+        keep[:, col] = ~trailing
+    chars[:, dot] = ord('.')
+    keep[:, dot] = ~trailing
+    for col in range(dot - 1, 0, -1):
+        int_part, digit = np.divmod(int_part, 10)
+        chars[:, col] = digit
+        keep[:, col] = int_digits >= dot - col
+    chars[:, 1:dot] += ord('0')
+    chars[:, dot + 1:] += ord('0')
+    return chars, keep
+
+
+def format_rows(values, row, width, precision=6):
+    """row % (width values) for every row of a float array, joined.
+
+    The text is the same as formatting each value with d(), the rows are
+    assembled as one character matrix instead of one string per value.
+    """
+    values = np.asarray(values, dtype=np.float64).reshape(-1, width)
+    # inf, nan and values too large for exact integer digits use d()
+    with np.errstate(over='ignore', invalid='ignore'):
+        special = ~(np.abs(values) * float(POW10[precision]) < EXACT_LIMIT)
+    special = special.any(axis=1)
+    normal = values[~special]
+
+    count = len(normal)
+    chars, keep = number_chars(normal.reshape(-1), precision)
+    field = chars.shape[1]
+    chars = chars.reshape(count, width, field)
+    keep = keep.reshape(count, width, field)
+    texts = [np.frombuffer(t.encode(), dtype=np.uint8)
+             for t in row.split('%s')]
+    total = sum(len(t) for t in texts) + width * field
+    out = np.empty((count, total), dtype=np.uint8)
+    mask = np.ones((count, total), dtype=bool)
+    pos = 0
+    for col in range(width + 1):
+        out[:, pos:pos + len(texts[col])] = texts[col]
+        pos += len(texts[col])
+        if col == width:
+            break
+        out[:, pos:pos + field] = chars[:, col]
+        mask[:, pos:pos + field] = keep[:, col]
+        pos += field
+    text = out[mask].tobytes()
+
+    special = np.flatnonzero(special)
+    if len(special):
+        # splice the special rows back between the normal ones
+        ends = np.concatenate(([0], np.cumsum(mask.sum(axis=1))))
+        pieces = []
+        start = 0
+        for k, r in enumerate(special.tolist()):
+            end = int(ends[r - k])
+            pieces.append(text[start:end])
+            pieces.append((row % tuple(d(v, precision)
+                                       for v in values[r].tolist())).encode())
+            start = end
+        pieces.append(text[start:])
+        text = b''.join(pieces)
+    return text.decode()
+
+
+def format_floats(values, precision=6):
+    """d(v, precision) of every value of a float array, as a list"""
+    return format_rows(values, '%s\n', 1, precision).split('\n')[:-1]
+
+
+# Rows formatted per write by write_rows
+ROWS_PER_WRITE = 4096
+
+
+def write_rows(a_file, row, values, width, precision=6):
+    """Write row % (width values) for every row of a flat float array.
+
+    Rows are formatted a block at a time with format_rows, the blocks
+    keep the temporary character matrices small.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    block = ROWS_PER_WRITE * width
+    for start in range(0, len(values), block):
+        a_file.write(format_rows(values[start:start + block], row, width,
+                                 precision))
+
+
+# --------------------------------------------------------------------------------
+# binary helpers
+# --------------------------------------------------------------------------------
+
+
+def sig_check(mview):
+    result = None
+    if (mview[0:8] == (HD_CHUNK)):
+        result = Signature.HD_CHUNK
+    elif (mview[0:11] == (HD_DATA_TXT)):
+        result = Signature.HD_DATA_TXT
+    elif (mview[0:24] == (HD_DATA_TXT_BOM)):
+        result = Signature.HD_DATA_TXT_BOM
+    elif (mview[0:10] == (HD_MOTION)):
+        result = Signature.HD_MOTION
+    return result
+
+
+# Read prefixed ANSI/utf8-as-ansi string
+def readStrA(start, data):
+    len = int.from_bytes(data[start:start + 4], byteorder='little')
+    start += 4
+    return (data[start:start + len].decode("utf-8"), 4 + len + 1)
+
+
+# Read property name (until null terminator)
+def readStrA_term(start, maxLen, data):
+    data = bytes(data[start:start + maxLen + 1])
+    i = data.find(b'\0')
+    if (i < 0):
+        return ("", maxLen)
+    return (data[:i].decode("latin"), i)
+
+
+# Read UTF16/wide string
+def readStrW(start, data):
+    i = int.from_bytes(data[start:start + 4], byteorder='little')
+    len = (i * 2)
+    start += 4
+    return (codecs.decode(data[start:start + len], "utf-16-le"), 4 + len + 2)
+
+
+@contextmanager
+def map_file(filepath):
+    """Map a binary asset read only, pages are read when first touched.
+
+    Decoders must copy what they keep, views into the map don't outlive it.
+    """
+    with open(filepath, 'rb') as a_file:
+        try:
+            data = mmap.mmap(a_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty files can't be mapped
+            data = None
+        if data is None:
+            yield b''
+            return
+        try:
+            yield data
+        except BaseException:
+            # the traceback of a failed decode may still view the map, it
+            # is then released along with the view
+            with suppress(BufferError):
+                data.close()
+            raise
+        # a view left after a successful decode is a bug of the decoder
+        data.close()
+
+
+# --------------------------------------------------------------------------------
+# text helpers
+# --------------------------------------------------------------------------------
+
+
+def stripLine(line):
+    return line.strip().strip(';')
+
+
+def read_text_signature(lines):
+    """First token of an HD_DATA_TXT file, None if it is empty"""
+    tokens = stripLine(next(lines, '')).split()
+    return tokens[0] if tokens else None
+
+
+def text_tokens(lines, maxsplit=-1):
+    """Yield (level, tokens) for every non empty line.
+
+    level is the block nesting depth, updated by the '{' and '}' lines
+    themselves before they are yielded.
+    """
+    level = 0
+    for line in lines:
+        tokens = stripLine(line).split(maxsplit=maxsplit)
+        if not tokens:
+            continue
+        if (tokens[0] == '{'):
+            level += 1
+        elif (tokens[0] == '}'):
+            level -= 1
+        yield level, tokens
+
+
+def remap_indices(indices):
+    """Compact global indices into a local 0..n-1 range.
+
+    Returns the unique indices in order of first appearance and the local
+    index of every element of `indices`.
+    """
+    unique, first, inverse = np.unique(indices, return_index=True,
+                                       return_inverse=True)
+    order = np.argsort(first)
+    local = np.empty_like(order)
+    local[order] = np.arange(len(order))
+    return unique[order], local[inverse.reshape(-1)]
+
+
+def reversed_loop_order(face_counts):
+    """Index array that reverses the winding of every face in a flat loop
+    array (faces stored one after another, face_counts loops each).
+    """
+    counts = np.asarray(face_counts, dtype=np.int64)
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    loop_count = int(ends[-1]) if len(ends) else 0
+    return (np.repeat(starts + ends - 1, counts) -
+            np.arange(loop_count, dtype=np.int64))
+
+
+# Bytes sampled to guess the encoding of a text asset
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+# utf-32 first, its little endian BOM starts with the utf-16 one
+TEXT_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+def detect_encoding(data) -> str:
+    """Guess the encoding of a text asset from its first bytes.
+
+    A BOM or a plain HD_DATA_TXT signature followed by valid utf-8 settles
+    it, charset_normalizer only looks at the sample when they don't.
+    """
+    data = bytes(data[:ENCODING_SAMPLE_SIZE])
+    for bom, encoding in TEXT_BOMS:
+        if data.startswith(bom):
+            return encoding
+    if data.startswith(HD_DATA_TXT):
+        try:
+            # not final, the sample may end in the middle of a character
+            codecs.getincrementaldecoder('utf-8')().decode(data, final=False)
+            return 'utf-8'
+        except UnicodeDecodeError:
+            pass
+    import charset_normalizer
+    return charset_normalizer.detect(data)['encoding']
+
+
+def find_encoding(filepath) -> str:
+    """Find File enoding from a bounded sample of its first bytes"""
+    with open(filepath, 'rb') as f:
+        return detect_encoding(f.read(ENCODING_SAMPLE_SIZE))
+
+
+def open_text(filepath, errors=None):
+    """Open a text asset for reading with its detected encoding.
+
+    The sample used for the detection is peeked from the file buffer, the
+    text reader then consumes those same bytes instead of reading them again.
+    """
+    a_file = open(filepath, 'rb', buffering=ENCODING_SAMPLE_SIZE)
+    try:
+        encoding = detect_encoding(a_file.peek(ENCODING_SAMPLE_SIZE))
+        return io.TextIOWrapper(a_file, encoding=encoding, errors=errors)
+    except BaseException:
+        a_file.close()
+        raise
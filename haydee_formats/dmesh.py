@@ -0,0 +1,481 @@
+from array import array
+import io
+import tempfile
+import numpy as np
+from .common import (ROWS_PER_WRITE, d, format_floats, open_text,
+                     stripLine, write_rows)
+
+# --------------------------------------------------------------------------------
+# HD_DATA_TXT .dmesh tokenizer
+# --------------------------------------------------------------------------------
+
+
+class DMeshGroup:
+    """Faces of a single dmesh group stored as flat typed arrays"""
+
+    def __init__(self, name):
+        self.name = name
+        self.face_counts = array('i')
+        self.face_verts = array('i')
+        self.face_uvs = array('i')
+        self.smooth_groups = array('i')
+
+    def faces(self):
+        return split_faces(self.face_counts, self.face_verts)
+
+    def uv_faces(self):
+        return split_faces(self.face_counts, self.face_uvs)
+
+
+class DMeshData:
+    """.dmesh contents. Vectors are flattened (x y z x y z ...)
+
+    float_type is the typecode of the float arrays, the exporter keeps
+    doubles so values are written exactly as they were computed.
+    """
+
+    def __init__(self, float_type='f'):
+        self.signature = None
+        self.verts = array(float_type)
+        self.uvs = array(float_type)
+        self.groups = {}
+        self.joint_names = []
+        self.joint_parents = []
+        self.joint_origins = array(float_type)
+        self.joint_axes = array(float_type)
+        self.weight_verts = array('i')
+        self.weight_bones = array('i')
+        self.weight_values = array(float_type)
+
+
+def split_faces(counts, flat):
+    start = 0
+    for count in counts:
+        yield tuple(flat[start:start + count])
+        start += count
+
+
+class DMeshTokenizer:
+    """Single pass HD_DATA_TXT tokenizer.
+
+    Every line is split once and dispatched on its first token, values are
+    appended straight into the typed arrays of a DMeshData. line is the
+    line being dispatched, for handlers that need its raw text. The vert,
+    uv and weight sections hold most of a file, their rows are collected
+    and converted with one numpy call instead.
+    """
+
+    def __init__(self):
+        self.data = DMeshData()
+        self.lines = None
+        self.line = None
+        self.level = 0
+        self.group = None
+        self.count_end = None
+        self.dispatch = {
+            '{': self.open_block,
+            '}': self.close_block,
+            'vert': self.read_vert,
+            'uv': self.read_uv,
+            'group': self.read_group,
+            'count': self.read_count,
+            'verts': self.read_face_verts,
+            'uvs': self.read_face_uvs,
+            'smoothGroup': self.read_smooth_group,
+            'joint': self.read_joint,
+            'parent': self.read_parent,
+            'origin': self.read_origin,
+            'axis': self.read_axis,
+            'weight': self.read_weight,
+            'weights': self.read_weights,
+        }
+
+    def parse(self, lines):
+        # handlers of section headers read their rows from self.lines
+        self.lines = lines = iter(lines)
+        data = self.data
+        tokens = next(lines, '').rstrip(' \t\r\n;').split()
+        data.signature = tokens[0] if tokens else None
+        if data.signature != 'HD_DATA_TXT':
+            return data
+
+        for line in lines:
+            self.feed(line)
+        return data
+
+    def feed(self, line):
+        tokens = line.rstrip(' \t\r\n;').split()
+        if tokens:
+            handler = self.dispatch.get(tokens[0])
+            if handler:
+                self.line = line
+                handler(tokens)
+
+    def read_rows(self, width):
+        """Rows of the block after a section header, as an (n, width) array.
+
+        The block is read up to its closing brace and its rows converted
+        with one loadtxt call. None if they don't parse that way, the block
+        has then been fed line by line.
+        """
+        block = []
+        for line in self.lines:
+            block.append(line)
+            if '}' in line:
+                break
+        rows = block[1:-1]
+        if len(block) >= 2 and block[0].strip() == '{' and \
+                block[-1].strip() == '}':
+            if not rows:
+                return np.empty((0, width))
+            try:
+                # ';' ends the values of a row
+                return np.loadtxt(rows, usecols=range(1, width + 1),
+                                  comments=';', ndmin=2)
+            except ValueError:
+                pass
+        for line in block:
+            self.feed(line)
+        return None
+
+    def open_block(self, tokens):
+        self.level += 1
+
+    def close_block(self, tokens):
+        self.level -= 1
+
+    def read_verts(self):
+        rows = self.read_rows(3)
+        if rows is not None:
+            self.data.verts.frombytes(rows.astype(np.float32).tobytes())
+
+    def read_uvs(self):
+        rows = self.read_rows(2)
+        if rows is not None:
+            self.data.uvs.frombytes(rows.astype(np.float32).tobytes())
+
+    def read_weights(self, tokens):
+        if self.level != 1:
+            return
+        rows = self.read_rows(3)
+        if rows is not None:
+            data = self.data
+            indices = rows[:, :2].astype(np.intc)
+            data.weight_verts.frombytes(indices[:, 0].tobytes())
+            data.weight_bones.frombytes(indices[:, 1].tobytes())
+            data.weight_values.frombytes(
+                rows[:, 2].astype(np.float32).tobytes())
+
+    def read_vert(self, tokens):
+        self.data.verts.extend(map(float, tokens[1:4]))
+
+    def read_uv(self, tokens):
+        self.data.uvs.extend(map(float, tokens[1:3]))
+
+    def read_group(self, tokens):
+        if self.level >= 2:
+            self.group = DMeshGroup(tokens[1])
+            self.data.groups[self.group.name] = self.group
+
+    def read_count(self, tokens):
+        if self.level >= 3:
+            self.count_end = int(tokens[1]) + 1
+
+    def read_face_verts(self, tokens):
+        # 'verts <n>' at level 1 is the section header
+        if self.level == 1:
+            self.read_verts()
+        elif self.level >= 3:
+            values = tokens[1:self.count_end]
+            self.group.face_counts.append(len(values))
+            self.group.face_verts.extend(map(int, values))
+
+    def read_face_uvs(self, tokens):
+        if self.level == 1:
+            self.read_uvs()
+        elif self.level >= 3:
+            self.group.face_uvs.extend(map(int, tokens[1:self.count_end]))
+
+    def read_smooth_group(self, tokens):
+        if self.level >= 3:
+            self.group.smooth_groups.append(int(tokens[1]))
+
+    def read_joint(self, tokens):
+        if self.level >= 2:
+            self.data.joint_names.append(tokens[1])
+            self.data.joint_parents.append(None)
+
+    def read_parent(self, tokens):
+        if self.level >= 3:
+            # names may hold runs of whitespace, keep the rest of the line
+            self.data.joint_parents[-1] = stripLine(self.line).split(None, 1)[1]
+
+    def read_origin(self, tokens):
+        if self.level >= 3:
+            self.data.joint_origins.extend(map(float, tokens[1:4]))
+
+    def read_axis(self, tokens):
+        if self.level >= 3:
+            self.data.joint_axes.extend(map(float, tokens[1:5]))
+
+    def read_weight(self, tokens):
+        if self.level >= 2:
+            data = self.data
+            data.weight_verts.append(int(tokens[1]))
+            data.weight_bones.append(int(tokens[2]))
+            data.weight_values.append(float(tokens[3]))
+
+
+def parse_dmesh(lines):
+    """Parse an iterable of .dmesh text lines (usually the open file)"""
+    return DMeshTokenizer().parse(lines)
+
+
+def parse_dmesh_file(filepath, encoding=None):
+    if encoding is None:
+        with open_text(filepath) as a_file:
+            return parse_dmesh(a_file)
+    with open(filepath, "r", encoding=encoding) as a_file:
+        return parse_dmesh(a_file)
+
+
+# --------------------------------------------------------------------------------
+# HD_DATA_TXT .dmesh writer
+# --------------------------------------------------------------------------------
+
+
+def write_faces(a_file, group):
+    """Write the face blocks of a DMeshGroup"""
+    has_uvs = len(group.face_uvs) == len(group.face_verts)
+    faces = group.faces()
+    uv_faces = group.uv_faces() if has_uvs else None
+    for face, smooth_group in zip(faces, group.smooth_groups):
+        a_file.write("\t\t\tface\n\t\t\t{\n")
+        a_file.write("\t\t\t\tcount %d;\n" % len(face))
+        a_file.write("\t\t\t\tverts %s;\n" %
+                     "".join(" %d" % v for v in face))
+        if has_uvs:
+            a_file.write("\t\t\t\tuvs %s;\n" %
+                         "".join(" %d" % v for v in next(uv_faces)))
+        a_file.write("\t\t\t\tsmoothGroup %d;\n\t\t\t}\n" % smooth_group)
+
+
+def write_joints(a_file, dmesh, precision=6):
+    """Write the joints block of a DMeshData"""
+    origins = dmesh.joint_origins
+    axes = dmesh.joint_axes
+    a_file.write("\tjoints %d\n\t{\n" % len(dmesh.joint_names))
+    for idx, name in enumerate(dmesh.joint_names):
+        a_file.write("\t\tjoint %s\n\t\t{\n" % name)
+        parent = dmesh.joint_parents[idx]
+        if parent:
+            a_file.write("\t\t\tparent %s;\n" % parent)
+        a_file.write("\t\t\torigin %s %s %s;\n" %
+                     tuple(d(v, precision)
+                           for v in origins[idx * 3:idx * 3 + 3]))
+        a_file.write("\t\t\taxis %s %s %s %s;\n" %
+                     tuple(d(v, precision)
+                           for v in axes[idx * 4:idx * 4 + 4]))
+        a_file.write("\t\t}\n")
+    a_file.write("\t}\n")
+
+
+def write_weights(a_file, dmesh, precision=6):
+    """Write the weight lines of a DMeshData"""
+    weight_count = len(dmesh.weight_verts)
+    weights = format_floats(dmesh.weight_values, precision)
+    # one % per block of rows, like write_rows
+    for start in range(0, weight_count, ROWS_PER_WRITE):
+        end = min(start + ROWS_PER_WRITE, weight_count)
+        values = [None] * (3 * (end - start))
+        values[0::3] = dmesh.weight_verts[start:end]
+        values[1::3] = dmesh.weight_bones[start:end]
+        values[2::3] = weights[start:end]
+        a_file.write(("\t\tweight %d %d %s;\n" * (end - start)) %
+                     tuple(values))
+
+
+def dump_dmesh(a_file, dmesh, precision=6):
+    """Write a DMeshData to an open text file"""
+    a_file.write("HD_DATA_TXT 300\n\n")
+    a_file.write("mesh\n{\n")
+
+    verts = dmesh.verts
+    a_file.write("\tverts %d\n\t{\n" % (len(verts) // 3))
+    write_rows(a_file, "\t\tvert %s %s %s;\n", verts, 3, precision)
+    a_file.write("\t}\n")
+
+    uvs = dmesh.uvs
+    a_file.write("\tuvs %d\n\t{\n" % (len(uvs) // 2))
+    write_rows(a_file, "\t\tuv %s %s;\n", uvs, 2, precision)
+    a_file.write("\t}\n")
+
+    a_file.write("\tgroups %d\n\t{\n" % len(dmesh.groups))
+    for name, group in dmesh.groups.items():
+        a_file.write("\t\tgroup %s %d\n\t\t{\n" %
+                     (name, len(group.face_counts)))
+        write_faces(a_file, group)
+        a_file.write("\t\t}\n")
+    a_file.write("\t}\n")
+
+    if dmesh.joint_names:
+        write_joints(a_file, dmesh, precision)
+
+    weight_count = len(dmesh.weight_verts)
+    if weight_count > 0:
+        a_file.write("\tweights %d\n\t{\n" % weight_count)
+        write_weights(a_file, dmesh, precision)
+        a_file.write("\t}\n")
+    a_file.write("}\n")
+
+
+def dump_dmesh_file(filepath, dmesh, precision=6):
+    with open(filepath, 'w', encoding='utf-8') as a_file:
+        dump_dmesh(a_file, dmesh, precision)
+
+
+def dmesh_snapshot(dmesh):
+    """Contents of a DMeshData as builtin containers.
+
+    The exporter passes snapshots to worker processes, those import the
+    standalone haydee_formats modules and could not unpickle the classes
+    of the addon package.
+    """
+    snapshot = dict(vars(dmesh))
+    snapshot['groups'] = {
+        name: dict(vars(group))
+        for name, group in dmesh.groups.items()
+    }
+    return snapshot
+
+
+def dmesh_from_snapshot(snapshot):
+    dmesh = DMeshData()
+    vars(dmesh).update(snapshot)
+    dmesh.groups = {}
+    for name, values in snapshot['groups'].items():
+        group = dmesh.groups[name] = DMeshGroup(name)
+        vars(group).update(values)
+    return dmesh
+
+
+def dump_dmesh_snapshot_file(filepath, snapshot, precision=6):
+    dump_dmesh_file(filepath, dmesh_from_snapshot(snapshot), precision)
+
+
+# Bytes copied per read from a spill file
+SPILL_COPY_SIZE = 1 << 20
+
+
+def spill_file():
+    return tempfile.TemporaryFile('w+', encoding='utf-8', newline='')
+
+
+def spill_position(spill):
+    spill.flush()
+    return spill.buffer.tell()
+
+
+def copy_spill(a_file, spill, start=0, end=None):
+    """Copy text written to a spill file between two spill_position"""
+    if end is None:
+        end = spill_position(spill)
+    spill.flush()
+    spill.buffer.seek(start)
+    while start < end:
+        chunk = spill.buffer.read(min(SPILL_COPY_SIZE, end - start))
+        a_file.write(chunk.decode('utf-8'))
+        start += len(chunk)
+    spill.buffer.seek(0, io.SEEK_END)
+
+
+class DMeshWriter:
+    """Streams a .dmesh out a DMeshData at a time.
+
+    add() formats every section of a DMeshData into temporary spill files
+    right away, the data can be dropped afterwards and only the counts are
+    kept. write() puts the header counts and the spilled sections together,
+    with the text dump_dmesh writes for the merged data. Groups of the same
+    name are merged. Joints are small and kept in memory, every add() with
+    joints gets its own joints block, one per exported object.
+    """
+
+    def __init__(self, precision=6):
+        self.precision = precision
+        self.verts = spill_file()
+        self.vert_count = 0
+        self.uvs = spill_file()
+        self.uv_count = 0
+        self.faces = spill_file()
+        # group name -> [face count, spans of its faces in self.faces]
+        self.groups = {}
+        self.joints = []
+        self.weights = spill_file()
+        self.weight_count = 0
+
+    def add(self, dmesh):
+        write_rows(self.verts, "\t\tvert %s %s %s;\n", dmesh.verts, 3,
+                   self.precision)
+        self.vert_count += len(dmesh.verts) // 3
+        write_rows(self.uvs, "\t\tuv %s %s;\n", dmesh.uvs, 2,
+                   self.precision)
+        self.uv_count += len(dmesh.uvs) // 2
+
+        for name, group in dmesh.groups.items():
+            entry = self.groups.setdefault(name, [0, []])
+            start = spill_position(self.faces)
+            write_faces(self.faces, group)
+            entry[0] += len(group.face_counts)
+            entry[1].append((start, spill_position(self.faces)))
+
+        if dmesh.joint_names:
+            joints = DMeshData(dmesh.joint_origins.typecode)
+            joints.joint_names = list(dmesh.joint_names)
+            joints.joint_parents = list(dmesh.joint_parents)
+            joints.joint_origins = dmesh.joint_origins[:]
+            joints.joint_axes = dmesh.joint_axes[:]
+            self.joints.append(joints)
+
+        write_weights(self.weights, dmesh, self.precision)
+        self.weight_count += len(dmesh.weight_verts)
+
+    def write(self, a_file):
+        a_file.write("HD_DATA_TXT 300\n\n")
+        a_file.write("mesh\n{\n")
+        a_file.write("\tverts %d\n\t{\n" % self.vert_count)
+        copy_spill(a_file, self.verts)
+        a_file.write("\t}\n")
+        a_file.write("\tuvs %d\n\t{\n" % self.uv_count)
+        copy_spill(a_file, self.uvs)
+        a_file.write("\t}\n")
+
+        a_file.write("\tgroups %d\n\t{\n" % len(self.groups))
+        for name, (face_count, spans) in self.groups.items():
+            a_file.write("\t\tgroup %s %d\n\t\t{\n" % (name, face_count))
+            for start, end in spans:
+                copy_spill(a_file, self.faces, start, end)
+            a_file.write("\t\t}\n")
+        a_file.write("\t}\n")
+
+        for joints in self.joints:
+            write_joints(a_file, joints, self.precision)
+
+        if self.weight_count > 0:
+            a_file.write("\tweights %d\n\t{\n" % self.weight_count)
+            copy_spill(a_file, self.weights)
+            a_file.write("\t}\n")
+        a_file.write("}\n")
+
+    def write_file(self, filepath):
+        with open(filepath, 'w', encoding='utf-8') as a_file:
+            self.write(a_file)
+
+    def close(self):
+        for spill in (self.verts, self.uvs, self.faces, self.weights):
+            spill.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
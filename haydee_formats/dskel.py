@@ -0,0 +1,85 @@
+from array import array
+from .common import d, open_text, read_text_signature, text_tokens
+
+# --------------------------------------------------------------------------------
+# HD_DATA_TXT .dskel reader/writer
+# --------------------------------------------------------------------------------
+
+
+class DSkelData:
+    """.dskel contents. Origins (x y z) and axes (w x y z) are flattened
+
+    float_type is the typecode of the float arrays, the exporter keeps
+    doubles so values are written exactly as they were computed.
+    """
+
+    def __init__(self, float_type='f'):
+        self.signature = None
+        self.bone_names = []
+        self.bone_parents = []
+        self.bone_origins = array(float_type)
+        self.bone_axes = array(float_type)
+        self.bone_widths = array(float_type)
+        self.bone_heights = array(float_type)
+        self.bone_lengths = array(float_type)
+
+
+def parse_dskel(lines):
+    """Parse an iterable of .dskel text lines (usually the open file)"""
+    skel = DSkelData()
+    lines = iter(lines)
+    skel.signature = read_text_signature(lines)
+    if skel.signature != 'HD_DATA_TXT':
+        return skel
+
+    for level, line_split in text_tokens(lines):
+        line_start = line_split[0]
+        if (line_start == 'bone' and level == 1):
+            skel.bone_names.append(line_split[1])
+            skel.bone_parents.append(None)
+        if (level >= 2):
+            if (line_start == 'parent'):
+                skel.bone_parents[-1] = line_split[1]
+            if (line_start == 'origin'):
+                skel.bone_origins.extend(map(float, line_split[1:4]))
+            if (line_start == 'axis'):
+                skel.bone_axes.extend(map(float, line_split[1:5]))
+            if (line_start == 'width'):
+                skel.bone_widths.append(float(line_split[1]))
+            if (line_start == 'height'):
+                skel.bone_heights.append(float(line_split[1]))
+            if (line_start == 'length'):
+                skel.bone_lengths.append(float(line_split[1]))
+    return skel
+
+
+def parse_dskel_file(filepath):
+    with open_text(filepath) as a_file:
+        return parse_dskel(a_file)
+
+
+def dump_dskel(a_file, skel, precision=6):
+    """Write a DSkelData to an open text file"""
+    a_file.write("HD_DATA_TXT 300\n\n")
+    a_file.write("skeleton %d\n{\n" % len(skel.bone_names))
+    for idx, bone_name in enumerate(skel.bone_names):
+        a_file.write("\tbone %s\n\t{\n" % bone_name)
+        a_file.write("\t\twidth %s;\n" % d(skel.bone_widths[idx], precision))
+        a_file.write("\t\theight %s;\n" % d(skel.bone_heights[idx], precision))
+        a_file.write("\t\tlength %s;\n" % d(skel.bone_lengths[idx], precision))
+        parent = skel.bone_parents[idx]
+        if parent:
+            a_file.write("\t\tparent %s;\n" % parent)
+        a_file.write("\t\torigin %s %s %s;\n" %
+                     tuple(d(v, precision)
+                           for v in skel.bone_origins[idx * 3:idx * 3 + 3]))
+        a_file.write("\t\taxis %s %s %s %s;\n" %
+                     tuple(d(v, precision)
+                           for v in skel.bone_axes[idx * 4:idx * 4 + 4]))
+        a_file.write("\t}\n")
+    a_file.write("}\n")
+
+
+def dump_dskel_file(filepath, skel, precision=6):
+    with open(filepath, 'w', encoding='utf-8') as a_file:
+        dump_dskel(a_file, skel, precision)
@@ -0,0 +1,106 @@
+import io
+import struct
+from enum import Enum
+from .chunk import HDChunkFile, read_float, read_uint, read_wide_str
+from .common import (Signature, detect_encoding, map_file, readStrA_term,
+                     sig_check)
+
+# --------------------------------------------------------------------------------
+# HD_CHUNK and HD_DATA_TXT .mtl decoder
+# --------------------------------------------------------------------------------
+
+
+class MatType(Enum):
+    OPAQUE = 0
+    MASK = 1
+    HAIR = 2
+
+
+class MaterialData:
+    """Decoded .mtl contents, properties maps the names found to values"""
+
+    def __init__(self):
+        self.signature = None
+        self.asset_type = None
+        self.properties = {}
+
+
+MATERIAL_READERS = dict(
+    type=read_uint,
+    twoSided=read_uint,
+    width=read_float,
+    height=read_float,
+    autouv=read_uint,
+    diffuseMap=read_wide_str,
+    normalMap=read_wide_str,
+    specularMap=read_wide_str,
+    emissionMap=read_wide_str,
+    censorMap=read_wide_str,
+    maskMap=read_wide_str,
+    surface=lambda x: readStrA_term(0, 64, x)[0],
+    speculars=lambda x: struct.unpack('<3f', x))
+
+
+def parse_material(data):
+    material = MaterialData()
+    mview = memoryview(data)
+    sig = sig_check(mview)
+    material.signature = sig.name if sig else None
+    propMap = None
+
+    if (sig == Signature.HD_CHUNK):
+        chunks = HDChunkFile(mview, MATERIAL_READERS)
+        material.asset_type = chunks.asset_type
+        if (material.asset_type != 'material'):
+            return material
+        material.properties = {
+            name: chunks[name]
+            for name in MATERIAL_READERS if name in chunks
+        }
+
+    elif (sig == Signature.HD_DATA_TXT or sig == Signature.HD_DATA_TXT_BOM):
+        encoding = detect_encoding(data)
+        text = io.TextIOWrapper(io.BytesIO(data), encoding=encoding)
+
+        propMap = dict(
+            type={'reader': lambda s: MatType[s]},
+            twoSided={'reader': lambda s: s.lower() == 'true'},
+            width={'reader': lambda s: float(s)},
+            height={'reader': lambda s: float(s)},
+            autouv={'reader': lambda s: int(s)},
+            diffuseMap={'reader': lambda s: s.strip('"')},
+            normalMap={'reader': lambda s: s.strip('"')},
+            specularMap={'reader': lambda s: s.strip('"')},
+            emissionMap={'reader': lambda s: s.strip('"')},
+            censorMap={'reader': lambda s: s.strip('"')},
+            maskMap={'reader': lambda s: s.strip('"')},
+            surface={'reader': lambda s: s},
+            speculars={
+                'reader': lambda s: tuple([float(val) for val in s.split()])
+            })
+
+        line = text.readline()
+        c = 0
+        while (line != '{' and c < 50):
+            line = text.readline().strip()
+            c = c + 1
+        c = 0
+        while (line != '}' and c < 50):
+            c = c + 1
+            line = text.readline().strip().strip(';')
+            if (line == '}'): break
+            key = line[0:line.index(' ')]
+            value = line[line.index(' ') + 1:]
+            propMap[key]["value"] = propMap[key]["reader"](value)
+
+    if propMap:
+        material.properties = {
+            key: value["value"]
+            for key, value in propMap.items() if "value" in value
+        }
+    return material
+
+
+def parse_material_file(filepath):
+    with map_file(filepath) as data:
+        return parse_material(data)
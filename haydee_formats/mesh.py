@@ -0,0 +1,119 @@
+import struct
+import numpy as np
+from .chunk import HDChunkFile, pack_chunk_header
+from .common import map_file
+
+# --------------------------------------------------------------------------------
+# HD_CHUNK .mesh decoder/encoder
+# --------------------------------------------------------------------------------
+
+INIT_INFO = 32
+VERT_SIZE = 60
+FACE_SIZE = 12
+
+# 60 byte vertex record, little endian and packed
+VERT_DTYPE = np.dtype([
+    ('co', '<f4', 3),
+    ('uv', '<f4', 2),
+    ('color', 'u1', 4),
+    ('normal', '<f4', 3),
+    ('tangent', '<f4', 3),
+    ('bitangent', '<f4', 3),
+])
+FACE_DTYPE = np.dtype(('<u4', 3))
+
+# (x, y, z) -> (-x, -z, y)
+AXIS_ORDER = (0, 2, 1)
+AXIS_SIGN = np.array((-1, -1, 1), dtype=np.float32)
+# and back, (x, y, z) -> (-x, z, -y)
+FILE_AXIS_SIGN = np.array((-1, 1, -1), dtype=np.float32)
+
+
+class MeshData:
+    """Decoded .mesh contents, already in Blender axes.
+
+    verts and normals are (n, 3) float32 arrays, uvs (n, 2) and faces an
+    (n, 3) int32 array of vertex indices in Blender winding. tangents and
+    bitangents are only written, they are zero when left empty.
+    """
+
+    def __init__(self):
+        self.signature = None
+        self.bounds = None
+        self.verts = np.empty((0, 3), dtype=np.float32)
+        self.uvs = np.empty((0, 2), dtype=np.float32)
+        self.normals = np.empty((0, 3), dtype=np.float32)
+        self.faces = np.empty((0, 3), dtype=np.int32)
+        self.tangents = np.empty((0, 3), dtype=np.float32)
+        self.bitangents = np.empty((0, 3), dtype=np.float32)
+
+
+def parse_mesh(data):
+    mesh = MeshData()
+    chunks = HDChunkFile(data)
+    mesh.signature = chunks.signature
+    if mesh.signature != 'HD_CHUNK':
+        return mesh
+
+    offset = chunks.data_offset
+    (vertCount, loopCount, x1, y1, z1, x2, y2, z2) = \
+        struct.unpack('II3f3f', data[offset:offset + INIT_INFO])
+    mesh.bounds = ((-x1, z1, -y1), (-x2, z2, -y2))
+
+    # records are viewed in place, only the converted arrays are copies
+    headerSize = chunks.data_offset + INIT_INFO
+    verts = np.frombuffer(data, dtype=VERT_DTYPE, count=vertCount,
+                          offset=headerSize)
+    mesh.verts = verts['co'].take(AXIS_ORDER, axis=1) * AXIS_SIGN
+    mesh.uvs = np.array(verts['uv'])
+    mesh.normals = verts['normal'].take(AXIS_ORDER, axis=1) * AXIS_SIGN
+
+    faceCount = loopCount // 3
+    faces = np.frombuffer(data, dtype=FACE_DTYPE, count=faceCount,
+                          offset=headerSize + (VERT_SIZE * vertCount))
+    mesh.faces = np.ascontiguousarray(faces[:, ::-1], dtype=np.int32)
+    return mesh
+
+
+def parse_mesh_file(filepath):
+    with map_file(filepath) as data:
+        return parse_mesh(data)
+
+
+def file_axes(vectors):
+    """(n, 3) vectors in Blender axes back to the file axes"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors.take(AXIS_ORDER, axis=1) * FILE_AXIS_SIGN
+
+
+def dump_mesh(a_file, mesh):
+    """Write a MeshData to an open binary file, the reverse of parse_mesh"""
+    vertCount = len(mesh.verts)
+    verts = np.zeros(vertCount, dtype=VERT_DTYPE)
+    verts['co'] = file_axes(mesh.verts)
+    verts['uv'] = mesh.uvs
+    verts['color'] = 255
+    verts['normal'] = file_axes(mesh.normals)
+    if len(mesh.tangents) == vertCount:
+        verts['tangent'] = file_axes(mesh.tangents)
+    if len(mesh.bitangents) == vertCount:
+        verts['bitangent'] = file_axes(mesh.bitangents)
+    faces = np.asarray(mesh.faces)[:, ::-1].astype(FACE_DTYPE.base)
+
+    if vertCount:
+        lower = verts['co'].min(axis=0)
+        upper = verts['co'].max(axis=0)
+    else:
+        lower = upper = np.zeros(3, dtype=np.float32)
+    info = struct.pack('II3f3f', vertCount, faces.size, *lower, *upper)
+
+    size = INIT_INFO + verts.nbytes + faces.nbytes
+    a_file.write(pack_chunk_header('mesh', size))
+    a_file.write(info)
+    a_file.write(verts.data)
+    a_file.write(faces.data)
+
+
+def dump_mesh_file(filepath, mesh):
+    with open(filepath, 'wb') as a_file:
+        dump_mesh(a_file, mesh)
@@ -0,0 +1,151 @@
+from array import array
+import struct
+from .chunk import HDChunkFile, read_int
+from .common import (map_file, open_text, readStrA_term, read_text_signature,
+                     text_tokens, write_rows)
+
+# --------------------------------------------------------------------------------
+# HD_CHUNK/HD_MOTION .motion decoder and HD_DATA_TXT .dmot reader/writer
+# --------------------------------------------------------------------------------
+
+KEY_SIZE = 28
+TRACK_SIZE = 36
+
+
+class MotionData:
+    """Animation of every bone.
+
+    Every track holds 7 floats per frame in file order:
+    x y z qx qz qy qw
+    float_type is the typecode of the track arrays, the exporter keeps
+    doubles so values are written exactly as they were computed.
+    """
+
+    def __init__(self, float_type='f'):
+        self.float_type = float_type
+        self.signature = None
+        self.asset_type = None
+        self.num_frames = 0
+        self.frame_rate = None
+        self.track_names = []
+        self.tracks = []
+
+    def add_track(self, name):
+        self.track_names.append(name)
+        self.tracks.append(array(self.float_type))
+        return self.tracks[-1]
+
+    def key(self, track, frame):
+        keys = self.tracks[track]
+        return tuple(keys[frame * 7:frame * 7 + 7])
+
+
+# Helper for commong logic
+def read_motion_bones(memData, motion, boneCount, TRACK_SIZE, KEY_SIZE,
+                      TRACK_OFFSET, KEY_OFFSET):
+    unpack_bone = struct.Struct('<32sI').unpack
+    key_struct = struct.Struct('3f4f')
+    for n in range(boneCount):
+        offset = TRACK_OFFSET + (TRACK_SIZE * n)
+        (name, firstKey) = unpack_bone(memData[offset:offset + TRACK_SIZE])
+        keys = motion.add_track(readStrA_term(0, 32, name)[0])
+        if KEY_SIZE == key_struct.size:
+            # the frames of a track are consecutive keys, copy them at once
+            offset = KEY_OFFSET + (KEY_SIZE * firstKey)
+            size = KEY_SIZE * motion.num_frames
+            keys.frombytes(memData[offset:offset + size])
+            continue
+        for k in range(firstKey, firstKey + motion.num_frames):
+            offset = KEY_OFFSET + (KEY_SIZE * k)
+            keys.extend(key_struct.unpack(memData[offset:offset + KEY_SIZE]))
+
+
+MOTION_READERS = dict(numFrames=read_int,
+                      duration=read_int,
+                      numKeys=read_int,
+                      numTracks=read_int,
+                      numEvents=read_int)
+
+
+def parse_motion(data):
+    motion = MotionData()
+    chunks = HDChunkFile(data, MOTION_READERS)
+    mview = chunks.data
+    motion.signature = chunks.signature
+    motion.asset_type = chunks.asset_type
+
+    if (motion.signature == 'HD_CHUNK' and motion.asset_type == 'motion'):
+        motion.num_frames = chunks['numFrames']
+        boneCount = chunks['numTracks']
+        tracks = chunks.chunks['tracks']
+        keys = chunks.chunks['keys']
+        trackSize = int(tracks.size / boneCount)
+        keySize = int(keys.size / chunks['numKeys'])
+        read_motion_bones(mview, motion, boneCount, trackSize, keySize,
+                          tracks.offset, keys.offset)
+
+    elif (motion.signature == 'HD_MOTION'):
+        (keyCount, boneCount, firstFrame, duration, numFrames,
+         dataSize) = struct.unpack('6I', mview[20:44])
+        motion.num_frames = numFrames
+        keyOffset = 44
+        trackOffset = 44 + int(KEY_SIZE * keyCount)
+        read_motion_bones(mview, motion, boneCount, TRACK_SIZE, KEY_SIZE,
+                          trackOffset, keyOffset)
+    return motion
+
+
+def parse_motion_file(filepath):
+    with map_file(filepath) as data:
+        return parse_motion(data)
+
+
+def parse_dmot(lines):
+    """Parse an iterable of .dmot text lines (usually the open file)"""
+    motion = MotionData()
+    lines = iter(lines)
+    motion.signature = read_text_signature(lines)
+    if motion.signature != 'HD_DATA_TXT':
+        return motion
+
+    keys = None
+    for level, line_split in text_tokens(lines):
+        line_start = line_split[0]
+        # info
+        if (level >= 1):
+            if (line_start == 'numFrames'):
+                motion.num_frames = int(line_split[1])
+            if (line_start == 'frameRate'):
+                motion.frame_rate = float(line_split[1])
+            if (line_start == 'track'):
+                keys = motion.add_track(line_split[1])
+
+        # motion
+        if (level >= 2 and line_start == 'key'):
+            keys.extend(map(float, line_split[1:8]))
+    return motion
+
+
+def parse_dmot_file(filepath):
+    with open_text(filepath) as a_file:
+        return parse_dmot(a_file)
+
+
+def dump_dmot(a_file, motion, precision=6):
+    """Write a MotionData to an open text file"""
+    a_file.write("HD_DATA_TXT 300\n\n")
+    a_file.write("motion\n{\n")
+    a_file.write("\tnumTracks %d;\n" % len(motion.track_names))
+    a_file.write("\tnumFrames %d;\n" % motion.num_frames)
+    a_file.write("\tframeRate %g;\n" % motion.frame_rate)
+    for idx, name in enumerate(motion.track_names):
+        a_file.write("\ttrack %s\n\t{\n" % name)
+        write_rows(a_file, "\t\tkey %s %s %s %s %s %s %s;\n",
+                   motion.tracks[idx], 7, precision)
+        a_file.write("\t}\n")
+    a_file.write("}\n")
+
+
+def dump_dmot_file(filepath, motion, precision=6):
+    with open(filepath, 'w', encoding='utf-8') as a_file:
+        dump_dmot(a_file, motion, precision)
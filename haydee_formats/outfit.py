@@ -0,0 +1,51 @@
+from .common import open_text, read_text_signature, text_tokens
+
+# --------------------------------------------------------------------------------
+# HD_DATA_TXT .outfit reader
+# --------------------------------------------------------------------------------
+
+
+class OutfitData:
+    """.outfit contents, skin/material files are None when a mesh has none"""
+
+    def __init__(self):
+        self.signature = None
+        self.name = None
+        self.mesh_files = []
+        self.skin_files = []
+        self.material_files = []
+
+
+def parse_outfit(lines):
+    """Parse an iterable of .outfit text lines (usually the open file)"""
+    outfit = OutfitData()
+    lines = iter(lines)
+    outfit.signature = read_text_signature(lines)
+    if outfit.signature != 'HD_DATA_TXT':
+        return outfit
+
+    for level, line_split in text_tokens(lines, maxsplit=1):
+        line_start = line_split[0]
+        if len(line_split) < 2:
+            continue
+        value = line_split[1].replace('"', '')
+
+        if (line_start == 'outfit' and level == 0):
+            outfit.name = value
+        if (line_start == 'name' and level == 1):
+            outfit.name = value
+
+        if (line_start == 'mesh' and level == 2):
+            outfit.mesh_files.append(value)
+            outfit.skin_files.append(None)
+            outfit.material_files.append(None)
+        if (line_start == 'skin' and level == 2):
+            outfit.skin_files[-1] = value
+        if (line_start == 'material' and level == 2):
+            outfit.material_files[-1] = value
+    return outfit
+
+
+def parse_outfit_file(filepath):
+    with open_text(filepath, errors="surrogateescape") as a_file:
+        return parse_outfit(a_file)
@@ -0,0 +1,90 @@
+from array import array
+import struct
+from .chunk import HDChunkFile
+from .common import (d, decodeText, map_file, open_text, read_text_signature,
+                     text_tokens)
+
+# --------------------------------------------------------------------------------
+# HD_CHUNK .pose decoder and HD_DATA_TXT .dpose reader/writer
+# --------------------------------------------------------------------------------
+
+TRANSFORM_SIZE = 60
+
+
+class PoseData:
+    """Pose of every bone.
+
+    transforms holds 7 floats per bone in file order:
+    x y z qx qz qy qw
+    float_type is the typecode of the float array, the exporter keeps
+    doubles so values are written exactly as they were computed.
+    """
+
+    def __init__(self, float_type='f'):
+        self.signature = None
+        self.bone_names = []
+        self.transforms = array(float_type)
+
+    def transform(self, idx):
+        return tuple(self.transforms[idx * 7:idx * 7 + 7])
+
+
+def parse_pose(data):
+    pose = PoseData()
+    chunks = HDChunkFile(data)
+    pose.signature = chunks.signature
+    if pose.signature != 'HD_CHUNK':
+        return pose
+
+    offset = chunks.data_offset
+    boneCount = struct.unpack('I', data[offset:offset + 4])[0]
+
+    delta = chunks.data_offset + 4
+    unpack_transform = struct.Struct('3f4f32s').unpack
+    for n in range(boneCount):
+        offset = delta + (TRANSFORM_SIZE * n)
+        values = unpack_transform(data[offset:offset + TRANSFORM_SIZE])
+        pose.transforms.extend(values[0:7])
+        pose.bone_names.append(decodeText(values[7]))
+    return pose
+
+
+def parse_pose_file(filepath):
+    with map_file(filepath) as data:
+        return parse_pose(data)
+
+
+def parse_dpose(lines):
+    """Parse an iterable of .dpose text lines (usually the open file)"""
+    pose = PoseData()
+    lines = iter(lines)
+    pose.signature = read_text_signature(lines)
+    if pose.signature != 'HD_DATA_TXT':
+        return pose
+
+    for level, line_split in text_tokens(lines):
+        if (line_split[0] == 'transform' and level >= 1):
+            pose.bone_names.append(line_split[1])
+            pose.transforms.extend(map(float, line_split[2:9]))
+    return pose
+
+
+def parse_dpose_file(filepath):
+    with open_text(filepath) as a_file:
+        return parse_dpose(a_file)
+
+
+def dump_dpose(a_file, pose, precision=6):
+    """Write a PoseData to an open text file"""
+    a_file.write("HD_DATA_TXT 300\n\n")
+    a_file.write("pose\n{\n\tnumTransforms %d;\n" % len(pose.bone_names))
+    for idx, bone_name in enumerate(pose.bone_names):
+        a_file.write("\ttransform %s %s %s %s %s %s %s %s;\n" %
+                     ((bone_name, ) +
+                      tuple(d(v, precision) for v in pose.transform(idx))))
+    a_file.write("}\n")
+
+
+def dump_dpose_file(filepath, pose, precision=6):
+    with open(filepath, 'w', encoding='utf-8') as a_file:
+        dump_dpose(a_file, pose, precision)
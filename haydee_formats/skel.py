@@ -0,0 +1,115 @@
+from array import array
+import struct
+from .chunk import HDChunkFile, read_int
+from .common import map_file, readStrA_term
+
+# --------------------------------------------------------------------------------
+# HD_CHUNK .skel decoder
+# --------------------------------------------------------------------------------
+
+
+class SkelData:
+    """Decoded .skel contents.
+
+    Bone matrices keep the 16 floats in file order (column major), bone
+    dimensions are (width, height, length). joints and fixes are keyed by
+    bone index.
+    """
+
+    def __init__(self):
+        self.signature = None
+        self.asset_type = None
+        self.bone_names = []
+        self.bone_parents = array('i')
+        self.bone_matrices = array('f')
+        self.bone_dimensions = array('f')
+        self.joints = {}
+        self.fixes = {}
+
+
+SKEL_READERS = dict(numBones=read_int,
+                    numJoints=read_int,
+                    numFixes=read_int,
+                    numBounds=read_int,
+                    numTrackers=read_int,
+                    numSlots=read_int)
+
+
+# Parse bone data helper
+def read_bone_data(memData, boneCount, skel):
+    BONE_SIZE = int(len(memData) / boneCount)
+    unpack_bone = struct.Struct('<32s16fi3fi').unpack
+    for n in range(boneCount):
+        offset = (BONE_SIZE * n)
+        values = unpack_bone(memData[offset:offset + BONE_SIZE])
+        (parent, width, height, lenght, flags) = values[17:22]
+
+        skel.bone_names.append(readStrA_term(0, 32, values[0])[0])
+        skel.bone_parents.append(parent)
+        skel.bone_matrices.extend(values[1:17])
+        skel.bone_dimensions.extend((width, height, lenght))
+    return True
+
+
+# Parse joint data helper
+def read_joint_data(memData, joints_count, joint_data):
+    JOINT_SIZE = int(len(memData) / joints_count)
+    unpack_joint = struct.Struct('<18f4f').unpack
+    for n in range(joints_count):
+        offset = (JOINT_SIZE * n)
+        values = unpack_joint(memData[offset:offset + JOINT_SIZE])
+        (index, parent) = values[0:2]
+        (twistX, twistY, swingX, swingY) = values[18:22]
+
+        joint_data[index] = {
+            'parent': parent,
+            'twistX': twistX,
+            'twistY': twistY,
+            'swingX': swingX,
+            'swingY': swingY,
+            'matrix': values[2:18]
+        }
+    return True
+
+
+# Parse fixes data
+def read_fixes_data(memData, fixes_count, fix_data):
+    FIXES_SIZE = int(len(memData) / fixes_count)
+    unpack_fixes = struct.Struct('<5I').unpack
+    for n in range(fixes_count):
+        offset = (FIXES_SIZE * n)
+        (type, flags, fix1, fix2,
+         index) = unpack_fixes(memData[offset:offset + FIXES_SIZE])
+        fix_data[index] = ({
+            'type': type,
+            'flags': flags,
+            'fix1': fix1,
+            'fix2': fix2
+        })
+    return True
+
+
+def parse_skel(data):
+    skel = SkelData()
+    chunks = HDChunkFile(data, SKEL_READERS)
+    skel.signature = chunks.signature
+    skel.asset_type = chunks.asset_type
+    if skel.signature != 'HD_CHUNK' or skel.asset_type != 'skeleton':
+        return skel
+
+    if 'bones' in chunks:
+        read_bone_data(chunks.payload('bones'), chunks['numBones'], skel)
+    if 'fixes' in chunks:
+        read_fixes_data(chunks.payload('fixes'), chunks['numFixes'],
+                        skel.fixes)
+    if 'joints' in chunks:
+        read_joint_data(chunks.payload('joints'), chunks['numJoints'],
+                        skel.joints)
+    if 'slots' in chunks:
+        print("Skipping slots since this data is irrelevant")
+    return skel
+
+
+def parse_skel_file(filepath):
+    with map_file(filepath) as data:
+        return parse_skel(data)
@@ -0,0 +1,143 @@
+import struct
+import numpy as np
+from .chunk import HDChunkFile, pack_chunk_header
+from .common import decodeText, map_file
+
+# --------------------------------------------------------------------------------
+# HD_CHUNK .skin decoder/encoder
+# --------------------------------------------------------------------------------
+
+INIT_INFO = 8
+VERT_SIZE = 20
+BONE_SIZE = 112
+
+# 20 byte vertex record, 4 weights then the 4 matching bone indices
+VERT_DTYPE = np.dtype([
+    ('weights', '<f4', 4),
+    ('bones', 'u1', 4),
+])
+# 112 byte bone record
+BONE_DTYPE = np.dtype([
+    ('name', 'S32'),
+    ('matrix', '<f4', 16),
+    ('vector', '<f4', 4),
+])
+# influences stored per vertex
+SKIN_SLOTS = 4
+
+
+class SkinData:
+    """Decoded .skin contents.
+
+    weights is an (n, 4) float32 array and bones the matching (n, 4) uint8
+    array of bone indices. Bone matrices are (n, 16) float32 rows keeping
+    the file order, bone vectors (n, 4).
+    """
+
+    def __init__(self):
+        self.signature = None
+        self.weights = np.empty((0, 4), dtype=np.float32)
+        self.bones = np.empty((0, 4), dtype=np.uint8)
+        self.bone_names = []
+        self.bone_matrices = np.empty((0, 16), dtype=np.float32)
+        self.bone_vectors = np.empty((0, 4), dtype=np.float32)
+
+
+def parse_skin(data):
+    skin = SkinData()
+    chunks = HDChunkFile(data)
+    skin.signature = chunks.signature
+    if skin.signature != 'HD_CHUNK':
+        return skin
+
+    offset = chunks.data_offset
+    (vertCount, boneCount) = \
+        struct.unpack('II', data[offset:offset + INIT_INFO])
+
+    headerSize = chunks.data_offset + INIT_INFO
+    verts = np.frombuffer(data, dtype=VERT_DTYPE, count=vertCount,
+                          offset=headerSize)
+    skin.weights = np.array(verts['weights'])
+    skin.bones = np.array(verts['bones'])
+
+    bones = np.frombuffer(data, dtype=BONE_DTYPE, count=boneCount,
+                          offset=headerSize + (VERT_SIZE * vertCount))
+    skin.bone_names = [decodeText(name) for name in bones['name']]
+    skin.bone_matrices = np.array(bones['matrix'])
+    skin.bone_vectors = np.array(bones['vector'])
+    return skin
+
+
+def parse_skin_file(filepath):
+    with map_file(filepath) as data:
+        return parse_skin(data)
+
+
+def skin_influences(vert_indices, bone_indices, weights, vertCount):
+    """(n, 4) weights and bones holding the largest influences of each
+    vertex, normalized. Unused slots are bone 0 with weight 0.
+    """
+    order = np.lexsort((-weights, vert_indices))
+    vert_indices = vert_indices[order]
+    slot = np.arange(len(order)) - np.searchsorted(vert_indices, vert_indices)
+    keep = slot < SKIN_SLOTS
+
+    skin_weights = np.zeros((vertCount, SKIN_SLOTS), dtype=np.float32)
+    skin_bones = np.zeros((vertCount, SKIN_SLOTS), dtype=np.uint8)
+    skin_weights[vert_indices[keep], slot[keep]] = weights[order][keep]
+    skin_bones[vert_indices[keep], slot[keep]] = bone_indices[order][keep]
+    total = skin_weights.sum(axis=1, keepdims=True)
+    np.divide(skin_weights, total, out=skin_weights, where=total > 0)
+    return skin_weights, skin_bones
+
+
+def pack_bone_matrices(transforms):
+    """(n, 16) bone matrix rows of (n, 4, 4) bone transforms.
+
+    The rows hold the rotation and, in the last row, the position
+    expressed in the rotated frame.
+    """
+    transforms = np.asarray(transforms, dtype=np.float64).reshape(-1, 4, 4)
+    rot = transforms[:, :3, :3]
+    pos = np.linalg.pinv(rot) @ transforms[:, :3, 3:]
+    rows = np.zeros((len(transforms), 4, 4))
+    rows[:, :3, :3] = rot
+    rows[:, 3, :3] = pos[:, :, 0]
+    rows[:, 3, 3] = 1
+    return rows.reshape(-1, 16).astype(np.float32)
+
+
+def unpack_bone_matrices(matrices):
+    """(n, 4, 4) bone transforms of (n, 16) bone matrix rows, the reverse
+    of pack_bone_matrices"""
+    rows = np.asarray(matrices, dtype=np.float64).reshape(-1, 4, 4)
+    rot = rows[:, :3, :3]
+    transforms = np.zeros_like(rows)
+    transforms[:, :3, :3] = rot
+    transforms[:, :3, 3] = (rot @ rows[:, 3, :3, None])[:, :, 0]
+    transforms[:, 3, 3] = 1
+    return transforms
+
+
+def dump_skin(a_file, skin):
+    """Write a SkinData to an open binary file, the reverse of parse_skin"""
+    verts = np.zeros(len(skin.weights), dtype=VERT_DTYPE)
+    verts['weights'] = skin.weights
+    verts['bones'] = skin.bones
+
+    bones = np.zeros(len(skin.bone_names), dtype=BONE_DTYPE)
+    # names are null terminated
+    bones['name'] = [name.encode('latin1')[:31] for name in skin.bone_names]
+    bones['matrix'] = skin.bone_matrices
+    bones['vector'] = skin.bone_vectors
+
+    size = INIT_INFO + verts.nbytes + bones.nbytes
+    a_file.write(pack_chunk_header('skin', size))
+    a_file.write(struct.pack('II', len(verts), len(bones)))
+    a_file.write(verts.data)
+    a_file.write(bones.data)
+
+
+def dump_skin_file(filepath, skin):
+    with open(filepath, 'wb') as a_file:
+        dump_skin(a_file, skin)
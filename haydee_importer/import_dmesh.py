@@ -4,41 +4,17 @@ import bpy
 from bpy.types import Operator
 from bpy.props import *
 from bpy_extras.io_utils import ImportHelper
-import io
-from mathutils import Matrix, Quaternion, Vector
+from mathutils import Quaternion, Vector
+import numpy as np
 from ..HaydeeUtils import *
+from ..haydee_formats.dmesh import parse_dmesh_file
 
 # --------------------------------------------------------------------------------
 # .dmesh importer
 # --------------------------------------------------------------------------------
 
 
-def recurBonesOriginMesh(progress, parentBone, jointNames, jointAxis,
-                         jointOrigin):
-    for childBone in parentBone.children:
-        if childBone:
-            idx = jointNames.index(childBone.name)
-            mat = Quaternion(jointAxis[idx]).to_matrix().to_4x4()
-            pos = Vector(jointOrigin[idx])
-
-            # INV row
-            x1 = Matrix(
-                ((-1, 0, 0, 0), (0, 0, 1, 0), (0, -1, 0, 0), (0, 0, 0, 1)))
-            # INV col
-            x2 = Matrix(
-                ((1, 0, 0, 0), (0, 0, 1, 0), (0, 1, 0, 0), (0, 0, 0, 1)))
-
-            mat = parentBone.matrix @ (x1 @ mat @ x2)
-            pos = parentBone.matrix @ Vector((-pos.z, pos.x, pos.y))
-            mat.translation = pos
-            childBone.matrix = mat
-
-            recurBonesOriginMesh(progress, childBone, jointNames, jointAxis,
-                                 jointOrigin)
-            progress.step()
-
-
-def read_dmesh(operator, context, filepath, file_format):
+def read_dmesh(operator, context, filepath, file_format, dmesh_data=None):
     print('dmesh:', filepath)
     with ProgressReport(context.window_manager) as progReport:
         with ProgressReportSubstep(progReport, 4, "Importing dmesh",
@@ -54,112 +30,39 @@ def read_dmesh(operator, context, filepath, file_format):
             collection = createCollection(collName)
             setActiveCollection(collName)
 
-            vert_data = None
-            uv_data = None
-            face_data = None
-
-            progress.enter_substeps(1, "Read file")
-            data = None
-            encoding = find_encoding(filepath)
-            with open(filepath, "r", encoding=encoding) as a_file:
-                data = io.StringIO(a_file.read())
-            progress.leave_substeps("Read file end")
-
-            line = stripLine(data.readline())
-            line_split = line.split()
-            line_start = line_split[0]
-            signature = line_start
+            # already parsed when importing several files in parallel
+            if dmesh_data is None:
+                progress.enter_substeps(1, "Read and parse file")
+                dmesh_data = parse_dmesh_file(filepath)
+                progress.leave_substeps("Read and parse file end")
 
+            signature = dmesh_data.signature
             print('Signature:', signature)
             if signature != 'HD_DATA_TXT':
                 print("Unrecognized signature: %s" % signature)
                 operator.report({'ERROR'}, "Unrecognized file format")
                 return {'FINISHED'}
 
-            level = 0
-            vert_data = []
-            uv_data = []
-            face_verts = []
-            face_uvs = []
-            smoothGroups = []
-            vCount = None
-
-            jointName = None
-            jointNames = []
-            jointOrigin = []
-            jointAxis = []
-            jointParents = []
-
-            weights = []
-
-            meshFaces = {}
-            meshUvs = {}
-            meshSmoothGroups = {}
-
-            contextName = None
-            meshName = None
-
-            # steps = len(data.getvalue().splitlines()) - 1
-            progress.enter_substeps(1, "Parse Data")
-            # Read model data
-            for lineData in data:
-                line = stripLine(lineData)
-                line_split = line.split()
-                line_start = None
-                i = len(line_split)
-                if (i == 0):
-                    continue
-                line_start = line_split[0]
-                if (line_start in ('{')):
-                    level += 1
-                if (line_start in ('}')):
-                    level -= 1
-                    contextName = None
-
-                if (line_start == 'verts', 'face', 'joint'):
-                    contextName = line_start
-
-                # All verts
-                if (line_start == 'vert'):
-                    readVec(line_split, vert_data, 3, float)
-
-                # All UVs
-                if (line_start == 'uv'):
-                    readVec(line_split, uv_data, 2, float)
-
-                # Faces
-                if (line_start == 'group' and level >= 2):
-                    meshName = line_split[1]
-                    meshFaces[meshName] = []
-                    meshUvs[meshName] = []
-                    meshSmoothGroups[meshName] = []
-
-                if (line_start == 'count' and level >= 3):
-                    vCount = int(line_split[1])
-                if (line_start == 'verts' and level >= 3):
-                    readVec(line_split, meshFaces[meshName], vCount, int)
-                if (line_start == 'uvs' and level >= 3):
-                    readVec(line_split, meshUvs[meshName], vCount, int)
-                if (line_start == 'smoothGroup' and level >= 3):
-                    meshSmoothGroups[meshName].append(int(line_split[1]))
-
-                # Joints
-                if (line_start == 'joint' and level >= 2):
-                    jointName = line_split[1]
-                    jointNames.append(jointName)
-                    jointParents.append(None)
-                if (line_start == 'parent' and level >= 3):
-                    jointParents[len(jointParents) - 1] = line.split(' ', 1)[1]
-                if (line_start == 'origin' and level >= 3):
-                    readVec(line_split, jointOrigin, 3, float)
-                if (line_start == 'axis' and level >= 3):
-                    readVec(line_split, jointAxis, 4, float)
-
-                # Joints (Vert, Bone, Weight)
-                if (line_start == 'weight' and level >= 2):
-                    readWeights(line_split, weights)
-                # progress.step()
-            progress.leave_substeps("Parse Data end")
+            vert_coords = np.frombuffer(dmesh_data.verts,
+                                        dtype=np.float32).reshape(-1, 3)
+            uv_coords = np.frombuffer(dmesh_data.uvs,
+                                      dtype=np.float32).reshape(-1, 2)
+            jointNames = dmesh_data.joint_names
+            jointParents = dmesh_data.joint_parents
+            jointOrigin = [
+                tuple(dmesh_data.joint_origins[i:i + 3])
+                for i in range(0, len(dmesh_data.joint_origins), 3)
+            ]
+            jointAxis = [
+                tuple(dmesh_data.joint_axes[i:i + 4])
+                for i in range(0, len(dmesh_data.joint_axes), 4)
+            ]
+            weight_verts = np.frombuffer(dmesh_data.weight_verts,
+                                         dtype=np.int32)
+            weight_bones = np.frombuffer(dmesh_data.weight_bones,
+                                         dtype=np.int32)
+            weight_values = np.frombuffer(dmesh_data.weight_values,
+                                          dtype=np.float32)
 
             for idx, name in enumerate(jointNames):
                 jointNames[idx] = boneRenameBlender(name)
@@ -194,29 +97,29 @@ def read_dmesh(operator, context, filepath, file_format):
 
                 # set all bone parents
                 progress.enter_substeps(boneCount, "parenting bones")
-                for idx, jointParent in enumerate(jointParents):
-                    if (jointParent is not None):
-                        editBone = armature_da.edit_bones[idx]
-                        editBone.parent = armature_da.edit_bones[jointParent]
+                editBones = armature_da.edit_bones
+                parentIdx = bone_parent_indices(jointNames, jointParents)
+                for idx, jointParent in enumerate(parentIdx):
+                    if (jointParent >= 0):
+                        editBones[idx].parent = editBones[jointParent]
                     progress.step()
                 progress.leave_substeps("parenting bones end")
 
                 # origins of each bone is relative to its parent
                 # recalc all origins
                 progress.enter_substeps(boneCount, "aligning bones")
-                rootBones = [
-                    rootBone for rootBone in armature_da.edit_bones
-                    if rootBone.parent is None
-                ]
-                for rootBone in rootBones:
-                    idx = jointNames.index(rootBone.name)
+                localMats = []
+                for idx, jointParent in enumerate(parentIdx):
                     mat = Quaternion(jointAxis[idx]).to_matrix().to_4x4()
                     pos = Vector(jointOrigin[idx])
-                    mat.translation = vectorSwapSkel(pos)
-                    rootBone.matrix = SWAP_ROW_SKEL @ mat @ SWAP_COL_SKEL
-                    recurBonesOriginMesh(progress, rootBone, jointNames,
-                                         jointAxis, jointOrigin)
-                    progress.step()
+                    if (jointParent >= 0):
+                        mat = SWAP_ROW_DMESH_CHILD @ mat @ SWAP_COL_DMESH_CHILD
+                        mat.translation = Vector((-pos.z, pos.x, pos.y))
+                    else:
+                        mat.translation = vectorSwapSkel(pos)
+                        mat = SWAP_ROW_SKEL @ mat @ SWAP_COL_SKEL
+                    localMats.append(mat)
+                set_bone_matrices(editBones, parentIdx, localMats, progress)
                 progress.leave_substeps("aligning bones end")
 
                 # lenght of bones
@@ -238,34 +141,33 @@ def read_dmesh(operator, context, filepath, file_format):
             if armature_ob:
                 armature_ob.select_set(state=True)
 
-            # Create mesh (verts and faces)
-            progress.enter_substeps(len(meshFaces), "creating meshes")
-            for meshName, face_verts in meshFaces.items():
-                # face_verts = meshFaces[meshName]
-                face_uvs = meshUvs[meshName]
-                smoothGroups = meshSmoothGroups[meshName]
+            # vertex group per bone index, None when the bone is missing
+            weight_group_names = []
+            if armature_ob:
+                weight_group_names = [
+                    name if armature_ob.data.bones.get(name) else None
+                    for name in jointNames
+                ]
 
+            # Create mesh (verts and faces)
+            progress.enter_substeps(len(dmesh_data.groups), "creating meshes")
+            for meshName, group in dmesh_data.groups.items():
                 progress.enter_substeps(1, "vertdic")
-                vertDic = []
-                for face in face_verts:
-                    for vertIdx in face:
-                        if vertIdx not in vertDic:
-                            vertDic.append(vertIdx)
+                vertDic, loop_verts = remap_indices(
+                    np.frombuffer(group.face_verts, dtype=np.int32))
                 progress.leave_substeps("vertdic end")
 
                 # Obtain mesh exclusive verts and renumerate for faces
                 progress.enter_substeps(1, "local verts")
-                objVerts = [vert_data[oldIdx] for oldIdx in vertDic]
-                objFaces = [
-                    tuple(vertDic.index(oldIdx) for oldIdx in face)[::-1]
-                    for face in face_verts
-                ]
+                objVerts = vert_coords[vertDic][:, (0, 2, 1)] * (-1, -1, 1)
+                # faces are stored with the opposite winding
+                loop_order = reversed_loop_order(group.face_counts)
                 progress.leave_substeps("local verts end")
 
                 progress.enter_substeps(1, "mesh data")
-                mesh_data = bpy.data.meshes.new(meshName)
-                mesh_data.from_pydata(list(map(coordTransform, objVerts)), [],
-                                      objFaces)
+                mesh_data = mesh_from_arrays(meshName, objVerts,
+                                             loop_verts[loop_order],
+                                             group.face_counts)
                 # Shade smooth
                 mesh_data.use_auto_smooth = True
                 mesh_data.auto_smooth_angle = pi
@@ -276,71 +178,19 @@ def read_dmesh(operator, context, filepath, file_format):
                 # apply UVs
                 progress.enter_substeps(1, "uv")
                 useUvs = True
-                if useUvs and face_uvs is not None:
-                    mesh_data.uv_layers.new()
-                    blen_uvs = mesh_data.uv_layers[-1]
-                    for idx, uvs in enumerate(
-                        [uv for uvs in face_uvs for uv in uvs[::-1]]):
-                        uv_coord = Vector(uv_data[int(uvs)])
-                        if (file_format == 'H2'):
-                            uv_coord = Vector((uv_coord.x, 1 - uv_coord.y))
-                        blen_uvs.data[idx].uv = uv_coord
+                if useUvs and len(group.face_uvs) == len(group.face_verts):
+                    loop_uvs = np.frombuffer(group.face_uvs, dtype=np.int32)
+                    loop_uvs = loop_uvs[loop_order]
+                    set_uv_layer(mesh_data, uv_coords[loop_uvs], file_format)
                 progress.leave_substeps("uv end")
 
                 useSmooth = True
                 if useSmooth:
-                    # unique_smooth_groups
-                    unique_smooth_groups = {}
-                    for g in set(smoothGroups):
-                        unique_smooth_groups[g] = None
-
-                    if unique_smooth_groups:
-                        sharp_edges = set()
-                        smooth_group_users = {
-                            context_smooth_group: {}
-                            for context_smooth_group in
-                            unique_smooth_groups.keys()
-                        }
-                        context_smooth_group_old = -1
-
-                    # detect if edge is used in faces with different Smoothing Groups
-                    progress.enter_substeps(1, "detect smooth")
-                    for idx, face_vert_loc_indices in enumerate(objFaces):
-                        len_face_vert_loc_indices = len(face_vert_loc_indices)
-                        context_smooth_group = smoothGroups[idx]
-                        if unique_smooth_groups and context_smooth_group:
-                            # Is a part of of a smooth group and is a face
-                            if context_smooth_group_old is not context_smooth_group:
-                                edge_dict = smooth_group_users[
-                                    context_smooth_group]
-                                context_smooth_group_old = context_smooth_group
-                            prev_vidx = face_vert_loc_indices[-1]
-                            for vidx in face_vert_loc_indices:
-                                edge_key = (prev_vidx,
-                                            vidx) if (prev_vidx
-                                                      < vidx) else (vidx,
-                                                                    prev_vidx)
-                                prev_vidx = vidx
-                                edge_dict[edge_key] = edge_dict.get(
-                                    edge_key, 0) + 1
-                    progress.leave_substeps("detect smooth end")
-
-                    # Build sharp edges
-                    progress.enter_substeps(1, "build sharp")
-                    if unique_smooth_groups:
-                        for edge_dict in smooth_group_users.values():
-                            for key, users in edge_dict.items():
-                                if users == 1:  # This edge is on the boundry of 2 groups
-                                    sharp_edges.add(key)
-                    progress.leave_substeps("build sharp end")
-
-                    # Mark sharp edges
+                    # detect edges used in faces with different Smoothing Groups
                     progress.enter_substeps(1, "mark sharp")
-                    if unique_smooth_groups and sharp_edges:
-                        for e in mesh_data.edges:
-                            if e.key in sharp_edges:
-                                e.use_edge_sharp = True
-                        # mesh_data.show_edge_sharp = True
+                    mark_smooth_group_edges(mesh_data, loop_verts,
+                                            group.face_counts,
+                                            group.smooth_groups)
                     progress.leave_substeps("mark sharp end")
 
                 progress.enter_substeps(1, "linking")
@@ -350,21 +200,21 @@ def read_dmesh(operator, context, filepath, file_format):
 
                 # Assign vertex weights
                 progress.enter_substeps(1, "weights")
-                if weights:
-                    for w in [
-                            weight for weight in weights
-                            if weight[0] in vertDic
-                    ]:
-                        boneName = jointNames[w[1]]
-                        armature_da = armature_ob.data
-                        bone = armature_da.bones.get(boneName)
-                        if bone:
-                            vertGroup = mesh_obj.vertex_groups.get(boneName)
-                            if not vertGroup:
-                                vertGroup = mesh_obj.vertex_groups.new(
-                                    name=boneName)
-                            vertGroup.add([vertDic.index(w[0])], w[2],
-                                          'REPLACE')
+                if armature_ob and len(weight_verts):
+                    local_index = np.full(len(vert_coords), -1, dtype=np.int64)
+                    local_index[vertDic] = np.arange(len(vertDic))
+                    # rows pointing past the vertex list are skipped
+                    in_range = (weight_verts >= 0) & \
+                        (weight_verts < len(vert_coords))
+                    weight_local = np.full(len(weight_verts), -1,
+                                           dtype=np.int64)
+                    weight_local[in_range] = \
+                        local_index[weight_verts[in_range]]
+                    in_group = weight_local >= 0
+                    add_vertex_weights(mesh_obj, weight_group_names,
+                                       weight_local[in_group],
+                                       weight_bones[in_group],
+                                       weight_values[in_group])
                 progress.leave_substeps("weights end")
 
                 # parenting
@@ -412,7 +262,12 @@ class ImportHaydeeDMesh(Operator, ImportHelper):
         return {'RUNNING_MODAL'}
 
     def execute(self, context):
-        for file in self.files:
-            read_dmesh(self, context, os.path.join(self.directory, file.name),
-                       self.file_format)
+        filepaths = [
+            os.path.join(self.directory, file.name) for file in self.files
+        ]
+        # the encoding is detected in the workers, with the parsing
+        dmeshes = parse_files(parse_dmesh_file,
+                              [(filepath,) for filepath in filepaths])
+        for filepath, dmesh_data in zip(filepaths, dmeshes):
+            read_dmesh(self, context, filepath, self.file_format, dmesh_data)
         return {"FINISHED"}
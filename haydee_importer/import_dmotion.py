@@ -3,9 +3,9 @@ import bpy
 from bpy.types import Operator
 from bpy.props import *
 from bpy_extras.io_utils import ImportHelper
-import io
 from mathutils import Quaternion, Vector
 from ..HaydeeUtils import *
+from ..haydee_formats.motion import parse_dmot_file
 
 # --------------------------------------------------------------------------------
 # .dmot importer
@@ -28,70 +28,23 @@ def read_dmotion(operator, context, filepath):
             print("Importing dpose: %s" % filepath)
 
             progress.enter_substeps(1, "Read file")
-            data = None
-            encoding = find_encoding(filepath)
-            with open(filepath, "r", encoding=encoding) as a_file:
-                data = io.StringIO(a_file.read())
+            motion = parse_dmot_file(filepath)
             progress.leave_substeps("Read file end")
 
-            line = stripLine(data.readline())
-            line_split = line.split()
-            line_start = line_split[0]
-            signature = line_start
-
+            signature = motion.signature
             print('Signature:', signature)
             if signature != 'HD_DATA_TXT':
                 print("Unrecognized signature: %s" % signature)
                 operator.report({'ERROR'}, "Unrecognized file format")
                 return {'FINISHED'}
 
-            contextName = None
+            numFrames = motion.num_frames
             bones = {}
-            level = 0
-            numTracks = None
-            numFrames = None
-            frameRate = None
-            track = None
-            boneName = None
-
-            # steps = len(data.getvalue().splitlines()) - 1
-            progress.enter_substeps(1, "Parse Data")
-            # Read model data
-            for lineData in data:
-                line = stripLine(lineData)
-                line_split = line.split()
-                line_start = None
-                i = len(line_split)
-                if (i == 0):
-                    continue
-                line_start = line_split[0]
-                if (line_start in ('{')):
-                    level += 1
-                if (line_start in ('}')):
-                    level -= 1
-                    contextName = None
-
-                # info
-                if (level >= 1):
-                    if (line_start == 'numTracks'):
-                        numTracks = int(line_split[1])
-                    if (line_start == 'numFrames'):
-                        numFrames = int(line_split[1])
-                    if (line_start == 'frameRate'):
-                        frameRate = int(line_split[1])
-                    if (line_start == 'track'):
-                        boneName = boneRenameBlender(line_split[1])
-                        bones[boneName] = []
-
-                # motion
-                if (level >= 2):
-                    if (line_start == 'key'):
-                        posX, posY, posZ, quatX, quatZ, quatY, quatW = map(
-                            float, line_split[1:8])
-                        bonePose = (posX, posY, posZ, quatX, quatZ, quatY,
-                                    quatW)
-                        frame = len(bones[boneName])
-                        bones[boneName].append(bonePose)
+            for idx, name in enumerate(motion.track_names):
+                bones[boneRenameBlender(name)] = [
+                    motion.key(idx, frame)
+                    for frame in range(len(motion.tracks[idx]) // 7)
+                ]
 
             bpy.ops.object.mode_set(mode='OBJECT')
             bpy.ops.object.select_all(action='DESELECT')
@@ -3,9 +3,9 @@ import bpy
 from bpy.types import Operator
 from bpy.props import *
 from bpy_extras.io_utils import ImportHelper
-import io
 from mathutils import Quaternion, Vector
 from ..HaydeeUtils import *
+from ..haydee_formats.pose import parse_dpose_file
 
 # --------------------------------------------------------------------------------
 # .dpose importer
@@ -28,57 +28,23 @@ def read_dpose(operator, context, filepath):
             print("Importing dpose: %s" % filepath)
 
             progress.enter_substeps(1, "Read file")
-            data = None
-            encoding = find_encoding(filepath)
-            with open(filepath, "r", encoding=encoding) as a_file:
-                data = io.StringIO(a_file.read())
+            pose_data = parse_dpose_file(filepath)
             progress.leave_substeps("Read file end")
 
-            line = stripLine(data.readline())
-            line_split = line.split()
-            line_start = line_split[0]
-            signature = line_start
-
+            signature = pose_data.signature
             print('Signature:', signature)
             if signature != 'HD_DATA_TXT':
                 print("Unrecognized signature: %s" % signature)
                 operator.report({'ERROR'}, "Unrecognized file format")
                 return {'FINISHED'}
 
-            contextName = None
             bones = {}
-            transformsCount = None
-            level = 0
-
-            # steps = len(data.getvalue().splitlines()) - 1
-            progress.enter_substeps(1, "Parse Data")
-            # Read model data
-            for lineData in data:
-                line = stripLine(lineData)
-                line_split = line.split()
-                line_start = None
-                i = len(line_split)
-                if (i == 0):
-                    continue
-                line_start = line_split[0]
-                if (line_start in ('{')):
-                    level += 1
-                if (line_start in ('}')):
-                    level -= 1
-                    contextName = None
-
-                # Transforms
-                if (line_start == 'numTransforms' and level >= 1):
-                    transformsCount = int(line_split[1])
-
-                # Transforms
-                if (line_start == 'transform' and level >= 1):
-                    boneName = boneRenameBlender(line_split[1])
-                    posX, posY, posZ, quatX, quatZ, quatY, quatW = map(
-                        float, line_split[2:9])
-                    bonePose = (posX, posY, posZ, -quatX, -quatZ, -quatY,
-                                -quatW)
-                    bones[boneName] = bonePose
+            transformsCount = len(pose_data.bone_names)
+            for idx, name in enumerate(pose_data.bone_names):
+                (posX, posY, posZ, quatX, quatZ, quatY,
+                 quatW) = pose_data.transform(idx)
+                bonePose = (posX, posY, posZ, -quatX, -quatZ, -quatY, -quatW)
+                bones[boneRenameBlender(name)] = bonePose
 
             bpy.ops.object.mode_set(mode='OBJECT')
             bpy.ops.object.select_all(action='DESELECT')
@@ -3,9 +3,9 @@ import bpy
 from bpy.types import Operator
 from bpy.props import *
 from bpy_extras.io_utils import ImportHelper
-import io
 from mathutils import Quaternion, Vector
 from ..HaydeeUtils import *
+from ..haydee_formats.dskel import parse_dskel_file
 
 # --------------------------------------------------------------------------------
 # .dskel importer
@@ -18,70 +18,27 @@ def read_dskel(operator, context, filepath):
         with ProgressReportSubstep(progReport, 4, "Importing dskel",
                                    "Finish Importing dskel") as progress:
 
-            data = None
-            encoding = find_encoding(filepath)
-            with open(filepath, "r", encoding=encoding) as a_file:
-                data = io.StringIO(a_file.read())
-
-            line = stripLine(data.readline())
-            line_split = line.split()
-            line_start = line_split[0]
-            signature = line_start
+            progress.enter_substeps(1, "Parse Data")
+            skel = parse_dskel_file(filepath)
 
+            signature = skel.signature
             print('Signature:', signature)
             if signature != 'HD_DATA_TXT':
                 print("Unrecognized signature: %s" % signature)
                 operator.report({'ERROR'}, "Unrecognized file format")
                 return {'FINISHED'}
 
-            level = 0
-            boneCount = 0
-            jointName = None
-            jointNames = []
-            jointOrigin = []
-            jointAxis = []
-            jointParents = []
-            jointWidth = []
-            jointHeight = []
-            jointLength = []
-
-            # steps = len(data.getvalue().splitlines()) - 1
-            progress.enter_substeps(1, "Parse Data")
-            # Read model data
-            for lineData in data:
-                line = stripLine(lineData)
-                line_split = line.split()
-                line_start = None
-                i = len(line_split)
-                if (i == 0):
-                    continue
-                line_start = line_split[0]
-                if (line_start in ('{')):
-                    level += 1
-                if (line_start in ('}')):
-                    level -= 1
-                    contextName = None
-
-                # Joints
-                if (line_start == 'skeleton' and level == 0):
-                    boneCount = line_split[1]
-                if (line_start == 'bone' and level == 1):
-                    jointName = line_split[1]
-                    jointNames.append(jointName)
-                    jointParents.append(None)
-                if (line_start == 'parent' and level >= 2):
-                    jointParents[len(jointParents) - 1] = line_split[1]
-                if (line_start == 'origin' and level >= 2):
-                    readVec(line_split, jointOrigin, 3, float)
-                if (line_start == 'axis' and level >= 2):
-                    readVec(line_split, jointAxis, 4, float)
-
-                if (line_start == 'width' and level >= 2):
-                    jointWidth.append(float(line_split[1]))
-                if (line_start == 'height' and level >= 2):
-                    jointHeight.append(float(line_split[1]))
-                if (line_start == 'length' and level >= 2):
-                    jointLength.append(float(line_split[1]))
+            jointNames = skel.bone_names
+            jointParents = skel.bone_parents
+            jointOrigin = [
+                tuple(skel.bone_origins[i:i + 3])
+                for i in range(0, len(skel.bone_origins), 3)
+            ]
+            jointAxis = [
+                tuple(skel.bone_axes[i:i + 4])
+                for i in range(0, len(skel.bone_axes), 4)
+            ]
+            jointLength = skel.bone_lengths
 
             for idx, name in enumerate(jointNames):
                 jointNames[idx] = boneRenameBlender(name)
@@ -135,13 +92,13 @@ def read_dskel(operator, context, filepath):
                 # recalc all origins
                 progress.enter_substeps(boneCount, "aligning bones")
 
+                boneIndex = {name: idx for idx, name in enumerate(jointNames)}
+                boneRot = Quaternion([0, 0, 1], pi / 2).to_matrix().to_4x4()
                 for edit_bone in armature_da.edit_bones:
-                    idx = jointNames.index(edit_bone.name)
+                    idx = boneIndex[edit_bone.name]
                     quat = Quaternion(jointAxis[idx])
                     quat = Quaternion((-quat.z, quat.w, quat.y, -quat.x))
                     mat = quat.to_matrix().to_4x4()
-                    r = Quaternion([0, 0, 1], pi / 2)
-                    boneRot = r.to_matrix().to_4x4()
                     mat = mat @ boneRot
                     pos = Vector(jointOrigin[idx])
                     pos = Vector((-pos.y, -pos.z, pos.x))
@@ -3,13 +3,10 @@ import bpy
 from bpy.types import Operator
 from bpy.props import *
 from bpy_extras.io_utils import ImportHelper
-import io
-import struct
-import binascii
 import os
-from io import BytesIO
 from mathutils import Quaternion, Vector
 from ..HaydeeUtils import *
+from ..haydee_formats.material import parse_material_file
 from .HaydeeNodeMat import create_material
 
 
@@ -22,113 +19,22 @@ def read_material(operator, context, filepath):
             bpy.context.view_layer.objects.active.type != 'MESH':
         return {'FINISHED'}
 
-    class MatType(Enum):
-        OPAQUE = 0
-        MASK = 1
-        HAIR = 2
-
-    with open(filepath, "rb") as a_file:
-        data = a_file.read()
-    mview = memoryview(data)
+    material = parse_material_file(filepath)
 
     with ProgressReport(context.window_manager) as progReport:
         with ProgressReportSubstep(progReport, 4, "Importing outfit",
                                    "Finish Importing outfit") as progress:
 
-            propMap = None
-            sig = sig_check(mview)
-
-            if (sig == Signature.HD_CHUNK):
-                print("Signature: %s" % sig.name)
-
-                unpack_int = struct.Struct('<I').unpack
-                unpack_float = struct.Struct('<f').unpack
-                unpack_entry = struct.Struct('<32siiii').unpack
-                (entries, serialSize,
-                 assType) = struct.unpack('<ii8s', mview[20:36])
-
-                if (assType.decode('latin') != 'material'):
-                    print("Unrecognized signature or asset type: [%s], %s" %
-                          (binascii.hexlify(mview[0:16]), assType))
-                    operator.report({'ERROR'}, "Unrecognized file format")
-                    return {'FINISHED'}
-
-                propMap = dict(
-                    type={'reader': lambda x: unpack_int(x)[0]},
-                    twoSided={'reader': lambda x: unpack_int(x)[0]},
-                    width={'reader': lambda x: unpack_float(x)[0]},
-                    height={'reader': lambda x: unpack_float(x)[0]},
-                    autouv={'reader': lambda x: unpack_int(x)[0]},
-                    diffuseMap={'reader': lambda x: readStrW(0, x)[0]},
-                    normalMap={'reader': lambda x: readStrW(0, x)[0]},
-                    specularMap={'reader': lambda x: readStrW(0, x)[0]},
-                    emissionMap={'reader': lambda x: readStrW(0, x)[0]},
-                    censorMap={'reader': lambda x: readStrW(0, x)[0]},
-                    maskMap={'reader': lambda x: readStrW(0, x)[0]},
-                    surface={'reader': lambda x: readStrA_term(0, 64, x)[0]},
-                    speculars={'reader': lambda x: struct.unpack('<3f', x)})
-                dataOffset = 28 + (entries * 48)
-
-                for x in range(1, entries):
-                    sPos = 28 + (x * 48)
-                    (name, size, offset, numSubs,
-                     subs) = unpack_entry(mview[sPos:sPos + 48])
-                    name = readStrA_term(0, 32, name)[0]
-                    propMap[name].update(
-                        dict(
-                            zip([
-                                'size', 'offset', 'numSubs', 'subs', 'hasValue'
-                            ], [size, offset, numSubs, subs, size > 0])))
-
-                for value in propMap.values():
-                    if (value.get("hasValue")):
-                        (f, lSize, lOff) = (value['reader'], value['size'],
-                                            value['offset'])
-                        lOff = dataOffset + lOff
-                        value["value"] = f(mview[lOff:lOff + lSize])
-
-            elif (sig == Signature.HD_DATA_TXT
-                  or sig == Signature.HD_DATA_TXT_BOM):
-                encoding = find_encoding(filepath)
-                mview = io.TextIOWrapper(BytesIO(data), encoding=encoding)
-                print("Signature: %s" % sig.name)
-
-                propMap = dict(
-                    type={'reader': lambda s: MatType[s]},
-                    twoSided={'reader': lambda s: s.lower() == 'true'},
-                    width={'reader': lambda s: float(s)},
-                    height={'reader': lambda s: float(s)},
-                    autouv={'reader': lambda s: int(s)},
-                    diffuseMap={'reader': lambda s: s.strip('"')},
-                    normalMap={'reader': lambda s: s.strip('"')},
-                    specularMap={'reader': lambda s: s.strip('"')},
-                    emissionMap={'reader': lambda s: s.strip('"')},
-                    censorMap={'reader': lambda s: s.strip('"')},
-                    maskMap={'reader': lambda s: s.strip('"')},
-                    surface={'reader': lambda s: s},
-                    speculars={
-                        'reader':
-                        lambda s: tuple([float(val) for val in s.split()])
-                    })
-
-                line = mview.readline()
-                c = 0
-                while (line != '{' and c < 50):
-                    line = mview.readline().strip()
-                    c = c + 1
-                c = 0
-                while (line != '}' and c < 50):
-                    c = c + 1
-                    line = mview.readline().strip().strip(';')
-                    if (line == '}'): break
-                    key = line[0:line.index(' ')]
-                    value = line[line.index(' ') + 1:]
-                    propMap[key]["value"] = propMap[key]["reader"](value)
-            else:
-                print("Unrecognized signature or asset type: %s" %
-                      (binascii.hexlify(mview[0:16])))
+            signature = material.signature
+            if (signature not in ('HD_CHUNK', 'HD_DATA_TXT', 'HD_DATA_TXT_BOM')
+                    or signature == 'HD_CHUNK'
+                    and material.asset_type != 'material'):
+                print("Unrecognized signature or asset type: %s, %s" %
+                      (signature, material.asset_type))
                 operator.report({'ERROR'}, "Unrecognized file format")
                 return {'FINISHED'}
+            print("Signature: %s" % signature)
+            propMap = material.properties
 
             # Ready to create material
             obj = bpy.context.view_layer.objects.active
@@ -138,16 +44,15 @@ def read_material(operator, context, filepath):
 
             for key, value in propMap.items():
                 if ('Map') in key:
-                    vMap = value.get("value")
-                    if (vMap):
-                        value["value"] = material_path(basedir, vMap)
+                    if (value):
+                        propMap[key] = material_path(basedir, value)
 
-            useAlpha = (propMap.get("type") and propMap["type"]["value"] == 1)
+            useAlpha = (propMap.get("type") == 1)
             create_material(obj, useAlpha, matName,
-                            propMap['diffuseMap'].get('value'),
-                            propMap['normalMap'].get('value'),
-                            propMap['specularMap'].get('value'),
-                            propMap['emissionMap'].get('value'))
+                            propMap.get('diffuseMap'),
+                            propMap.get('normalMap'),
+                            propMap.get('specularMap'),
+                            propMap.get('emissionMap'))
 
     return {'FINISHED'}
 
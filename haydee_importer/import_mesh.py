@@ -4,31 +4,29 @@ from bpy.types import Operator
 from bpy.props import *
 from bpy_extras.io_utils import ImportHelper
 
-import struct
-
 import os
 
-from mathutils import Vector
+import numpy as np
 from ..HaydeeUtils import *
+from ..haydee_formats.mesh import parse_mesh_file
 
 # --------------------------------------------------------------------------------
 # .mesh importer
 # --------------------------------------------------------------------------------
 
 
-def read_mesh(operator, context, filepath, outfitName, file_format):
+def read_mesh(operator, context, filepath, outfitName, file_format,
+              mesh=None, trusted=False, timer=None):
     print('Mesh:', filepath)
+    # a timer is passed in with the read lap when the file was parsed ahead
+    if timer is None:
+        timer = StageTimer()
     with ProgressReport(context.window_manager) as progReport:
         with ProgressReportSubstep(progReport, 4, "Importing mesh",
                                    "Finish Importing mesh") as progress:
             if (bpy.context.mode != 'OBJECT'):
                 bpy.ops.object.mode_set(mode='OBJECT')
 
-            SIGNATURE_SIZE = 28
-            CHUNK_SIZE = 48
-            INIT_INFO = 32
-            VERT_SIZE = 60
-            FACE_SIZE = 12
             DEFAULT_MESH_NAME = os.path.splitext(os.path.basename(filepath))[0]
             if outfitName:
                 DEFAULT_MESH_NAME = DEFAULT_MESH_NAME
@@ -36,101 +34,75 @@ def read_mesh(operator, context, filepath, outfitName, file_format):
             bpy.ops.object.select_all(action='DESELECT')
             print("Importing mesh: %s" % filepath)
 
-            progress.enter_substeps(1, "Read file")
-            data = None
-            with open(filepath, "rb") as a_file:
-                data = a_file.read()
-            progress.leave_substeps("Read file end")
+            # already decoded when importing several files in parallel
+            if mesh is None:
+                progress.enter_substeps(1, "Read file")
+                mesh = parse_mesh_file(filepath)
+                progress.leave_substeps("Read file end")
+                timer.lap("read")
 
-            (signature, chunkCount, totalSize) = \
-                struct.unpack('20sII', data[0:SIGNATURE_SIZE])
-            signature = decodeText(signature)
+            signature = mesh.signature
             print('Signature:', signature)
             if signature != 'HD_CHUNK':
                 print("Unrecognized signature: %s" % signature)
                 operator.report({'ERROR'}, "Unrecognized file format")
                 return {'FINISHED'}
 
-            offset = SIGNATURE_SIZE + (CHUNK_SIZE * chunkCount)
-            (vertCount, loopCount, x1, y1, z1, x2, y2, z2) = \
-                struct.unpack('II3f3f', data[offset:offset + INIT_INFO])
-
-            posTop = Vector((-x1, z1, -y1))
-            posBottom = Vector((-x2, z2, -y2))
-
-            headerSize = SIGNATURE_SIZE + (CHUNK_SIZE * chunkCount) + INIT_INFO
-            delta = headerSize
-
-            vert_data = []
-            uv_data = []
-            normals = []
-
-            for n in range(vertCount):
-                offset = delta + (VERT_SIZE * n)
-                (
-                    x, y, z,
-                    u, v,
-                    vcolorR, vcolorG, vcolorB, vcolorA,
-                    normX, normY, normZ,
-                    tanX, tanY, tanZ,
-                    bitanX, bitanY, bitanZ) = \
-                    struct.unpack('3f2f4B9f', data[offset:offset + VERT_SIZE])
-                vert = Vector((-x, -z, y))
-                uv = Vector((u, v))
-                norm = Vector((-normX, -normZ, normY))
-                vert_data.append(vert)
-                uv_data.append(uv)
-                normals.append(norm)
-
-            faceCount = loopCount // 3
-            delta = headerSize + (VERT_SIZE * vertCount)
-            face_data = []
+            vert_data = mesh.verts
+            uv_data = mesh.uvs
+            normals = mesh.normals
+            face_data = mesh.faces.reshape(-1)
+            faceCount = len(mesh.faces)
             print('faceCount', faceCount)
-            for n in range(faceCount):
-                offset = delta + (FACE_SIZE * n)
-                (v1, v2, v3) = struct.unpack('3I',
-                                             data[offset:offset + FACE_SIZE])
-                face = [v3, v2, v1]
-                face_data.append(face)
 
             # Create Mesh
             progress.enter_substeps(1, "mesh data")
-            mesh_data = bpy.data.meshes.new(DEFAULT_MESH_NAME)
-            mesh_data.from_pydata(vert_data, [], face_data)
+            mesh_data = mesh_from_arrays(DEFAULT_MESH_NAME, vert_data,
+                                         face_data,
+                                         np.full(faceCount, 3, dtype=np.int32))
             # Shade smooth
             mesh_data.use_auto_smooth = True
             mesh_data.auto_smooth_angle = pi
             mesh_data.polygons.foreach_set("use_smooth",
                                            [True] * len(mesh_data.polygons))
             progress.leave_substeps("mesh data end")
+            timer.lap("mesh")
 
             # apply UVs
             progress.enter_substeps(1, "uv")
             useUvs = True
             if useUvs and uv_data is not None:
-                mesh_data.uv_layers.new()
-                blen_uvs = mesh_data.uv_layers[-1]
-                for loop in mesh_data.loops:
-                    uv_coord = Vector(uv_data[loop.vertex_index])
-                    if (file_format == 'H2'):
-                        uv_coord = Vector((uv_coord.x, 1 - uv_coord.y))
-                    blen_uvs.data[loop.index].uv = uv_coord
+                loop_verts = np.empty(len(mesh_data.loops), dtype=np.int32)
+                mesh_data.loops.foreach_get("vertex_index", loop_verts)
+                set_uv_layer(mesh_data, uv_data[loop_verts], file_format)
             progress.leave_substeps("uv end")
+            timer.lap("uv")
 
             # normals
             use_edges = True
             mesh_data.create_normals_split()
-            meshCorrected = mesh_data.validate(
-                clean_customdata=False)  # *Very* important to not remove nors!
+            # trusted files skip the topology checks, built from the file
+            # arrays the mesh is already consistent unless the file is broken
+            if not trusted:
+                # *Very* important to not remove nors!
+                mesh_data.validate(clean_customdata=False)
+                timer.lap("validate")
             mesh_data.update(calc_edges=use_edges)
-            mesh_data.normals_split_custom_set_from_vertices(normals)
+            # contiguous float32 rows are read through the buffer protocol
+            # instead of as one Python sequence per vertex
+            mesh_data.normals_split_custom_set_from_vertices(
+                np.ascontiguousarray(normals, dtype=np.float32))
             mesh_data.use_auto_smooth = True
+            timer.lap("normals")
 
             mesh_obj = bpy.data.objects.new(mesh_data.name, mesh_data)
             linkToActiveCollection(mesh_obj)
             mesh_obj.select_set(state=True)
             bpy.context.view_layer.objects.active = mesh_obj
 
+    operator.report({'INFO'}, "Imported %s: %s%s" %
+                    (mesh_obj.name, timer,
+                     " (validation skipped)" if trusted else ""))
     return {'FINISHED'}
 
 
@@ -147,6 +119,7 @@ class ImportHaydeeMesh(Operator, ImportHelper):
     )
 
     file_format: file_format_prop
+    trusted_file: trusted_file_prop
     directory: StringProperty(subtype='DIR_PATH')
     files: CollectionProperty(
         type=bpy.types.OperatorFileListElement,
@@ -158,7 +131,15 @@ class ImportHaydeeMesh(Operator, ImportHelper):
         return {'RUNNING_MODAL'}
 
     def execute(self, context):
-        for filepath in self.files:
-            read_mesh(self, context, self.directory + filepath.name, None,
-                      self.file_format)
+        filepaths = [self.directory + file.name for file in self.files]
+        meshes = parse_files(parse_mesh_file,
+                             [(filepath, ) for filepath in filepaths])
+        for filepath in filepaths:
+            # the main thread only waits for the files the workers have
+            # not parsed yet
+            timer = StageTimer()
+            mesh = next(meshes)
+            timer.lap("read")
+            read_mesh(self, context, filepath, None, self.file_format, mesh,
+                      self.trusted_file, timer)
         return {"FINISHED"}
@@ -4,113 +4,41 @@ from bpy.types import Operator
 from bpy.props import *
 from bpy_extras.io_utils import ImportHelper
 
-import struct
-import binascii
 import os
 
 from mathutils import Quaternion, Vector
 from ..HaydeeUtils import *
+from ..haydee_formats.motion import parse_motion_file
 
 # --------------------------------------------------------------------------------
 # .motion importer
 # --------------------------------------------------------------------------------
 
 
-# Helper for commong logic
-def read_motion_bones(memData, boneCount, numFrames, TRACK_SIZE, KEY_SIZE,
-                      TRACK_OFFSET, KEY_OFFSET):
-    unpack_bone = struct.Struct('<32sI').unpack
-    unpack_key = struct.Struct('3f4f').unpack
-    bones, boneNames = dict(), []
-    for n in range(boneCount):
-        offset = TRACK_OFFSET + (TRACK_SIZE * n)
-        (name, firstKey) = unpack_bone(memData[offset:offset + TRACK_SIZE])
-        name = boneRenameBlender(readStrA_term(0, 32, memoryview(name))[0])
-        keys = []
-        for k in range(firstKey, firstKey + numFrames):
-            offset = KEY_OFFSET + (KEY_SIZE * k)
-            (x, y, z, qx, qz, qy,
-             qw) = unpack_key(memData[offset:offset + KEY_SIZE])
-            keys.append((x, y, z, qx, qz, qy, qw))
-        bones[name] = keys
-        boneNames.append(name)
-    return (boneNames, bones)
-
-
 def read_motion(operator, context, filepath):
     armature = find_armature(operator, context)
     if not armature:
         return {'FINISHED'}
 
-    with open(filepath, "rb") as a_file:
-        data = a_file.read()
-    mview = memoryview(data)
-
-    (entries, serialSize, assType) = struct.unpack('<ii6s', mview[20:34])
-    assType, sig = assType.decode("latin"), sig_check(mview)
-    propMap, numFrames = None, None
-    unpack_int = struct.Struct('<i').unpack
-    unpack_entry = struct.Struct('<32siiii').unpack
-
-    if (sig == Signature.HD_CHUNK and assType == 'motion'):
-        print('Signature:', Signature.HD_CHUNK.name)
-        propMap = dict(numFrames={'reader': lambda x: unpack_int(x)[0]},
-                       duration={'reader': lambda x: unpack_int(x)[0]},
-                       numKeys={'reader': lambda x: unpack_int(x)[0]},
-                       numTracks={'reader': lambda x: unpack_int(x)[0]},
-                       numEvents={'reader': lambda x: unpack_int(x)[0]},
-                       keys={'reader': lambda x: True},
-                       tracks={'reader': lambda x: True},
-                       events={'reader': lambda x: False})
-
-        dataOffset = 28 + (entries * 48)
-
-        for x in range(1, entries):
-            sPos = 28 + (x * 48)
-            (name, size, offset, numSubs,
-             subs) = unpack_entry(mview[sPos:sPos + 48])
-            name = readStrA_term(0, 32, memoryview(name))[0]
-            propMap[name].update(
-                dict(
-                    zip(['size', 'offset', 'numSubs', 'subs', 'hasValue'],
-                        [size, offset, numSubs, subs, size > 0])))
-
-        for key, value in propMap.items():
-            if (value.get("hasValue")):
-                (f, lSize, lOff) = (value['reader'], value['size'],
-                                    value['offset'])
-                lOff = dataOffset + lOff
-                value["value"] = f(mview[lOff:lOff + lSize])
-
-        numFrames = propMap['numFrames']['value']
-        boneCount = propMap['numTracks']['value']
-        trackSize = int(propMap['tracks']['size'] / boneCount)
-        keySize = int(propMap['keys']['size'] / propMap['numKeys']['value'])
-        trackOffset = 28 + (entries * 48) + int(propMap['tracks']['offset'])
-        keyOffset = 28 + (entries * 48) + int(propMap['keys']['offset'])
-        (boneNames, bones) = read_motion_bones(mview, boneCount, numFrames,
-                                               trackSize, keySize, trackOffset,
-                                               keyOffset)
-
-    elif (sig == Signature.HD_MOTION):
-        print('Signature:', Signature.HD_MOTION.name)
-        KEY_SIZE = 28
-        TRACK_SIZE = 36
-
-        (keyCount, boneCount, firstFrame, duration, numFrames,
-         dataSize) = struct.unpack('6I', data[20:44])
-        keyOffset = 44
-        trackOffset = 44 + int(KEY_SIZE * keyCount)
-        (boneNames, bones) = read_motion_bones(mview, boneCount, numFrames,
-                                               TRACK_SIZE, KEY_SIZE,
-                                               trackOffset, keyOffset)
-
+    motion = parse_motion_file(filepath)
+    if (motion.signature == 'HD_CHUNK' and motion.asset_type == 'motion'
+            or motion.signature == 'HD_MOTION'):
+        print('Signature:', motion.signature)
     else:
-        print("Unrecognized signature or asset type: [%s], %s" %
-              (binascii.hexlify(mview[0:16]), assType))
+        print("Unrecognized signature or asset type: %s, %s" %
+              (motion.signature, motion.asset_type))
         operator.report({'ERROR'}, "Unrecognized file format")
         return {'FINISHED'}
 
+    numFrames = motion.num_frames
+    bones, boneNames = dict(), []
+    for idx, name in enumerate(motion.track_names):
+        name = boneRenameBlender(name)
+        bones[name] = [
+            motion.key(idx, frame) for frame in range(numFrames)
+        ]
+        boneNames.append(name)
+
     boneNames.reverse()
 
     bpy.ops.object.mode_set(mode='OBJECT')
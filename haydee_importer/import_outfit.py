@@ -3,9 +3,9 @@ import bpy
 from bpy.types import Operator
 from bpy.props import *
 from bpy_extras.io_utils import ImportHelper
-import io
 import os
 from ..HaydeeUtils import *
+from ..haydee_formats.outfit import parse_outfit_file
 
 from .import_mesh import read_mesh
 from .import_material import read_material
@@ -16,73 +16,26 @@ from .import_skin import read_skin
 # --------------------------------------------------------------------------------
 
 
-def read_outfit(operator, context, filepath, file_format):
+def read_outfit(operator, context, filepath, file_format, trusted=False):
     print('Outfit:', filepath)
     with ProgressReport(context.window_manager) as progReport:
         with ProgressReportSubstep(progReport, 4, "Importing outfit",
                                    "Finish Importing outfit") as progress:
 
-            data = None
-            encoding = find_encoding(filepath)
-            with open(filepath,
-                      "r",
-                      encoding=encoding,
-                      errors="surrogateescape") as a_file:
-                data = io.StringIO(a_file.read())
-
-            line = stripLine(data.readline())
-            line_split = line.split()
-            line_start = line_split[0]
-            signature = line_start
+            progress.enter_substeps(1, "Parse Data")
+            outfit = parse_outfit_file(filepath)
 
+            signature = outfit.signature
             print('Signature:', signature)
             if signature != 'HD_DATA_TXT':
                 print("Unrecognized signature: %s" % signature)
                 operator.report({'ERROR'}, "Unrecognized file format")
                 return {'FINISHED'}
 
-            level = 0
-            outfitName = None
-
-            meshFiles = []
-            skinFiles = []
-            materialFiles = []
-
-            # steps = len(data.getvalue().splitlines()) - 1
-            progress.enter_substeps(1, "Parse Data")
-            # Read model data
-            for lineData in data:
-                line = stripLine(lineData)
-                line_split = line.split(maxsplit=1)
-                line_start = None
-                i = len(line_split)
-                if (i == 0):
-                    continue
-                line_start = line_split[0]
-                if (line_start in ('{')):
-                    level += 1
-                if (line_start in ('}')):
-                    level -= 1
-                    contextName = None
-
-                if (line_start == 'outfit' and level == 0
-                        and len(line_split) > 1):
-                    outfitName = line_split[1].replace('"', '')
-
-                # Joints
-                if (line_start == 'name' and level == 1):
-                    outfitName = line_split[1].replace('"', '')
-
-                if (line_start == 'mesh' and level == 2):
-                    meshFiles.append(line_split[1].replace('"', ''))
-                    skinFiles.append(None)
-                    materialFiles.append(None)
-                if (line_start == 'skin' and level == 2):
-                    skinFiles[len(meshFiles) - 1] = line_split[1].replace(
-                        '"', '')
-                if (line_start == 'material' and level == 2):
-                    materialFiles[len(meshFiles) - 1] = line_split[1].replace(
-                        '"', '')
+            outfitName = outfit.name
+            meshFiles = outfit.mesh_files
+            skinFiles = outfit.skin_files
+            materialFiles = outfit.material_files
 
             combo = []
             for idx in range(len(meshFiles)):
@@ -113,7 +66,7 @@ def read_outfit(operator, context, filepath, file_format):
                 # Create Mesh
                 if meshpath and os.path.exists(meshpath):
                     read_mesh(operator, context, meshpath, outfitName,
-                              file_format)
+                              file_format, trusted=trusted)
                     imported_meshes.append(
                         bpy.context.view_layer.objects.active)
                 else:
@@ -165,6 +118,8 @@ class ImportHaydeeOutfit(Operator, ImportHelper):
     )
 
     file_format: file_format_prop
+    trusted_file: trusted_file_prop
 
     def execute(self, context):
-        return read_outfit(self, context, self.filepath, self.file_format)
+        return read_outfit(self, context, self.filepath, self.file_format,
+                           self.trusted_file)
@@ -3,9 +3,9 @@ import bpy
 from bpy.types import Operator
 from bpy.props import *
 from bpy_extras.io_utils import ImportHelper
-import struct
 from mathutils import Quaternion, Vector
 from ..HaydeeUtils import *
+from ..haydee_formats.pose import parse_pose_file
 
 # --------------------------------------------------------------------------------
 # .pose importer
@@ -18,37 +18,21 @@ def read_pose(operator, context, filepath):
     if not armature:
         return {'FINISHED'}
 
-    with open(filepath, "rb") as a_file:
-        data = a_file.read()
+    pose_data = parse_pose_file(filepath)
 
-    SIGNATURE_SIZE = 28
-    CHUNK_SIZE = 48
-    SIZE2 = 60
-
-    (signature, chunkCount, totalSize) = struct.unpack('20sII',
-                                                       data[0:SIGNATURE_SIZE])
-    signature = decodeText(signature)
+    signature = pose_data.signature
     print("Signature:", signature)
     if signature != 'HD_CHUNK':
         print("Unrecognized signature: %s" % signature)
         operator.report({'ERROR'}, "Unrecognized file format")
         return {'FINISHED'}
 
-    offset = SIGNATURE_SIZE + (CHUNK_SIZE * chunkCount)
-    boneCount = struct.unpack('I', data[offset:offset + 4])
-    boneCount = boneCount[0]
-
+    boneCount = len(pose_data.bone_names)
     bones = {}
     boneNames = []
-    delta = SIGNATURE_SIZE + (CHUNK_SIZE * chunkCount) + 4
-    for n in range(boneCount):
-        offset = delta + (SIZE2 * n)
-        (x, y, z, qx, qz, qy, qw,
-         name) = struct.unpack('3f4f32s', data[offset:offset + SIZE2])
-        bonePose = (x, y, z, qx, qz, qy, qw)
-        name = decodeText(name)
+    for n, name in enumerate(pose_data.bone_names):
         name = boneRenameBlender(name)
-        bones[name] = bonePose
+        bones[name] = pose_data.transform(n)
         boneNames.append(name)
 
     bpy.ops.object.mode_set(mode='OBJECT')
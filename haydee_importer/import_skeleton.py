@@ -3,170 +3,56 @@ import bpy
 from bpy.types import Operator
 from bpy.props import *
 from bpy_extras.io_utils import ImportHelper
-import struct
-import binascii
 from mathutils import Quaternion, Vector
 from ..HaydeeUtils import *
+from ..haydee_formats.skel import parse_skel_file
 
 # --------------------------------------------------------------------------------
 # .skel importer
 # --------------------------------------------------------------------------------
 
 
-def recurBonesOrigin(progress, parentBone, jointNames, mats):
-    for childBone in parentBone.children:
-        if childBone:
-            idx = jointNames.index(childBone.name)
-            child_mat = mats[idx]
-            # INV row
-            x1 = Matrix(
-                ((0, 0, -1, 0), (1, 0, 0, 0), (0, 1, 0, 0), (0, 0, 0, 1)))
-            # INV col
-            x2 = Matrix(
-                ((0, 1, 0, 0), (0, 0, 1, 0), (-1, 0, 0, 0), (0, 0, 0, 1)))
-
-            childBone.matrix = parentBone.matrix @ (x1 @ child_mat @ x2)
-            recurBonesOrigin(progress, childBone, jointNames, mats)
-            progress.step()
+def rotateNonRootBone(rootBone):
+    r = Quaternion((0, 0, 1), -pi / 2).to_matrix().to_4x4()
+    bones = [rootBone]
+    while bones:
+        bone = bones.pop()
+        if ('root' in bone.name.lower()):
+            continue
+        bone.matrix = r @ bone.matrix
+        bones.extend(bone.children)
 
 
-def rotateNonRootBone(parentBone):
-    if ('root' in parentBone.name.lower()):
-        return
-    r = Quaternion((0, 0, 1), -pi / 2).to_matrix().to_4x4()
-    parentBone.matrix = r @ parentBone.matrix
-    for childBone in parentBone.children:
-        rotateNonRootBone(childBone)
-
-
-# Parse bone data helper
-def read_bone_data(memData, propMap, jointNames, jointParents, mats,
-                   dimensions):
-    boneCount = propMap['numBones']['value']
-    BONE_SIZE = int(propMap['bones']['size'] / boneCount)
-    unpack_bone = struct.Struct('<32s16fi3fi').unpack
-    for n in range(boneCount):
-        offset = (BONE_SIZE * n)
-        (name, f1, f2, f3, f4, f5, f6, f7, f8, f9, f10, f11, f12, f13, f14,
-         f15, f16, parent, width, height, lenght,
-         flags) = unpack_bone(memData[offset:offset + BONE_SIZE])
-
-        name = readStrA_term(0, 32, memoryview(name))[0]
-        name = boneRenameBlender(name)
-        mat = Matrix(((f1, f5, f9, f13), (f2, f6, f10, f14),
-                      (f3, f7, f11, f15), (f4, f8, f12, f16)))
-        jointNames.append(name)
-        jointParents.append(parent)
-        mats.append(mat)
-        dimensions.append((width, height, lenght))
-    return True
-
-
-# Parse joint data helper
-def read_joint_data(memData, propMap, joint_data):
-    joints_count = propMap['numJoints']['value']
-    JOINT_SIZE = int(propMap['joints']['size'] / joints_count)
-    unpack_joint = struct.Struct('<18f4f').unpack
-    for n in range(joints_count):
-        offset = (JOINT_SIZE * n)
-        (index, parent, f1, f2, f3, f4, f5, f6, f7, f8, f9, f10, f11, f12, f13,
-         f14, f15, f16, twistX, twistY, swingX,
-         swingY) = unpack_joint(memData[offset:offset + JOINT_SIZE])
-
-        mat = Matrix(((f1, f5, f9, f13), (f2, f6, f10, f14),
-                      (f3, f7, f11, f15), (f4, f8, f12, f16)))
-
-        joint_data[index] = {
-            'parent': parent,
-            'twistX': twistX,
-            'twistY': twistY,
-            'swingX': swingX,
-            'swingY': swingY,
-            'matrix': mat
-        }
-    return True
-
-
-# Parse fixes data
-def read_fixes_data(memData, propMap, fix_data):
-    fixes_count = propMap['numFixes']['value']
-    FIXES_SIZE = int(propMap['fixes']['size'] / fixes_count)
-    unpack_fixes = struct.Struct('<5I').unpack
-    for n in range(fixes_count):
-        offset = (FIXES_SIZE * n)
-        (type, flags, fix1, fix2,
-         index) = unpack_fixes(memData[offset:offset + FIXES_SIZE])
-        fix_data[index] = ({
-            'type': type,
-            'flags': flags,
-            'fix1': fix1,
-            'fix2': fix2
-        })
-    return True
+def file_matrix(values):
+    """Matrix from the 16 column major floats stored in the file"""
+    return Matrix((values[0:4], values[4:8], values[8:12],
+                   values[12:16])).transposed()
 
 
 def read_skel(operator, context, filepath):
     print('skel:', filepath)
-    with open(filepath, "rb") as a_file:
-        data = a_file.read()
-    mview = memoryview(data)
-
-    (entries, serialSize, assType) = struct.unpack('<ii8s', mview[20:36])
-    assType = assType.decode("latin")
+    skel = parse_skel_file(filepath)
 
-    if (sig_check(mview) != Signature.HD_CHUNK or assType != 'skeleton'):
-        print("Unrecognized signature or asset type: [%s], %s" %
-              (binascii.hexlify(mview[0:16]), assType))
+    if (skel.signature != 'HD_CHUNK' or skel.asset_type != 'skeleton'):
+        print("Unrecognized signature or asset type: %s, %s" %
+              (skel.signature, skel.asset_type))
         operator.report({'ERROR'}, "Unrecognized file format")
         return {'FINISHED'}
 
-    # Compiled structs
-    unpack_int = struct.Struct('<i').unpack
-    unpack_entry = struct.Struct('<32siiii').unpack
-
     # Data
-    jointNames, jointParents, mats, dimensions = [], [], [], []
-    joint_data, fix_data = {}, {}
+    jointNames = [boneRenameBlender(name) for name in skel.bone_names]
+    jointParents = skel.bone_parents
+    mats = [
+        file_matrix(skel.bone_matrices[idx * 16:idx * 16 + 16])
+        for idx in range(len(jointNames))
+    ]
+    dimensions = [
+        tuple(skel.bone_dimensions[idx * 3:idx * 3 + 3])
+        for idx in range(len(jointNames))
+    ]
+    joint_data, fix_data = skel.joints, skel.fixes
     armature_ob = None
 
-    propMap = dict(
-        numBones={'reader': lambda x: unpack_int(x)[0]},
-        numJoints={'reader': lambda x: unpack_int(x)[0]},
-        numFixes={'reader': lambda x: unpack_int(x)[0]},
-        numBounds={'reader': lambda x: unpack_int(x)[0]},
-        numTrackers={'reader': lambda x: unpack_int(x)[0]},
-        numSlots={'reader': lambda x: unpack_int(x)[0]},
-        bones={
-            'reader':
-            lambda x: read_bone_data(x, propMap, jointNames, jointParents,
-                                     mats, dimensions)
-        },
-        fixes={'reader': lambda x: read_fixes_data(x, propMap, fix_data)},
-        joints={'reader': lambda x: read_joint_data(x, propMap, joint_data)},
-        slots={
-            'reader':
-            lambda x: print("Skipping slots since this data is irrelevant")
-        })
-
-    dataOffset = 28 + (entries * 48)
-
-    for x in range(1, entries):
-        sPos = 28 + (x * 48)
-        (name, size, offset, numSubs,
-         subs) = unpack_entry(mview[sPos:sPos + 48])
-        name = readStrA_term(0, 32, memoryview(name))[0]
-        propMap[name].update(
-            dict(
-                zip(['size', 'offset', 'numSubs', 'subs', 'hasValue'],
-                    [size, offset, numSubs, subs, size > 0])))
-
-    for key, value in propMap.items():
-        if (value.get("hasValue")):
-            (f, lSize, lOff) = (value['reader'], value['size'],
-                                value['offset'])
-            lOff = dataOffset + lOff
-            value["value"] = f(mview[lOff:lOff + lSize])
-
     print(fix_data)
     with ProgressReport(context.window_manager) as progReport:
         with ProgressReportSubstep(progReport, 4, "Importing skel",
@@ -206,34 +92,25 @@ def read_skel(operator, context, filepath):
 
                 # set all bone parents
                 progress.enter_substeps(boneCount, "parenting bones")
+                editBones = armature_da.edit_bones
                 for idx, jointParent in enumerate(jointParents):
                     if (jointParent >= 0):
-                        editBone = armature_da.edit_bones[idx]
-                        editBone.parent = armature_da.edit_bones[jointParent]
+                        editBones[idx].parent = editBones[jointParent]
                     progress.step()
                 progress.leave_substeps("parenting bones end")
 
                 # origins of each bone is relative to its parent
                 # recalc all origins
                 progress.enter_substeps(boneCount, "aligning bones")
-                rootBones = [
-                    rootBone for rootBone in armature_da.edit_bones
-                    if rootBone.parent is None
-                ]
-
-                # swap rows root bones
-                swap_rows = Matrix(
-                    ((-1, 0, 0, 0), (0, 0, -1, 0), (0, 1, 0, 0), (0, 0, 0, 1)))
-                # swap cols root bones
-                swap_cols = Matrix(
-                    ((0, 1, 0, 0), (0, 0, 1, 0), (1, 0, 0, 0), (0, 0, 0, 1)))
-
-                for rootBone in rootBones:
-                    idx = jointNames.index(rootBone.name)
-                    mat = mats[idx]
-                    rootBone.matrix = swap_rows @ mat @ swap_cols
-                    recurBonesOrigin(progress, rootBone, jointNames, mats)
-                    progress.step()
+                localMats = []
+                for idx, jointParent in enumerate(jointParents):
+                    if (jointParent >= 0):
+                        localMats.append(SWAP_ROW_SKEL_CHILD @ mats[idx]
+                                         @ SWAP_COL_SKEL_CHILD)
+                    else:
+                        localMats.append(SWAP_ROW_SKEL_ROOT @ mats[idx]
+                                         @ SWAP_COL_SKEL_ROOT)
+                set_bone_matrices(editBones, jointParents, localMats, progress)
                 progress.leave_substeps("aligning bones end")
 
                 # lenght of bones
@@ -250,6 +127,10 @@ def read_skel(operator, context, filepath):
                                 bone.tail = center
 
                 # Rotate bone not in 'SK_Root' chain
+                rootBones = [
+                    rootBone for rootBone in editBones
+                    if rootBone.parent is None
+                ]
                 for bone in rootBones:
                     rotateNonRootBone(bone)
 
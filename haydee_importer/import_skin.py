@@ -3,9 +3,10 @@ import bpy
 from bpy.types import Operator
 from bpy.props import *
 from bpy_extras.io_utils import ImportHelper
-import struct
 from mathutils import Quaternion, Vector
+import numpy as np
 from ..HaydeeUtils import *
+from ..haydee_formats.skin import parse_skin_file, unpack_bone_matrices
 # --------------------------------------------------------------------------------
 # .skin importer
 # --------------------------------------------------------------------------------
@@ -23,76 +24,38 @@ def read_skin(operator, context, filepath, armature_ob):
             if (bpy.context.mode != 'OBJECT'):
                 bpy.ops.object.mode_set(mode='OBJECT')
 
-            SIGNATURE_SIZE = 28
-            CHUNK_SIZE = 48
-            INIT_INFO = 8
-            VERT_SIZE = 20
-            BONE_SIZE = 112
-
             print("Importing mesh: %s" % filepath)
 
             progress.enter_substeps(1, "Read file")
-            data = None
-            with open(filepath, "rb") as a_file:
-                data = a_file.read()
+            skin = parse_skin_file(filepath)
             progress.leave_substeps("Read file end")
 
-            (signature, chunkCount, totalSize) = \
-                struct.unpack('20sII', data[0:SIGNATURE_SIZE])
-            signature = decodeText(signature)
+            signature = skin.signature
             print('Signature:', signature)
             if signature != 'HD_CHUNK':
                 print("Unrecognized signature: %s" % signature)
                 operator.report({'ERROR'}, "Unrecognized file format")
                 return {'FINISHED'}
 
-            offset = SIGNATURE_SIZE + (CHUNK_SIZE * chunkCount)
-            (vertCount, boneCount) = \
-                struct.unpack('II', data[offset:offset + INIT_INFO])
-
-            vert_data = []
-            headerSize = SIGNATURE_SIZE + (CHUNK_SIZE * chunkCount) + INIT_INFO
-            delta = headerSize
-            for n in range(vertCount):
-                offset = delta + (VERT_SIZE * n)
-                (w1, w2, w3, w4, b1, b2, b3, b4) = \
-                    struct.unpack('4f4B', data[offset:offset + VERT_SIZE])
-
-                weights = ((b1, w1), (b2, w2), (b3, w3), (b4, w4))
-                vert_data.append(weights)
-
+            boneCount = len(skin.bone_names)
+            transforms = unpack_bone_matrices(skin.bone_matrices)
             bone_data = []
-
-            delta = headerSize + (VERT_SIZE * vertCount)
-            for n in range(boneCount):
-                offset = delta + (BONE_SIZE * n)
-                (name,
-                    f1, f2, f3, f4,
-                    f5, f6, f7, f8,
-                    f9, f10, f11, f12,
-                    f13, f14, f15, f16,
-                    vx, vy, vz, vw) = \
-                    struct.unpack('32s16f4f', data[offset:offset + BONE_SIZE])
-
-                name = decodeText(name)
+            for n, name in enumerate(skin.bone_names):
                 name = boneRenameBlender(name)
-                mat = Matrix(((f1, f2, f3, f4), (f5, f6, f7, f8),
-                              (f9, f10, f11, f12), (f13, f14, f15, f16)))
-                vec = Vector((vx, vy, vz, vw))
+                mat = Matrix(transforms[n].tolist())
+                vec = Vector(skin.bone_vectors[n].tolist())
                 bone_data.append({'name': name, 'mat': mat, 'vec': vec})
 
             mesh_obj = bpy.context.view_layer.objects.active
 
-            for vertIdx, v_data in enumerate(vert_data):
-                for boneIdx, vertexWeight in v_data:
-
-                    if (boneIdx != 0 or vertexWeight != 0):
-                        boneName = bone_data[boneIdx]['name']
-                        vertGroup = mesh_obj.vertex_groups.get(boneName)
-                        if not vertGroup:
-                            vertGroup = mesh_obj.vertex_groups.new(
-                                name=boneName)
-                        vertGroup.add([vertIdx], vertexWeight, 'REPLACE')
+            # unused slots are stored as bone 0 with weight 0
+            used = (skin.bones != 0) | (skin.weights != 0)
+            vert_indices = np.nonzero(used)[0]
+            bone_indices = skin.bones[used].astype(np.int64)
+            weights = skin.weights[used]
+            add_vertex_weights(mesh_obj,
+                               [b_data['name'] for b_data in bone_data],
+                               vert_indices, bone_indices, weights)
 
             if not armature_ob:
                 armature_ob = None
@@ -120,9 +83,6 @@ def read_skin(operator, context, filepath, armature_ob):
                     mat = b_data['mat']
                     editBone = armature_ob.data.edit_bones.new(boneName)
                     editBone.tail = Vector(editBone.head) + Vector((0, 0, 4))
-                    pos = Vector(mat.to_3x3() @ mat.row[3].xyz)
-                    mat = mat.to_3x3().to_4x4()
-                    mat.translation = pos
                     editBone.matrix = axis_orient @ mat @ bone_orient
                 progress.step()
 
@@ -16,6 +16,7 @@ class HaydeeExportSubMenu(bpy.types.Menu):
 
     def draw(self, context):
         layout = self.layout
+        layout.operator(ExportHaydeeMesh.bl_idname, text="Haydee Mesh (.mesh)")
         layout.operator(ExportHaydeeDMesh.bl_idname,
                         text="Haydee DMesh (.dmesh)")
         layout.operator(ExportHaydeeDSkel.bl_idname,
@@ -102,6 +102,7 @@ class HaydeeToolsExportPanel(_HaydeeToolsPanel, bpy.types.Panel):
         # c = col.column()
         r = col.row(align=True)
         r.operator("haydee_exporter.dmesh", text='DMesh', icon='NONE')
+        r.operator("haydee_exporter.mesh", text='Mesh', icon='NONE')
 
         # col.separator()
         col = layout.column()
@@ -0,0 +1,20 @@
+"""pytest plugin: collect the addon folder as a plain directory.
+
+The folder is a Blender package, its __init__ imports bpy. The tests only
+import the bpy free modules, from the folder itself.
+"""
+
+import os
+import sys
+
+import pytest
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ADDON_DIR)
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_collect_directory(path, parent):
+    if str(path) == ADDON_DIR:
+        return pytest.Dir.from_parent(parent, path=path)
+    return None
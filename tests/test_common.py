@@ -0,0 +1,118 @@
+import random
+import struct
+
+import numpy as np
+import pytest
+
+from haydee_formats.common import (d, format_floats, format_rows, map_file,
+                                   remap_indices, reversed_loop_order,
+                                   write_rows)
+
+
+def reference(values, row, width, precision):
+    """format_rows written with one d() per value"""
+    values = list(values)
+    return ''.join(row % tuple(d(v, precision) for v in values[i:i + width])
+                   for i in range(0, len(values), width))
+
+
+def sample_values():
+    rnd = random.Random(1)
+    special = [0.0, -0.0, 1e-7, -1e-7, 5e-7, -5e-7, 0.5, 10.0, -100.0,
+               1e20, -1e-20, float('nan'), float('inf'), -float('inf'),
+               2.5e-6, 123456789.0000004, 1.0000005, -0.9999995, 1 / 128,
+               -5 / 128, 2.5, -3.5, 4503599627.370496, 9e15, 1e300, 5e-324]
+    bits = [struct.unpack('<d', struct.pack('<Q', rnd.getrandbits(64)))[0]
+            for _ in range(3000)]
+    f32 = np.random.default_rng(0).integers(0, 2 ** 32, 3000, dtype=np.uint32)
+    with np.errstate(invalid='ignore'):
+        f32 = np.frombuffer(f32.tobytes(), np.float32).astype(np.float64)
+    f32 = f32.tolist()
+    dyadic = [rnd.randrange(-10 ** 6, 10 ** 6) / 2 ** rnd.randrange(0, 12)
+              for _ in range(3000)]
+    uniform = [rnd.uniform(-2, 2) for _ in range(3000)]
+    return special + bits + f32 + dyadic + uniform
+
+
+VALUES = sample_values()
+
+
+@pytest.mark.parametrize('precision', range(0, 13))
+@pytest.mark.parametrize('row, width', [('%s\n', 1),
+                                        ('\t\tvert %s %s %s;\n', 3),
+                                        ('\t\tuv %s %s;\n', 2)])
+def test_format_rows_matches_d(precision, row, width):
+    count = len(VALUES) // width * width
+    values = VALUES[:count]
+    assert (format_rows(values, row, width, precision) ==
+            reference(values, row, width, precision))
+
+
+def test_format_rows_large_fraction():
+    # ten or more decimals do not fit the int32 digit extraction
+    values = [0.9999999999, 0.123456789012, -3.000000000001, 2147.4836479]
+    for precision in (10, 11, 12):
+        assert format_floats(values, precision) == [d(v, precision)
+                                                    for v in values]
+
+
+def test_format_rows_empty():
+    assert format_rows([], '%s %s\n', 2) == ''
+
+
+def test_write_rows_blocks(monkeypatch):
+    import io
+    from haydee_formats import common
+    monkeypatch.setattr(common, 'ROWS_PER_WRITE', 7)
+    values = VALUES[:300]
+    out = io.StringIO()
+    write_rows(out, 'v %s %s %s\n', values, 3, 5)
+    assert out.getvalue() == reference(values, 'v %s %s %s\n', 3, 5)
+
+
+def test_map_file(tmp_path):
+    path = tmp_path / 'data.bin'
+    path.write_bytes(b'HD_CHUNK')
+    with map_file(str(path)) as data:
+        assert data[:8] == b'HD_CHUNK'
+    (tmp_path / 'empty.bin').write_bytes(b'')
+    with map_file(str(tmp_path / 'empty.bin')) as data:
+        assert data == b''
+
+
+def test_map_file_leaked_view(tmp_path):
+    path = tmp_path / 'data.bin'
+    path.write_bytes(b'HD_CHUNK')
+    views = []
+    with pytest.raises(BufferError):
+        with map_file(str(path)) as data:
+            views.append(memoryview(data))
+    views[0].release()
+
+    # while a decode error propagates the view is left to the traceback
+    with pytest.raises(KeyError):
+        with map_file(str(path)) as data:
+            views.append(memoryview(data))
+            raise KeyError('chunk')
+    views[1].release()
+
+
+def test_remap_indices():
+    indices = np.array([7, 3, 7, 9, 3, 1])
+    unique, local = remap_indices(indices)
+    assert unique.tolist() == [7, 3, 9, 1]
+    assert local.tolist() == [0, 1, 0, 2, 1, 3]
+    assert (unique[local] == indices).all()
+
+
+def test_remap_indices_empty():
+    unique, local = remap_indices(np.array([], dtype=np.int64))
+    assert len(unique) == 0
+    assert len(local) == 0
+
+
+def test_reversed_loop_order():
+    loops = np.array([10, 11, 12, 20, 21, 22, 23, 30, 31, 32])
+    order = reversed_loop_order([3, 4, 3])
+    assert loops[order].tolist() == [12, 11, 10, 23, 22, 21, 20, 32, 31, 30]
+    assert len(reversed_loop_order([])) == 0
@@ -0,0 +1,148 @@
+import io
+
+from haydee_formats.dmesh import (DMeshData, DMeshGroup, DMeshWriter,
+                                  dmesh_from_snapshot, dmesh_snapshot,
+                                  dump_dmesh, dump_dmesh_snapshot_file,
+                                  parse_dmesh, parse_dmesh_file)
+
+JOINTS = """HD_DATA_TXT 300
+
+mesh
+{
+\tjoints 3
+\t{
+\t\tjoint root
+\t\t{
+\t\t\torigin 0 0 0;
+\t\t\taxis 1 0 0 0;
+\t\t}
+\t\tjoint child
+\t\t{
+\t\t\tparent Left  Arm 2;
+\t\t\torigin 1 0 0;
+\t\t\taxis 1 0 0 0;
+\t\t}
+\t\tjoint tab
+\t\t{
+\t\t\tparent\troot;
+\t\t\torigin 0 1 0;
+\t\t\taxis 1 0 0 0;
+\t\t}
+\t}
+}
+"""
+
+
+def test_parent_keeps_whitespace():
+    dmesh = parse_dmesh(io.StringIO(JOINTS))
+    assert dmesh.joint_names == ['root', 'child', 'tab']
+    assert dmesh.joint_parents == [None, 'Left  Arm 2', 'root']
+    assert list(dmesh.joint_origins) == [0, 0, 0, 1, 0, 0, 0, 1, 0]
+
+
+def sample_dmesh(offset=0, joints=True):
+    # halves and quarters are exact in the float32 arrays the parser fills
+    dmesh = DMeshData('d')
+    dmesh.verts.extend(offset + v / 4 for v in range(-6, 6))
+    dmesh.uvs.extend(v / 8 for v in range(8))
+    group = DMeshGroup('body')
+    group.face_counts.extend((3, 4))
+    group.face_verts.extend((0, 1, 2, 0, 2, 3, 1))
+    group.face_uvs.extend((3, 2, 1, 0, 1, 2, 3))
+    group.smooth_groups.extend((1, 2))
+    dmesh.groups['body'] = group
+    if joints:
+        dmesh.joint_names = ['root', 'spine']
+        dmesh.joint_parents = [None, 'root']
+        dmesh.joint_origins.extend((0, 0, 0, 0, 0.5, -1.25))
+        dmesh.joint_axes.extend((1, 0, 0, 0, 0.5, 0.5, -0.5, 0.5))
+        dmesh.weight_verts.extend((0, 1, 1))
+        dmesh.weight_bones.extend((0, 0, 1))
+        dmesh.weight_values.extend((1, 0.25, 0.75))
+    return dmesh
+
+
+def dumped(dmesh, precision=6):
+    out = io.StringIO()
+    dump_dmesh(out, dmesh, precision)
+    return out.getvalue()
+
+
+def test_dump_parse_round_trip():
+    dmesh = sample_dmesh()
+    parsed = parse_dmesh(io.StringIO(dumped(dmesh)))
+    for name in ('verts', 'uvs', 'joint_origins', 'joint_axes',
+                 'weight_values'):
+        assert list(getattr(parsed, name)) == list(getattr(dmesh, name)), name
+    assert list(parsed.weight_verts) == list(dmesh.weight_verts)
+    assert list(parsed.weight_bones) == list(dmesh.weight_bones)
+    assert parsed.joint_names == dmesh.joint_names
+    assert parsed.joint_parents == dmesh.joint_parents
+    group = parsed.groups['body']
+    assert list(group.faces()) == [(0, 1, 2), (0, 2, 3, 1)]
+    assert list(group.uv_faces()) == [(3, 2, 1), (0, 1, 2, 3)]
+    assert list(group.smooth_groups) == [1, 2]
+    assert dumped(parsed) == dumped(dmesh)
+
+
+def test_parse_detects_encoding(tmp_path):
+    path = tmp_path / 'utf16.dmesh'
+    path.write_text(dumped(sample_dmesh()), encoding='utf-16')
+    assert parse_dmesh_file(str(path)).joint_names == ['root', 'spine']
+
+
+def test_writer_single_add_matches_dump():
+    dmesh = sample_dmesh()
+    out = io.StringIO()
+    with DMeshWriter(5) as writer:
+        writer.add(dmesh)
+        writer.write(out)
+    assert out.getvalue() == dumped(dmesh, 5)
+
+
+def test_writer_merges_objects():
+    first, second = sample_dmesh(), sample_dmesh(10, joints=False)
+    out = io.StringIO()
+    with DMeshWriter() as writer:
+        writer.add(first)
+        writer.add(second)
+        writer.add(sample_dmesh(20))
+        writer.write(out)
+    parsed = parse_dmesh(io.StringIO(out.getvalue()))
+    assert len(parsed.verts) == 3 * len(first.verts)
+    # groups of the same name are merged, in the order they were added
+    assert list(parsed.groups) == ['body']
+    assert len(parsed.groups['body'].face_counts) == 6
+    # every object with joints keeps its own joints block
+    assert out.getvalue().count('\tjoints 2\n') == 2
+    assert parsed.joint_names == ['root', 'spine'] * 2
+    assert len(parsed.weight_verts) == 6
+
+
+def test_snapshot_round_trip(tmp_path):
+    dmesh = sample_dmesh()
+    path = tmp_path / 'snapshot.dmesh'
+    dump_dmesh_snapshot_file(str(path), dmesh_snapshot(dmesh), 4)
+    assert path.read_text(encoding='utf-8') == dumped(dmesh, 4)
+    restored = dmesh_from_snapshot(dmesh_snapshot(dmesh))
+    assert dumped(restored) == dumped(dmesh)
+
+
+def test_sections_fall_back_to_lines():
+    text = ("HD_DATA_TXT 300\n\nmesh\n{\n"
+            "\tverts 3\n\t{\n\t\tvert 1 2 3;\n\t\tvert 4 5;\n\t\tvert 6 7 8 9;\n\t}\n"
+            "\tuvs 0\n\t{\n\t}\n"
+            "\tweights 2\n\t{\n\t\tweight 0 1 0.5;\n\t\tweight 2 3 0.25;\n\t}\n"
+            "}\n")
+    dmesh = parse_dmesh(io.StringIO(text))
+    # a short row can't be converted in bulk, the rows are read one by one
+    assert list(dmesh.verts) == [1, 2, 3, 4, 5, 6, 7, 8]
+    assert list(dmesh.uvs) == []
+    assert list(dmesh.weight_verts) == [0, 2]
+    assert list(dmesh.weight_bones) == [1, 3]
+    assert list(dmesh.weight_values) == [0.5, 0.25]
+
+
+def test_unterminated_section():
+    dmesh = parse_dmesh(io.StringIO("HD_DATA_TXT 300\nmesh\n{\n\tverts 1\n"))
+    assert list(dmesh.verts) == []
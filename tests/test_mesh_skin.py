@@ -0,0 +1,196 @@
+import io
+import struct
+
+import numpy as np
+
+from haydee_formats import (HDChunkFile, MeshData, SkinData, dump_mesh,
+                            dump_skin, pack_bone_matrices, parse_mesh,
+                            parse_skin, skin_influences, unpack_bone_matrices)
+
+SIGNATURE = struct.Struct('<20sII')
+ENTRY = struct.Struct('<32siiii')
+
+
+def chunk_file(asset_type, block, extra_entries=0):
+    """HD_CHUNK file as the importers read it, the data block after the
+    signature and chunk table"""
+    entries = [ENTRY.pack(asset_type.encode(), len(block), 0, 0, 0)]
+    entries += [ENTRY.pack(b'extra%d' % i, 0, 0, 0, 0)
+                for i in range(extra_entries)]
+    return (SIGNATURE.pack(b'HD_CHUNK', len(entries), len(block)) +
+            b''.join(entries) + block)
+
+
+def data_block(data):
+    return bytes(data[HDChunkFile(data).data_offset:])
+
+
+def check_header(data, asset_type):
+    signature, count, size = SIGNATURE.unpack_from(data)
+    assert signature.rstrip(b'\0') == b'HD_CHUNK'
+    assert count == 1
+    assert size == len(data) - SIGNATURE.size - ENTRY.size
+    chunks = HDChunkFile(data)
+    assert chunks.asset_type == asset_type
+    assert chunks.data_offset == SIGNATURE.size + ENTRY.size
+
+
+def mesh_file(rng, vert_count=40, face_count=30, extra_entries=2):
+    co = rng.uniform(-2, 2, (vert_count, 3)).astype(np.float32)
+    uvs = rng.uniform(0, 1, (vert_count, 2)).astype(np.float32)
+    normals = rng.uniform(-1, 1, (vert_count, 3)).astype(np.float32)
+    faces = rng.integers(0, vert_count, (face_count, 3), dtype=np.uint32)
+
+    block = struct.pack('II3f3f', vert_count, faces.size,
+                        *co.min(axis=0), *co.max(axis=0))
+    for v, uv, n in zip(co.tolist(), uvs.tolist(), normals.tolist()):
+        block += struct.pack('3f2f4B9f', *v, *uv, 255, 255, 255, 255,
+                             *n, 0, 0, 0, 0, 0, 0)
+    block += faces.tobytes()
+    return chunk_file('mesh', block, extra_entries), co, uvs, normals, faces
+
+
+def test_mesh_round_trip():
+    data, co, uvs, normals, faces = mesh_file(np.random.default_rng(0))
+    mesh = parse_mesh(data)
+    # file (x, y, z) is Blender (-x, -z, y), faces have the reverse winding
+    assert np.array_equal(mesh.verts, np.stack(
+        (-co[:, 0], -co[:, 2], co[:, 1]), axis=1))
+    assert np.array_equal(mesh.uvs, uvs)
+    assert np.array_equal(mesh.normals, np.stack(
+        (-normals[:, 0], -normals[:, 2], normals[:, 1]), axis=1))
+    assert np.array_equal(mesh.faces, faces[:, ::-1])
+
+    out = io.BytesIO()
+    dump_mesh(out, mesh)
+    written = out.getvalue()
+    check_header(written, 'mesh')
+    assert data_block(written) == data_block(data)
+
+    again = parse_mesh(written)
+    for name in ('verts', 'uvs', 'normals', 'faces'):
+        assert np.array_equal(getattr(again, name), getattr(mesh, name)), name
+    assert again.bounds == mesh.bounds
+
+
+def test_mesh_empty():
+    out = io.BytesIO()
+    dump_mesh(out, MeshData())
+    check_header(out.getvalue(), 'mesh')
+    assert parse_mesh(out.getvalue()).verts.shape == (0, 3)
+
+
+def test_skin_round_trip():
+    rng = np.random.default_rng(1)
+    vert_count, names = 50, ['root', 'spine', 'a_name_thirty_one_chars_long_xx']
+    weights = rng.uniform(0, 1, (vert_count, 4)).astype(np.float32)
+    bones = rng.integers(0, len(names), (vert_count, 4), dtype=np.uint8)
+    matrices = rng.uniform(-1, 1, (len(names), 16)).astype(np.float32)
+    vectors = rng.uniform(-1, 1, (len(names), 4)).astype(np.float32)
+
+    block = struct.pack('II', vert_count, len(names))
+    for w, b in zip(weights.tolist(), bones.tolist()):
+        block += struct.pack('4f4B', *w, *b)
+    for name, matrix, vector in zip(names, matrices.tolist(), vectors.tolist()):
+        block += struct.pack('32s16f4f', name.encode(), *matrix, *vector)
+    data = chunk_file('skin', block, 1)
+
+    skin = parse_skin(data)
+    assert np.array_equal(skin.weights, weights)
+    assert np.array_equal(skin.bones, bones)
+    assert skin.bone_names == names
+    assert np.array_equal(skin.bone_matrices, matrices)
+    assert np.array_equal(skin.bone_vectors, vectors)
+
+    out = io.BytesIO()
+    dump_skin(out, skin)
+    written = out.getvalue()
+    check_header(written, 'skin')
+    assert data_block(written) == data_block(data)
+
+    again = parse_skin(written)
+    for name in ('weights', 'bones', 'bone_matrices', 'bone_vectors'):
+        assert np.array_equal(getattr(again, name), getattr(skin, name)), name
+    assert again.bone_names == skin.bone_names
+
+
+def test_skin_influences_keep_largest():
+    # vertex 0 has six influences, vertex 1 one, vertex 2 none
+    vert_indices = np.array([0, 1, 0, 0, 0, 0, 0])
+    bone_indices = np.array([1, 4, 2, 3, 5, 6, 7])
+    weights = np.array([0.1, 0.5, 0.4, 0.05, 0.2, 0.3, 0.1])
+    skin_weights, skin_bones = skin_influences(vert_indices, bone_indices,
+                                               weights, 3)
+    assert skin_weights.dtype == np.float32
+    assert skin_bones.dtype == np.uint8
+    assert list(skin_bones[0]) == [2, 6, 5, 1]
+    np.testing.assert_allclose(skin_weights[0],
+                               [0.4, 0.3, 0.2, 0.1], rtol=1e-6)
+    assert list(skin_bones[1]) == [4, 0, 0, 0]
+    assert list(skin_weights[1]) == [1, 0, 0, 0]
+    assert list(skin_bones[2]) == [0, 0, 0, 0]
+    assert list(skin_weights[2]) == [0, 0, 0, 0]
+
+
+def test_skin_influences_normalized():
+    rng = np.random.default_rng(5)
+    vert_indices = rng.integers(0, 50, 400)
+    bone_indices = rng.integers(0, 256, 400)
+    weights = rng.uniform(0.01, 1, 400)
+    skin_weights, skin_bones = skin_influences(vert_indices, bone_indices,
+                                               weights, 60)
+    used = np.isin(np.arange(60), vert_indices)
+    np.testing.assert_allclose(skin_weights[used].sum(axis=1), 1, rtol=1e-6)
+    assert not skin_weights[~used].any()
+    # slots are filled by decreasing weight
+    assert (np.diff(skin_weights, axis=1) <= 0).all()
+
+
+def rigid_transforms(rng, count):
+    q = rng.normal(size=(count, 4))
+    q /= np.linalg.norm(q, axis=1, keepdims=True)
+    w, x, y, z = q.T
+    transforms = np.zeros((count, 4, 4))
+    transforms[:, 0, :3] = np.stack([1 - 2 * (y * y + z * z),
+                                     2 * (x * y - z * w),
+                                     2 * (x * z + y * w)], axis=1)
+    transforms[:, 1, :3] = np.stack([2 * (x * y + z * w),
+                                     1 - 2 * (x * x + z * z),
+                                     2 * (y * z - x * w)], axis=1)
+    transforms[:, 2, :3] = np.stack([2 * (x * z - y * w),
+                                     2 * (y * z + x * w),
+                                     1 - 2 * (x * x + y * y)], axis=1)
+    transforms[:, :3, 3] = rng.uniform(-5, 5, (count, 3))
+    transforms[:, 3, 3] = 1
+    return transforms
+
+
+def test_bone_matrices_round_trip():
+    rng = np.random.default_rng(6)
+    transforms = rigid_transforms(rng, 20)
+    matrices = pack_bone_matrices(transforms)
+    assert matrices.shape == (20, 16)
+    assert matrices.dtype == np.float32
+    rows = matrices.reshape(-1, 4, 4)
+    np.testing.assert_allclose(rows[:, :3, :3], transforms[:, :3, :3],
+                               atol=1e-6)
+    assert not rows[:, :3, 3].any()
+    assert (rows[:, 3, 3] == 1).all()
+    np.testing.assert_allclose(unpack_bone_matrices(matrices), transforms,
+                               atol=1e-5)
+
+
+def test_bone_matrices_through_skin_file():
+    rng = np.random.default_rng(7)
+    transforms = rigid_transforms(rng, 3)
+    skin = SkinData()
+    skin.weights = np.zeros((1, 4), dtype=np.float32)
+    skin.bones = np.zeros((1, 4), dtype=np.uint8)
+    skin.bone_names = ['a', 'b', 'c']
+    skin.bone_matrices = pack_bone_matrices(transforms)
+    skin.bone_vectors = np.zeros((3, 4), dtype=np.float32)
+    out = io.BytesIO()
+    dump_skin(out, skin)
+    parsed = parse_skin(out.getvalue())
+    np.testing.assert_allclose(unpack_bone_matrices(parsed.bone_matrices),
+                               transforms, atol=1e-5)
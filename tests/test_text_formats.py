@@ -0,0 +1,124 @@
+import io
+from array import array
+
+from haydee_formats import (DMeshData, DSkelData, MotionData, PoseData, d,
+                            dump_dmesh, dump_dmot, dump_dpose, dump_dskel,
+                            parse_dmot, parse_dpose, parse_dskel)
+
+
+def round_trip(dump, parse, data):
+    out = io.StringIO()
+    dump(out, data)
+    parsed = parse(io.StringIO(out.getvalue()))
+    again = io.StringIO()
+    dump(again, parsed)
+    assert again.getvalue() == out.getvalue()
+    return parsed
+
+
+def test_dskel_round_trip():
+    skel = DSkelData()
+    skel.bone_names = ['root', 'arm']
+    skel.bone_parents = [None, 'root']
+    skel.bone_origins = array('f', (0, 0, 0, 1, 0.5, -2))
+    skel.bone_axes = array('f', (1, 0, 0, 0, 0.5, -0.5, 0.5, 0.5))
+    skel.bone_widths = array('f', (0.25, 0.5))
+    skel.bone_heights = array('f', (0.125, 1))
+    skel.bone_lengths = array('f', (2, 0.75))
+    parsed = round_trip(dump_dskel, parse_dskel, skel)
+    assert parsed.bone_names == skel.bone_names
+    assert parsed.bone_parents == skel.bone_parents
+    for name in ('bone_origins', 'bone_axes', 'bone_widths', 'bone_heights',
+                 'bone_lengths'):
+        assert getattr(parsed, name) == getattr(skel, name), name
+
+
+def test_dpose_round_trip():
+    pose = PoseData()
+    pose.bone_names = ['root', 'arm']
+    pose.transforms = array('f', (0, 1, -2, 0, 0, 0, 1,
+                                  0.5, 0.25, 0, 0.5, -0.5, 0.5, 0.5))
+    parsed = round_trip(dump_dpose, parse_dpose, pose)
+    assert parsed.bone_names == pose.bone_names
+    assert parsed.transforms == pose.transforms
+
+
+def test_dmot_round_trip():
+    motion = MotionData()
+    motion.num_frames = 2
+    motion.frame_rate = 30
+    for name in ('root', 'arm'):
+        motion.add_track(name).extend((0, 0.5, 1, 0, 0, 0, 1,
+                                       0.25, 0, -1, 0.5, 0.5, 0.5, -0.5))
+    parsed = round_trip(dump_dmot, parse_dmot, motion)
+    assert parsed.num_frames == 2
+    assert parsed.frame_rate == 30
+    assert parsed.track_names == motion.track_names
+    assert parsed.tracks == motion.tracks
+    assert parsed.key(1, 1) == (0.25, 0, -1, 0.5, 0.5, 0.5, -0.5)
+
+
+# doubles that float32 would round, the text must be d() of the double
+DOUBLES = (0.1, -45.6789012, 123.456789, 1 / 3, -0.000123456, 98765.4321)
+
+
+def test_dskel_dump_writes_doubles():
+    skel = DSkelData('d')
+    skel.bone_names = ['root']
+    skel.bone_parents = [None]
+    skel.bone_origins.extend(DOUBLES[:3])
+    skel.bone_axes.extend(DOUBLES[2:6])
+    skel.bone_widths.append(DOUBLES[0])
+    skel.bone_heights.append(DOUBLES[1])
+    skel.bone_lengths.append(DOUBLES[2])
+    out = io.StringIO()
+    dump_dskel(out, skel)
+    text = out.getvalue()
+    assert "\t\twidth %s;\n" % d(0.1) in text
+    assert "\t\theight -45.678901;\n" in text
+    assert "\t\torigin 0.1 -45.678901 123.456789;\n" in text
+    assert ("\t\taxis %s %s %s %s;\n" % tuple(d(v) for v in DOUBLES[2:6])
+            in text)
+
+
+def test_dpose_dump_writes_doubles():
+    pose = PoseData('d')
+    pose.bone_names = ['root']
+    pose.transforms.extend(DOUBLES + (0.7,))
+    out = io.StringIO()
+    dump_dpose(out, pose, 7)
+    assert ("\ttransform root %s;\n" %
+            ' '.join(d(v, 7) for v in DOUBLES + (0.7,)) in out.getvalue())
+
+
+def test_dmot_dump_writes_doubles():
+    motion = MotionData('d')
+    motion.num_frames = 1
+    motion.frame_rate = 24
+    motion.add_track('root').extend(DOUBLES + (0.7,))
+    out = io.StringIO()
+    dump_dmot(out, motion)
+    assert "\t\tkey 0.1 -45.678901 123.456789 " in out.getvalue()
+    assert ("\t\tkey %s;\n" % ' '.join(d(v) for v in DOUBLES + (0.7,))
+            in out.getvalue())
+
+
+def test_dmesh_dump_writes_doubles():
+    dmesh = DMeshData('d')
+    dmesh.verts.extend(DOUBLES)
+    dmesh.uvs.extend(DOUBLES[:2])
+    dmesh.joint_names = ['root']
+    dmesh.joint_parents = [None]
+    dmesh.joint_origins.extend(DOUBLES[:3])
+    dmesh.joint_axes.extend(DOUBLES[2:6])
+    dmesh.weight_verts.append(0)
+    dmesh.weight_bones.append(0)
+    dmesh.weight_values.append(1 / 3)
+    out = io.StringIO()
+    dump_dmesh(out, dmesh)
+    text = out.getvalue()
+    assert "\t\tvert 0.1 -45.678901 123.456789;\n" in text
+    assert "\t\tvert %s %s %s;\n" % tuple(d(v) for v in DOUBLES[3:]) in text
+    assert "\t\tuv 0.1 -45.678901;\n" in text
+    assert "\t\t\torigin 0.1 -45.678901 123.456789;\n" in text
+    assert "\t\tweight 0 0 0.333333;\n" in text